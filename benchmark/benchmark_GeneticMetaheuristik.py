@@ -0,0 +1,191 @@
+"""
+Benchmark of the hot paths of the GeneticMetaheuristik on synthetic instances of different sizes.
+
+    python -m benchmark.benchmark_GeneticMetaheuristik --sizes 100 1000 --save-baseline benchmark/baseline.csv
+    python -m benchmark.benchmark_GeneticMetaheuristik --sizes 100 1000 --baseline benchmark/baseline.csv
+
+Every case is repeated and the fastest repeat is reported (seconds per call, individuals/s and routes/s), the peak
+memory is measured with tracemalloc in a separate run. With --baseline the results are compared to a stored run and
+the exit code is 1 if a case got slower than the tolerance allows.
+"""
+from metaheuristiken.geneticMetaheuristic.GeneticMetaheuristik import GeneticMetaheuristik
+from metaheuristiken.geneticMetaheuristic import GeneticUtils
+from metaheuristiken.geneticMetaheuristic import RepairUtils
+from metaheuristiken.geneticMetaheuristic.InstanceGeneratorUtils import generate_instance
+from metaheuristiken.geneticMetaheuristic.RandomUtils import make_rng
+import argparse
+import contextlib
+import csv
+import io
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+
+DEFAULT_SIZES = [100, 1000]
+
+DEFAULT_KONFIGURATION = {
+    "max_laufzeit": 3600,
+    "max_iterationen": 10,
+    "patience": 10,
+    "route_group_size": 20,
+    "population_size": 20,
+    "street_capacity": 0.2,
+    "num_clusters": 10,
+    "seed": 0,
+    "legacy_loss_logs": False
+}
+
+CSV_FIELDS = ["case", "num_ras", "seconds_per_call", "individuals_per_s", "routes_per_s", "peak_memory_kib"]
+
+
+def measure(function, repeats, setup=None):
+    """
+    Returns the fastest of the repeated runs (in seconds) and the peak memory of one more run (in KiB).
+    The setup (if given) is called before every run and is not measured.
+    """
+    times = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        function()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return min(times), peak_memory / 1024
+
+
+def benchmark_size(num_ras, konfiguration, repeats):
+    """
+    Runs all cases on an instance with num_ras RAs, returns one result row per case
+    """
+    with tempfile.TemporaryDirectory() as durchlauf_verzeichnis, contextlib.redirect_stdout(io.StringIO()):
+        instance_data = generate_instance(num_ras, max(4, num_ras // 10), seed=0)
+        mh = GeneticMetaheuristik(instance_data, konfiguration, durchlauf_verzeichnis)
+        mh.initialisiere()
+        instance = mh.instance
+        population = list(mh.generations[-1])
+        routes = sum(len(ps.genome) for ps in population)
+        rng = make_rng(mh.seed, 99)
+
+        def each(function):
+            return lambda: [function(ps) for ps in population]
+
+        # every measured iteration starts from the initial population, the run is resumed from a checkpoint of it
+        mh.save_checkpoint()
+        runs = [mh]
+        def resume_run():
+            runs[-1].close()
+            runs.append(GeneticMetaheuristik(instance_data, konfiguration, durchlauf_verzeichnis))
+            runs[-1].resume()
+
+        cases = [
+            ("set_loss", each(lambda ps: ps.set_loss())),
+            ("get_street_overflows", each(lambda ps: ps.get_street_overflows())),
+            ("get_sum_pr_overflows", each(lambda ps: ps.get_sum_pr_overflows())),
+            ("apply_mutation", each(lambda ps: GeneticUtils.apply_mutation(ps, rng=rng))),
+            ("mutation_crossover", each(lambda ps: GeneticUtils.mutation_crossover(ps, population[0], rng=rng))),
+            ("repair_possible_solution", each(lambda ps: RepairUtils.repair_possible_solution(ps.clone(), rng))),
+            ("create_new_possible_solution", lambda: [GeneticUtils.create_new_possible_solution(instance, rng) for _ in population]),
+            ("iteriere", lambda: runs[-1].iteriere()),
+        ]
+        setups = {"iteriere": resume_run}
+
+        results = []
+        for case, function in cases:
+            seconds, peak_memory = measure(function, repeats, setups.get(case))
+            results.append({
+                "case": case,
+                "num_ras": num_ras,
+                "seconds_per_call": seconds / len(population) if case != "iteriere" else seconds,
+                "individuals_per_s": len(population) / seconds,
+                "routes_per_s": routes / seconds,
+                "peak_memory_kib": peak_memory
+            })
+        runs[-1].close()
+    return results
+
+
+def run_benchmark(sizes, konfiguration=None, repeats=5):
+    konfiguration = {**DEFAULT_KONFIGURATION, **(konfiguration or {})}
+    return [row for num_ras in sizes for row in benchmark_size(num_ras, konfiguration, repeats)]
+
+
+def save_results(path, results):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def load_results(path):
+    with open(path, newline="") as f:
+        return [{**row, "num_ras": int(row["num_ras"]), **{k: float(row[k]) for k in CSV_FIELDS[2:]}} for row in csv.DictReader(f)]
+
+
+def compare_to_baseline(results, baseline, tolerance=0.2):
+    """
+    Returns the results that are more than tolerance (relative) slower than the baseline case of the same size,
+    as (result, baseline seconds per call) pairs. Cases without a baseline are ignored.
+    """
+    baseline_seconds = {(row["case"], row["num_ras"]): row["seconds_per_call"] for row in baseline}
+    regressions = []
+    for row in results:
+        seconds = baseline_seconds.get((row["case"], row["num_ras"]))
+        if seconds is not None and row["seconds_per_call"] > seconds * (1 + tolerance):
+            regressions.append((row, seconds))
+    return regressions
+
+
+def print_results(results, baseline=None):
+    baseline_seconds = {(row["case"], row["num_ras"]): row["seconds_per_call"] for row in baseline or []}
+    print(f"{'case':<30}{'RAs':>8}{'ms/call':>12}{'ind/s':>12}{'routes/s':>14}{'peak KiB':>12}{'vs base':>10}")
+    for row in results:
+        seconds = baseline_seconds.get((row["case"], row["num_ras"]))
+        change = f"{row['seconds_per_call'] / seconds - 1:+.0%}" if seconds else ""
+        print(f"{row['case']:<30}{row['num_ras']:>8}{row['seconds_per_call'] * 1000:>12.3f}{row['individuals_per_s']:>12.1f}"
+              f"{row['routes_per_s']:>14.0f}{row['peak_memory_kib']:>12.0f}{change:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the hot paths of the GeneticMetaheuristik")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="numbers of RAs of the synthetic instances")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--config", help="json file with config values overriding the benchmark defaults")
+    parser.add_argument("--baseline", help="csv of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown before a case counts as regression")
+    parser.add_argument("--save-baseline", help="write the results as csv (to be used as --baseline later)")
+    args = parser.parse_args(argv)
+
+    konfiguration = None
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            konfiguration = json.load(f)
+
+    results = run_benchmark(args.sizes, konfiguration, args.repeats)
+    baseline = load_results(args.baseline) if args.baseline else None
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        save_results(args.save_baseline, results)
+        print(f"Results saved to: {args.save_baseline}")
+
+    if baseline is not None:
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        for row, seconds in regressions:
+            print(f"REGRESSION {row['case']} ({row['num_ras']} RAs): {row['seconds_per_call'] * 1000:.3f} ms/call, baseline {seconds * 1000:.3f} ms/call")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,7 @@ import os
 import json
 from hashlib import md5
 from metaheuristiken.geneticMetaheuristic.GeneticMetaheuristik import GeneticMetaheuristik
+from metaheuristiken.geneticMetaheuristic.CompiledInstance import CompiledInstance
 from metaheuristiken.geneticMetaheuristic.PlotUtils import plot_losses, plot_routes_timeline, plot_people_on_street, plot_loss_dict, plot_generation_birthtype_loss, plot_pr_usage_vs_capacity
 import time
 
@@ -33,8 +34,14 @@ def lade_daten_aus_json(dateipfad):
 #%%
 def main():
     DATASET = "middle"
+    # True: load the compiled binary form of the instance, it is cached next to the JSON (<name>.<hash>.npz) on the first run
+    USE_COMPILED_INSTANCE = False
 
-    eingabe_daten = lade_daten_aus_json(os.path.join(INSTANZEN_VERZEICHNIS, f"{DATASET}_evacuation_data.json"))
+    INSTANZ_DATEI = os.path.join(INSTANZEN_VERZEICHNIS, f"{DATASET}_evacuation_data.json")
+    if USE_COMPILED_INSTANCE:
+        eingabe_daten = CompiledInstance.load_cached(INSTANZ_DATEI)
+    else:
+        eingabe_daten = lade_daten_aus_json(INSTANZ_DATEI)
 
     CONFIG_DATEI = os.path.join(CONFIG_VERZEICHNIS, f'geneticMetaheuristic_{DATASET}_config.json')
 
@@ -91,6 +98,7 @@ def main():
             break
 
     best_loesung_json, bester_wert = mh[0].gebe_endloesung_aus()
+    mh[0].close()
 
     print(best_loesung_json)
     print(bester_wert)
@@ -0,0 +1,67 @@
+from metaheuristiken.geneticMetaheuristic.Genome import Genome
+from metaheuristiken.geneticMetaheuristic.PossibleSolution import PossibleSolution
+import numpy as np
+import os
+
+CHECKPOINT_FILE = "checkpoint.npz"
+
+
+def save_checkpoint(durchlauf_verzeichnis, generation, iteration_counter, seed, iteration_times, elapsed_time):
+    """
+    Writes the optimizer state (latest generation with losses, iteration counter, seed and timing history) as one .npz file.
+    The random streams only depend on the seed and the iteration (see RandomUtils), so no generator state has to be stored.
+    The file is replaced atomically, a crash while writing keeps the previous checkpoint.
+    """
+    genomes = [ps.genome for ps in generation]
+    arrays = {f"genome_{name}": np.concatenate([getattr(g, name) for g in genomes]) for name in Genome.__slots__}
+    arrays["genome_offsets"] = np.cumsum([0] + [len(g) for g in genomes])
+
+    arrays["cluster_start_times"] = np.array([ps.get_cluster_start_times() for ps in generation], dtype=np.float64)
+    arrays["cluster_assignments"] = np.array([ps.cluster_mapper.assignment for ps in generation], dtype=np.int32)
+    arrays["losses"] = np.array([ps.loss for ps in generation], dtype=np.float64)
+    arrays["loss_dicts"] = np.array([ps.loss_dict if ps.loss_dict is not None else (np.nan,) * 3 for ps in generation], dtype=np.float64)
+    arrays["birth_types"] = np.array([ps.birth_type for ps in generation], dtype=str)
+
+    arrays["iteration_counter"] = np.array(iteration_counter)
+    arrays["seed"] = np.array(seed, dtype=np.uint64)
+    arrays["iteration_times"] = np.array(iteration_times, dtype=np.float64)
+    arrays["elapsed_time"] = np.array(elapsed_time)
+
+    path = os.path.join(durchlauf_verzeichnis, CHECKPOINT_FILE)
+    with open(path + ".tmp", "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def load_checkpoint(durchlauf_verzeichnis, instance):
+    """
+    Reads a checkpoint written by save_checkpoint, returns the generation (list of solutions) and the run state
+    """
+    path = os.path.join(durchlauf_verzeichnis, CHECKPOINT_FILE)
+    with np.load(path, allow_pickle=False) as checkpoint:
+        if checkpoint["cluster_assignments"].shape[1] != len(instance.ra_list):
+            raise ValueError(f"Checkpoint {path} does not belong to the given instance")
+
+        offsets = checkpoint["genome_offsets"]
+        genome_arrays = [checkpoint[f"genome_{name}"] for name in Genome.__slots__]
+
+        possible_solutions = []
+        for i in range(len(offsets) - 1):
+            genome = Genome(*(array[offsets[i]:offsets[i + 1]] for array in genome_arrays))
+            start_times = [int(t) if t.is_integer() else t for t in checkpoint["cluster_start_times"][i].tolist()]
+            possible_solution = PossibleSolution.from_state(instance, (genome, (start_times, checkpoint["cluster_assignments"][i]), str(checkpoint["birth_types"][i])))
+
+            loss_dict = checkpoint["loss_dicts"][i]
+            if not np.isnan(loss_dict).any():
+                possible_solution.set_loss(tuple(loss_dict.tolist()))
+            possible_solution.loss = float(checkpoint["losses"][i])
+            possible_solutions.append(possible_solution)
+
+        run_state = {
+            "iteration_counter": int(checkpoint["iteration_counter"]),
+            "seed": int(checkpoint["seed"]),
+            "iteration_times": checkpoint["iteration_times"].tolist(),
+            "elapsed_time": float(checkpoint["elapsed_time"]),
+        }
+    return possible_solutions, run_state
@@ -1,10 +1,28 @@
+import numpy as np
+
+
 class Cluster(object):
-    def __init__(self, cluster_mapper, ra_ids, size, start_time=0):
+    """
+    View on one cluster of a ClusterMapper, the RAs of the cluster are stored in the assignment array of the mapper
+    """
+    __slots__ = ("cluster_mapper", "index", "start_time")
+
+    def __init__(self, cluster_mapper, index, start_time=0):
         self.cluster_mapper = cluster_mapper
+        self.index = index
         self.start_time = start_time
-        self.ra_ids = ra_ids
-        self.size = size 
 
 
     def __repr__(self):
-        return f"{self.__class__.__name__}(starting at t={self.start_time}, ra_ids={', '.join(self.ra_ids)})"
\ No newline at end of file
+        return f"{self.__class__.__name__}(starting at t={self.start_time}, ra_ids={', '.join(self.ra_ids)})"
+
+
+    @property
+    def ra_ids(self):
+        ra_ids = self.cluster_mapper.instance.index.ra_ids
+        return [ra_ids[i] for i in np.flatnonzero(self.cluster_mapper.assignment == self.index).tolist()]
+
+
+    @property
+    def size(self):
+        return int(self.cluster_mapper.populations[self.index]) # population of all RAs in the cluster
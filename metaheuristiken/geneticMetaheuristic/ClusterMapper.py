@@ -1,83 +1,137 @@
 import math
-from copy import deepcopy
-import random
+import numpy as np
+from metaheuristiken.geneticMetaheuristic.RandomUtils import get_rng, weighted_choice
 from metaheuristiken.geneticMetaheuristic.Cluster import Cluster
 
 class ClusterMapper():
     """
     ClusterMapper maps RAs into Clusters and manages their starting times etc
+    The RA -> cluster mapping is an integer array (cluster index of every RA), the population of every cluster is kept up to date.
     """
-    def __init__(self, ra_list, num_clusters, max_start_time):
-        self.ra_list = ra_list
-        self.num_clusters = num_clusters
-        self.clusters = self.get_random_cluster_distribution(max_start_time)
+    def __init__(self, instance, rng=None):
+        self.instance = instance # shared ProblemInstance, never copied
+        self.num_clusters = instance.num_clusters
+        self.clusters = self.get_random_cluster_distribution(instance.max_start_time, get_rng(rng))
+
+
+    @property
+    def ra_list(self):
+        return self.instance.ra_list
+
+
+    def copy(self):
+        """
+        Copies the clusters, the instance data is shared
+        """
+        return ClusterMapper.from_state(self.instance, self.get_state())
+
+
+    def get_state(self):
+        """
+        Returns the clusters as plain data (start times and the cluster index of every RA), e.g. to send them to other processes
+        """
+        return [c.start_time for c in self.clusters], self.assignment.copy()
+
+
+    @classmethod
+    def from_state(cls, instance, state):
+        start_times, assignment = state
+        cluster_mapper = object.__new__(cls)
+        cluster_mapper.instance = instance
+        cluster_mapper.num_clusters = instance.num_clusters
+        cluster_mapper.set_assignment(assignment)
+        cluster_mapper.clusters = [Cluster(cluster_mapper, i, start_time) for i, start_time in enumerate(start_times)]
+        return cluster_mapper
+
+
+    def set_assignment(self, assignment):
+        """
+        Sets the cluster index of every RA and recalculates the cluster populations
+        """
+        self.assignment = np.asarray(assignment, dtype=np.int32)
+        self.populations = np.bincount(self.assignment, weights=self.instance.ra_population, minlength=self.num_clusters).astype(np.int64)
 
     
-    def get_random_cluster_distribution(self, max_start_time):
+    def get_random_cluster_distribution(self, max_start_time, rng):
         """
         Randomly distribute all RAs into the given amount of clusters
         """
         # Shuffle to add randomness and avoid bias
-        shuffled_ras = random.sample(self.ra_list, len(self.ra_list))
-
-        # Init containers
-        clusters = [[] for _ in range(self.num_clusters)]
-        cluster_populations = [0] * self.num_clusters
+        shuffled_ras = rng.permutation(len(self.ra_list))
 
         # Assign RAs to cluster with currently lowest population
-        for ra in shuffled_ras:
-            idx = cluster_populations.index(min(cluster_populations))
-            clusters[idx].append(ra)
-            cluster_populations[idx] += ra["population"]
+        self.set_assignment(self.lowest_population_assignments(self.instance, shuffled_ras[np.newaxis])[0])
 
         # Build Cluster objects
-        result = []
-        for i, ra_group in enumerate(clusters):
-            new_cluster = Cluster(
-                start_time=random.randrange(0, int(max_start_time)),
-                cluster_mapper=self,
-                ra_ids=[ra["id"] for ra in ra_group],
-                size=sum(ra["population"] for ra in ra_group)
-            )
-            result.append(new_cluster)
-
-        return result
+        return [Cluster(self, i, start_time=int(rng.integers(0, int(max_start_time)))) for i in range(self.num_clusters)]
+
+
+    @staticmethod
+    def lowest_population_assignments(instance, permutations):
+        """
+        Assigns the RAs of every row of permutations (in this order) to the cluster with currently lowest population
+        (ties: lowest cluster index). All rows are processed at once, one row per solution.
+        """
+        num_solutions, num_ras = permutations.shape
+        assignments = np.zeros((num_solutions, num_ras), dtype=np.int32)
+        populations = np.zeros((num_solutions, instance.num_clusters), dtype=np.int64)
+        rows = np.arange(num_solutions)
+
+        for ras in permutations.T:
+            clusters = populations.argmin(axis=1)
+            assignments[rows, ras] = clusters
+            populations[rows, clusters] += instance.ra_population[ras]
+        return assignments
     
 
-    def reassign_random_ra(self, ra_id):
+    def reassign_random_ra(self, ra_id, rng):
         """
-        Finds the cluster with a given RA ID and adds it to another random cluster
+        Moves the RA with the given ID to another random cluster (small clusters are more likely)
         """
-        cluster_with_ra = next((c for c in self.clusters if ra_id in c.ra_ids), None)
-        if cluster_with_ra is None:
-            return # can happen if it's been removed in the same mutation
+        self.reassign_random_ra_idx(self.instance.ra_index[ra_id], rng)
+
 
-        weights = [1 / (c.size + 0.001) for c in self.clusters]
-        random_cluster = random.choices(self.clusters, weights=weights, k=1)[0]
-        
-        cluster_with_ra.ra_ids.remove(ra_id)
-        random_cluster.ra_ids.append(ra_id)
+    def reassign_random_ra_idx(self, ra_idx, rng):
+        weights = 1 / (self.populations + 0.001)
+        self.reassign_ra(ra_idx, int(weighted_choice(rng, weights)[0]))
 
 
-    def recluster_population(self):
+    def reassign_ra(self, ra_idx, cluster_idx):
         """
-        Keeps the cluster start_times but reorders the RAs in it
+        Moves an RA (index) into the given cluster in O(1)
         """
-        # TODO this method can be somhow combined with the get_random_cluster_distribution function (duplicated code fragments)
-        cluster_size = math.ceil(len(self.ra_list) / self.num_clusters)
-        areas_to_evacuate = deepcopy(self.ra_list)
+        population = self.instance.ra_population[ra_idx]
+        self.populations[self.assignment[ra_idx]] -= population
+        self.populations[cluster_idx] += population
+        self.assignment[ra_idx] = cluster_idx
+
+
+    def recluster_population(self, rng, balanced=False):
+        """
+        Keeps the cluster start_times but reorders the RAs in it.
+        One random permutation of the RAs is cut into the clusters in O(RAs): into equal amounts of RAs,
+        or (balanced) at equal shares of the city population like in get_random_cluster_distribution.
+        """
+        shuffled_ras = rng.permutation(len(self.ra_list))
+        assignment = np.empty(len(self.ra_list), dtype=np.int32)
+
+        population = self.instance.ra_population[shuffled_ras]
+        if balanced and self.instance.city_population > 0:
+            # an RA belongs to the population share its middle falls into
+            middles = np.cumsum(population) - population / 2
+            assignment[shuffled_ras] = np.minimum(middles * self.num_clusters // self.instance.city_population, self.num_clusters - 1)
+        else:
+            cluster_size = math.ceil(len(self.ra_list) / self.num_clusters)
+            assignment[shuffled_ras] = np.arange(len(self.ra_list)) // cluster_size
 
-        for cluster in self.clusters:
-            selected = random.sample(areas_to_evacuate, cluster_size if len(areas_to_evacuate) >= cluster_size else len(areas_to_evacuate))
-            cluster.ra_ids = [ra["id"] for ra in selected]
-            areas_to_evacuate = [o for o in areas_to_evacuate if o not in selected]
+        self.set_assignment(assignment)
 
 
     def find_RA_cluster(self, ra_id):
         """
         Given an RA ID, find the cluster it belongs to and return the cluster.
         """
-        for cluster in self.clusters:
-            if ra_id in cluster.ra_ids:
-                return cluster
-        raise ValueError(f"RA ID {ra_id} not found in any cluster.")
\ No newline at end of file
+        ra_idx = self.instance.ra_index.get(ra_id)
+        if ra_idx is None:
+            raise ValueError(f"RA ID {ra_id} not found in any cluster.")
+        return self.clusters[self.assignment[ra_idx]]
@@ -0,0 +1,101 @@
+import hashlib
+import json
+import os
+import numpy as np
+
+FORMAT_VERSION = 1 # part of the cache key, increase it when the stored arrays change
+
+
+class CompiledInstance:
+    """
+    Instance data as arrays: the RA/PR IDs and their populations/capacities, and per edge the RA index, PR index and
+    distance in meters. It is stored as .npz next to the input JSON (keyed by the content hash of the JSON), so later
+    runs skip parsing the edge list. GeneticMetaheuristik accepts it instead of the JSON dict.
+    """
+    FIELDS = ("ra_ids", "ra_population", "pr_ids", "pr_capacity", "edge_ra", "edge_pr", "edge_distance_m")
+
+    def __init__(self, ra_ids, ra_population, pr_ids, pr_capacity, edge_ra, edge_pr, edge_distance_m):
+        self.ra_ids = np.asarray(ra_ids)
+        self.ra_population = np.asarray(ra_population, dtype=np.int64)
+        self.pr_ids = np.asarray(pr_ids)
+        self.pr_capacity = np.asarray(pr_capacity, dtype=np.int64)
+        self.edge_ra = np.asarray(edge_ra, dtype=np.int32)
+        self.edge_pr = np.asarray(edge_pr, dtype=np.int32)
+        self.edge_distance_m = np.asarray(edge_distance_m, dtype=np.float64)
+
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(#RAs={len(self.ra_ids)}, #PRs={len(self.pr_ids)}, #edges={len(self.edge_ra)})"
+
+
+    @classmethod
+    def from_json_data(cls, eingabe_daten):
+        """
+        Compiles the instance dict of the input JSON (residential_areas, places_of_refuge, edges)
+        """
+        ra_list = eingabe_daten["residential_areas"]
+        pr_list = eingabe_daten["places_of_refuge"]
+        edges_list = eingabe_daten["edges"]
+
+        ra_index = {ra["id"]: i for i, ra in enumerate(ra_list)}
+        pr_index = {pr["id"]: i for i, pr in enumerate(pr_list)}
+        return cls(
+            ra_ids=[ra["id"] for ra in ra_list],
+            ra_population=[ra["population"] for ra in ra_list],
+            pr_ids=[pr["id"] for pr in pr_list],
+            pr_capacity=[pr["capacity"] for pr in pr_list],
+            edge_ra=[ra_index[edge["from"]] for edge in edges_list],
+            edge_pr=[pr_index[edge["to"]] for edge in edges_list],
+            edge_distance_m=np.array([float(edge["distance_km"]) for edge in edges_list], dtype=np.float64) * 1000
+        )
+
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(**{name: data[name] for name in cls.FIELDS})
+
+
+    def save(self, path):
+        """
+        Writes the arrays as (uncompressed) .npz, the file is replaced atomically
+        """
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, **{name: getattr(self, name) for name in self.FIELDS})
+        os.replace(path + ".tmp", path)
+
+
+    @classmethod
+    def load_cached(cls, json_path):
+        """
+        Returns the compiled instance of the input JSON. It is loaded from the cache file next to the JSON if it exists,
+        otherwise the JSON is parsed, compiled and the cache file is written. A changed JSON gets a new cache file.
+        """
+        path = cls.cache_path(json_path)
+        if os.path.exists(path):
+            return cls.load(path)
+
+        with open(json_path, "r", encoding="utf-8") as f:
+            compiled = cls.from_json_data(json.load(f))
+        compiled.save(path)
+        return compiled
+
+
+    @staticmethod
+    def cache_path(json_path):
+        """
+        Path of the cache file, e.g. data/input/small_evacuation_data.<content hash>.npz
+        """
+        content_hash = hashlib.blake2b(str(FORMAT_VERSION).encode(), digest_size=8)
+        with open(json_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                content_hash.update(block)
+        return f"{os.path.splitext(json_path)[0]}.{content_hash.hexdigest()}.npz"
+
+
+    # The dict lists of the input format (used for logging and the exports)
+    def ra_list(self):
+        return [{"id": ra_id, "population": population} for ra_id, population in zip(self.ra_ids.tolist(), self.ra_population.tolist())]
+
+    def pr_list(self):
+        return [{"id": pr_id, "capacity": capacity} for pr_id, capacity in zip(self.pr_ids.tolist(), self.pr_capacity.tolist())]
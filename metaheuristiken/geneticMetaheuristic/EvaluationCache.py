@@ -0,0 +1,196 @@
+from metaheuristiken.geneticMetaheuristic import EvaluationUtils
+import numpy as np
+from copy import copy
+
+
+class EvaluationCache:
+    """
+    Cached evaluation state of one genome: the PR usage counters and the sorted street events with the persons on the street after every event.
+    A changed genome (e.g. a mutated clone) is re-scored by comparing it with the cached snapshot (only the rows marked as changed by
+    the operators and the routes of shifted clusters, if known), only the PR counters of the changed routes are updated and the
+    street sweep is only recomputed in the time window spanned by the moved events.
+    A cache is never changed after its creation, so a clone can share the cache of its parent.
+    """
+    __slots__ = (
+        "pr_idx", "group_size", "cluster_start_times", "enter_times", "exit_times",
+        "pr_usage", "pr_overflow_sum",
+        "event_times", "event_deltas", "persons_on_street", "amount_street_overflows", "street_overflow_sum"
+    )
+
+    # above this share of changed routes a full evaluation is cheaper than the update
+    MAX_CHANGED_ROUTES = 0.25
+
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(#routes={len(self.pr_idx)}, street_overflow_sum={self.street_overflow_sum}, pr_overflow_sum={self.pr_overflow_sum})"
+
+
+    @classmethod
+    def evaluate(cls, instance, genome, cluster_start_times, cache=None, changed_routes=None):
+        """
+        Returns the cache of the given genome, updated from the given (parent) cache if possible
+        """
+        if cache is None:
+            return cls.create(instance, genome, cluster_start_times)
+        return cache.update(instance, genome, cluster_start_times, changed_routes)
+
+
+    @classmethod
+    def create(cls, instance, genome, cluster_start_times):
+        """
+        Full evaluation of a genome (same sweep as EvaluationUtils.street_overflows)
+        """
+        cache = object.__new__(cls)
+        cache.pr_idx = genome.pr_idx.copy()
+        cache.group_size = genome.group_size.copy()
+        cache.cluster_start_times = cluster_start_times.copy()
+        cache.enter_times = cluster_start_times[genome.cluster_idx]
+        cache.exit_times = cache.enter_times + genome.distance
+
+        usage, pr_overflows = EvaluationUtils.pr_usage(genome.pr_idx, genome.group_size, instance.pr_capacity)
+        cache.pr_usage = usage
+        cache.pr_overflow_sum = int(pr_overflows.sum())
+
+        times = np.concatenate((cache.enter_times, cache.exit_times))
+        deltas = np.concatenate((genome.group_size, -genome.group_size)).astype(np.int64)
+        order = np.lexsort((deltas, times))
+        cache.event_times = times[order]
+        cache.event_deltas = deltas[order]
+        cache.persons_on_street = np.cumsum(cache.event_deltas)
+
+        overflows = cache.persons_on_street[cache.persons_on_street > instance.max_street_capacity] - instance.max_street_capacity
+        cache.amount_street_overflows = len(overflows)
+        cache.street_overflow_sum = int(overflows.sum())
+        return cache
+
+
+    def update(self, instance, genome, cluster_start_times, changed_routes=None):
+        """
+        Returns the cache of the given genome, which is derived from the genome of this cache.
+        changed_routes are the rows changed in place since this cache (the group sizes are unchanged), without them the whole genome is compared.
+        Falls back to a full evaluation if the route layout changed or too many routes changed.
+        """
+        if len(genome) != len(self.pr_idx):
+            return self.create(instance, genome, cluster_start_times)
+
+        if changed_routes is None:
+            if not np.array_equal(genome.group_size, self.group_size):
+                return self.create(instance, genome, cluster_start_times)
+            enter_times = cluster_start_times[genome.cluster_idx]
+            exit_times = enter_times + genome.distance
+            is_moved = (enter_times != self.enter_times) | (exit_times != self.exit_times)
+            is_reassigned = genome.pr_idx != self.pr_idx
+            changed_routes = np.arange(len(genome))
+        else:
+            # only the marked rows and the routes of the shifted clusters can differ from the cache
+            is_shifted = cluster_start_times != self.cluster_start_times
+            if is_shifted.any():
+                is_candidate = is_shifted[genome.cluster_idx]
+                is_candidate[changed_routes] = True
+                changed_routes = np.flatnonzero(is_candidate)
+            new_enter_times = cluster_start_times[genome.cluster_idx[changed_routes]]
+            new_exit_times = new_enter_times + genome.distance[changed_routes]
+            is_moved = (new_enter_times != self.enter_times[changed_routes]) | (new_exit_times != self.exit_times[changed_routes])
+            is_reassigned = genome.pr_idx[changed_routes] != self.pr_idx[changed_routes]
+            enter_times = exit_times = None
+
+        num_changed_routes = np.count_nonzero(is_moved | is_reassigned)
+        if num_changed_routes == 0:
+            return self
+        if num_changed_routes > self.MAX_CHANGED_ROUTES * len(genome):
+            return self.create(instance, genome, cluster_start_times)
+
+        moved_routes = changed_routes[is_moved]
+        reassigned_routes = changed_routes[is_reassigned]
+        if enter_times is None:
+            enter_times, exit_times = self.enter_times.copy(), self.exit_times.copy()
+            enter_times[moved_routes] = new_enter_times[is_moved]
+            exit_times[moved_routes] = new_exit_times[is_moved]
+
+        cache = copy(self)
+        cache.pr_idx = genome.pr_idx.copy()
+        cache.cluster_start_times = cluster_start_times.copy()
+        cache.enter_times = enter_times
+        cache.exit_times = exit_times
+
+        if len(reassigned_routes):
+            cache._update_pr_usage(instance, self.pr_idx[reassigned_routes], genome.pr_idx[reassigned_routes], genome.group_size[reassigned_routes])
+
+        if len(moved_routes):
+            group_sizes = genome.group_size[moved_routes].astype(np.int64)
+            removed_times = np.concatenate((self.enter_times[moved_routes], self.exit_times[moved_routes]))
+            added_times = np.concatenate((enter_times[moved_routes], exit_times[moved_routes]))
+            if not cache._update_street_events(instance, removed_times, added_times, np.concatenate((group_sizes, -group_sizes))):
+                return self.create(instance, genome, cluster_start_times)
+
+        return cache
+
+
+    def _update_pr_usage(self, instance, old_prs, new_prs, group_sizes):
+        usage = self.pr_usage.copy()
+        np.subtract.at(usage, old_prs, group_sizes)
+        np.add.at(usage, new_prs, group_sizes)
+
+        # only the overflows of the touched PRs can change
+        touched = np.union1d(old_prs, new_prs)
+        capacity = instance.pr_capacity[touched]
+        old_overflow = np.maximum(self.pr_usage[touched] - capacity, 0).sum()
+        new_overflow = np.maximum(usage[touched] - capacity, 0).sum()
+
+        self.pr_usage = usage
+        self.pr_overflow_sum += int(new_overflow - old_overflow)
+
+
+    def _update_street_events(self, instance, removed_times, added_times, deltas):
+        """
+        Replaces the removed events by the added events (both with the given deltas) and re-sweeps only the affected time window.
+        Returns False if the window can't be determined (e.g. missing edges with nan distances).
+        """
+        window_begin = min(removed_times.min(), added_times.min())
+        window_end = max(removed_times.max(), added_times.max())
+        if not (np.isfinite(window_begin) and np.isfinite(window_end)):
+            return False
+
+        start = np.searchsorted(self.event_times, window_begin, side="left")
+        end = np.searchsorted(self.event_times, window_end, side="right")
+
+        # multiset of the window events: old events count +1, removed events -1, added events +1
+        times = np.concatenate((self.event_times[start:end], removed_times, added_times))
+        event_deltas = np.concatenate((self.event_deltas[start:end], deltas, deltas))
+        counts = np.concatenate((np.ones(end - start, dtype=np.int64), -np.ones(len(deltas), dtype=np.int64), np.ones(len(deltas), dtype=np.int64)))
+
+        order = np.lexsort((event_deltas, times))
+        times, event_deltas, counts = times[order], event_deltas[order], counts[order]
+        first_of_event = np.ones(len(times), dtype=bool)
+        first_of_event[1:] = (times[1:] != times[:-1]) | (event_deltas[1:] != event_deltas[:-1])
+        firsts = np.flatnonzero(first_of_event)
+        counts = np.add.reduceat(counts, firsts)
+        if (counts < 0).any():
+            return False
+
+        window_times = np.repeat(times[firsts], counts)
+        window_deltas = np.repeat(event_deltas[firsts], counts)
+        persons_before = self.persons_on_street[start - 1] if start > 0 else 0
+        window_persons = persons_before + np.cumsum(window_deltas)
+        # moved routes enter and leave inside the window, so the persons after the window do not change
+
+        max_street_capacity = instance.max_street_capacity
+        old_window_persons = self.persons_on_street[start:end]
+        old_overflows = old_window_persons[old_window_persons > max_street_capacity] - max_street_capacity
+        new_overflows = window_persons[window_persons > max_street_capacity] - max_street_capacity
+        self.amount_street_overflows += len(new_overflows) - len(old_overflows)
+        self.street_overflow_sum += int(new_overflows.sum()) - int(old_overflows.sum())
+
+        self.event_times = np.concatenate((self.event_times[:start], window_times, self.event_times[end:]))
+        self.event_deltas = np.concatenate((self.event_deltas[:start], window_deltas, self.event_deltas[end:]))
+        self.persons_on_street = np.concatenate((self.persons_on_street[:start], window_persons, self.persons_on_street[end:]))
+        return True
+
+
+    def loss_dict(self, instance, genome):
+        """
+        Weighted loss components of the cached genome (identical to EvaluationUtils.loss_dict)
+        """
+        longest_distance = max(0.0, float(genome.distance.max()))
+        normalized_time = self.event_times[-1].item() / longest_distance - 1
+        return EvaluationUtils.weighted_loss(instance, self.street_overflow_sum, self.pr_overflow_sum, normalized_time, np.sum(self.group_size))
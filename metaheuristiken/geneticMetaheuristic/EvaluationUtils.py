@@ -0,0 +1,139 @@
+import numpy as np
+
+
+def loss_dict(instance, genome, cluster_start_times):
+    """
+    Calculates the weighted loss components (street overflow, PR overflow, time) of a genome.
+    Only needs the shared instance, the genome arrays and the cluster start times, so it can run in worker processes.
+    """
+    amount_street_overflows, street_overflow_sum, normalized_time, steps_took = street_overflow_metrics(instance, genome, cluster_start_times)
+    _, pr_overflows = pr_usage(genome.pr_idx, genome.group_size, instance.pr_capacity)
+    return weighted_loss(instance, street_overflow_sum, int(pr_overflows.sum()), normalized_time, np.sum(genome.group_size))
+
+
+def weighted_loss(instance, street_overflow_sum, pr_overflow_sum, normalized_time, population_size):
+    """
+    Weights the raw street overflow, PR overflow and time values to the loss components
+    """
+    normalized_street_overflow = street_overflow_sum / instance.max_street_capacity / population_size
+    normalized_pr_overflow = pr_overflow_sum / population_size
+
+    weighted_time = normalized_time
+    # make sure these two are always maximum penalized
+    weighted_street_overflow = 0 if normalized_street_overflow == 0 else  normalized_street_overflow * 10 + weighted_time * 2
+    weighted_pr_overflow = 0 if normalized_pr_overflow == 0 else normalized_pr_overflow * 5 + weighted_time
+
+    return weighted_street_overflow, weighted_pr_overflow, weighted_time
+
+
+# gets the amount of street overflows
+# -> Should be used to optimize start_time
+def street_overflow_metrics(instance, genome, cluster_start_times, vectorized=None):
+    if vectorized is None:
+        vectorized = instance.vectorized_loss
+
+    enter_times = cluster_start_times[genome.cluster_idx]
+    exit_times = enter_times + genome.distance
+
+    if instance.aggregated_genome:
+        sweep = street_overflows_per_person # rows carry many people, evaluate them like single persons
+    elif vectorized:
+        sweep = street_overflows
+    else:
+        sweep = street_overflows_legacy
+    amount_street_overflows, street_overflow_sum, last_event_time = sweep(enter_times, exit_times, genome.group_size, instance.max_street_capacity)
+
+    # Normalize last_event_time
+    longest_distance = max(0.0, float(genome.distance.max()))
+    normalized_time = last_event_time / longest_distance -1 # 0 would be the optimal solution
+    return amount_street_overflows, street_overflow_sum, normalized_time, last_event_time
+
+
+def street_overflows(enter_times, exit_times, group_sizes, max_street_capacity):
+    """
+    Vectorized sweep over all street events (people entering at enter_time and leaving at exit_time).
+    Returns the amount of overflown events, the summed overflow and the time of the last event.
+    Events with the same time are processed like in the legacy sweep (smaller delta first), so the results are identical.
+    """
+    times = np.concatenate((enter_times, exit_times))
+    deltas = np.concatenate((group_sizes, -group_sizes)).astype(np.int64)
+
+    # Sort events by time (and delta for events at the same time)
+    order = np.lexsort((deltas, times))
+    persons_on_street = np.cumsum(deltas[order])
+
+    overflows = persons_on_street[persons_on_street > max_street_capacity] - max_street_capacity
+    return len(overflows), int(overflows.sum()), times[order[-1]].item()
+
+
+def street_overflows_per_person(enter_times, exit_times, group_sizes, max_street_capacity):
+    """
+    Street sweep for the aggregated genome, where a row carries many people with the same enter and exit time.
+    It returns the same values as the legacy sweep with route_group_size=1 (every person is an own event):
+    at every time all persons leave before new persons enter, the overflows of these single person steps are
+    summed up in closed form instead of creating one event per person.
+    """
+    times = np.concatenate((enter_times, exit_times))
+    entering = np.concatenate((group_sizes, np.zeros_like(group_sizes))).astype(np.int64)
+    leaving = np.concatenate((np.zeros_like(group_sizes), group_sizes)).astype(np.int64)
+
+    # Sum up all persons entering/leaving at the same time
+    order = np.argsort(times, kind="stable")
+    event_times, starts = np.unique(times[order], return_index=True)
+    entering = np.add.reduceat(entering[order], starts)
+    leaving = np.add.reduceat(leaving[order], starts)
+
+    net_change = entering - leaving
+    persons_before = np.cumsum(net_change) - net_change
+
+    # persons leaving one by one: persons_before - k for k = 1..leaving
+    exit_overflows = np.clip(persons_before - max_street_capacity - 1, 0, leaving)
+    exit_overflow_sum = exit_overflows * (persons_before - max_street_capacity) - exit_overflows * (exit_overflows + 1) // 2
+
+    # persons entering one by one: persons_after_exits + k for k = 1..entering
+    persons_after_exits = persons_before - leaving
+    entering_without_overflow = np.clip(max_street_capacity - persons_after_exits, 0, entering)
+    enter_overflows = entering - entering_without_overflow
+    enter_overflow_sum = enter_overflows * (persons_after_exits - max_street_capacity) + \
+        (entering * (entering + 1) - entering_without_overflow * (entering_without_overflow + 1)) // 2
+
+    amount_street_overflows = int(exit_overflows.sum() + enter_overflows.sum())
+    street_overflow_sum = int(exit_overflow_sum.sum() + enter_overflow_sum.sum())
+    return amount_street_overflows, street_overflow_sum, event_times[-1].item()
+
+
+def street_overflows_legacy(enter_times, exit_times, group_sizes, max_street_capacity):
+    """
+    Original python sweep over all street events, kept as reference for the vectorized version
+    """
+    events = []  # (time, delta_people), delta +1 for enter, -1 for exit
+    for enter_time, exit_time, group_size in zip(enter_times.tolist(), exit_times.tolist(), group_sizes.tolist()):
+        events.append((enter_time, group_size))   # person enters street
+        events.append((exit_time, -1 * group_size))  # person leaves street
+
+    # Sort events by time
+    events.sort()
+
+    persons_on_street = 0
+    amount_street_overflows = 0
+    street_overflow_sum = 0
+    last_event_time = 0
+
+    for time, delta in events:
+        persons_on_street += delta
+        if persons_on_street > max_street_capacity:
+            amount_street_overflows += 1
+            street_overflow_sum += persons_on_street - max_street_capacity
+        last_event_time = time
+
+    return amount_street_overflows, street_overflow_sum, last_event_time
+
+
+def pr_usage(pr_idx, group_sizes, pr_capacity):
+    """
+    Accumulates the group sizes per PR index in O(routes + PRs).
+    Returns the usage and the overflow (usage above capacity) of each PR, nothing is written to shared data.
+    """
+    usage = np.bincount(pr_idx, weights=group_sizes, minlength=len(pr_capacity)).astype(np.int64)
+    overflows = np.maximum(usage - pr_capacity, 0)
+    return usage, overflows
@@ -2,12 +2,37 @@ class Generation(list):
     def __init__(self, *args):
         super().__init__(*args)
 
-    def set_losses(self):
-        i = 0
-        for ind in self:
-            ind.set_loss()
-            #print(f"calculated ind loss ({i}/{len(self)})")
-            i += 1
+    def set_losses(self, worker_pool=None, loss_cache=None):
+        """
+        Calculates the loss of all individuals, in the worker processes if a pool is given and the generation is big enough.
+        With a loss cache only the individuals which are not cached yet are evaluated.
+        """
+        missing = self
+        keys = {}
+        if loss_cache is not None:
+            missing = Generation()
+            for ind in self:
+                key = loss_cache.fingerprint(ind)
+                loss_dict = loss_cache.get(key)
+                if loss_dict is None:
+                    keys[id(ind)] = key
+                    missing.append(ind)
+                else:
+                    ind.set_loss(loss_dict)
+
+        if worker_pool is not None and worker_pool.use_for(len(missing)):
+            for ind, loss_dict in zip(missing, worker_pool.calculate_loss_dicts(missing)):
+                ind.set_loss(loss_dict)
+        else:
+            i = 0
+            for ind in missing:
+                ind.set_loss()
+                #print(f"calculated ind loss ({i}/{len(self)})")
+                i += 1
+
+        if loss_cache is not None:
+            for ind in missing:
+                loss_cache.put(keys[id(ind)], ind.loss_dict)
 
     def get_best(self):
         return min(self, key=lambda ind: ind.loss)
@@ -15,6 +40,15 @@ class Generation(list):
     def average_loss(self):
         return sum(ind.loss for ind in self) / len(self)
     
+    def loss_columns(self):
+        """
+        Returns the birth types, losses and loss components of all individuals as plain python lists (nan if not evaluated)
+        """
+        birth_types = [ind.birth_type for ind in self]
+        losses = [float(ind.loss) for ind in self]
+        loss_components = [[float(c) for c in ind.loss_dict] if ind.loss_dict is not None else [float("nan")] * 3 for ind in self]
+        return birth_types, losses, loss_components
+
     def dict_all_inds_loss(self):
         losses = []
         for ind in self:
@@ -1,14 +1,25 @@
 from basis.metaheuristik import Metaheuristik
-import random
 from metaheuristiken.geneticMetaheuristic.Generation import Generation
 from metaheuristiken.geneticMetaheuristic import GeneticUtils
-from metaheuristiken.geneticMetaheuristic import RepairUtils
+from metaheuristiken.geneticMetaheuristic.ProblemInstance import ProblemInstance
+from metaheuristiken.geneticMetaheuristic.CompiledInstance import CompiledInstance
+from metaheuristiken.geneticMetaheuristic.WorkerPool import WorkerPool
+from metaheuristiken.geneticMetaheuristic.LossCache import LossCache
+from metaheuristiken.geneticMetaheuristic import CheckpointUtils
+from metaheuristiken.geneticMetaheuristic.ResultWriter import ResultWriter
+from metaheuristiken.geneticMetaheuristic import MetricsUtils
+from metaheuristiken.geneticMetaheuristic.PhaseTimer import PhaseTimer
+from metaheuristiken.geneticMetaheuristic.Selection import Selection
+from metaheuristiken.geneticMetaheuristic.RandomUtils import make_rng, new_run_seed, STREAM_SELECTION, STREAM_OFFSPRING, STREAM_INITIAL_POPULATION
+import cProfile
 import math
-from copy import deepcopy
 import time
+import warnings
 import os
 import numpy as np
 
+PHASE_TIMES_FILE = "phase_times.jsonl"
+
 class GeneticMetaheuristik(Metaheuristik):
     def __init__(self, instanz_daten, konfiguration, durchlauf_verzeichnis):
         super().__init__(instanz_daten, konfiguration, durchlauf_verzeichnis)
@@ -19,6 +30,12 @@ class GeneticMetaheuristik(Metaheuristik):
         os.makedirs(durchlauf_verzeichnis, exist_ok=True)
 
         self.max_street_capacity = None # make public
+        self.instance = None
+        self.worker_pool = None
+
+        # losses of already evaluated solutions (e.g. elites), 0 disables the cache
+        loss_cache_size = konfiguration.get("loss_cache_size", 1024)
+        self.loss_cache = LossCache(loss_cache_size) if loss_cache_size > 0 else None
 
         # Genetic Algorithm specific properties
         self.generations = []
@@ -27,13 +44,105 @@ class GeneticMetaheuristik(Metaheuristik):
         self.start_time = time.time()
         self.iteration_times = []
 
+        # run seed, every random decision is drawn from a stream derived from it (see RandomUtils)
+        self.seed = konfiguration.get("seed")
+        if self.seed is None:
+            self.seed = new_run_seed()
+
+        # write a checkpoint every checkpoint_interval iterations (0 disables it), see resume()
+        self.checkpoint_interval = konfiguration.get("checkpoint_interval", 0)
+
+        # logs and solution snapshots (evacuation_result_iteration_N.json every snapshot_interval iterations)
+        self.writer = ResultWriter(
+            durchlauf_verzeichnis,
+            background=konfiguration.get("background_writer", False),
+            flush_interval=konfiguration.get("writer_flush_interval", 5.0)
+        )
+        self.snapshot_interval = konfiguration.get("snapshot_interval", 1)
+        self.legacy_loss_logs = konfiguration.get("legacy_loss_logs", True) # the csv logs besides metrics.jsonl
+
+        # parent selection: "roulette" (proportional to 1/loss) or "tournament" (best of tournament_size random solutions)
+        self.selection_method = konfiguration.get("selection", "roulette")
+        self.tournament_size = konfiguration.get("tournament_size", 3)
+
+        # wall time per phase and operator of every iteration (phase_times.jsonl), every profile_interval-th iteration
+        # is additionally run in cProfile (profile_iteration_N.prof, 0 disables it)
+        self.phase_timer = PhaseTimer()
+        self.profile_interval = konfiguration.get("profile_interval", 0)
+
         
     def initialisiere(self):
+        self.load_instance()
+        self.start_worker_pool()
+
+        print("Generating Initial Start Population..")
+        first_generation = Generation(self.create_initial_population(self.konfiguration["population_size"])) #"population_size" as in: population of solutions, not city_population
+        print(f"done with init population {len(first_generation)}/{self.konfiguration['population_size']}")
+
+        first_generation.set_losses(self.worker_pool, self.loss_cache)
+
+        self.write_snapshot(first_generation.get_best(), 1)
+
+        self.generations.append(first_generation)
+        self.iteration_counter = 1
+
+
+    def resume(self):
+        """
+        Continues a run from the checkpoint in durchlauf_verzeichnis (called instead of initialisiere).
+        The following iterations are exactly the same as in the original run.
+        """
+        self.load_instance()
+        self.start_worker_pool()
+
+        possible_solutions, run_state = CheckpointUtils.load_checkpoint(self.durchlauf_verzeichnis, self.instance)
+        self.generations = [Generation(possible_solutions)]
+        self.iteration_counter = run_state["iteration_counter"]
+        self.seed = run_state["seed"]
+        self.iteration_times = run_state["iteration_times"]
+        self.start_time = time.time() - run_state["elapsed_time"]
+        print(f"Resumed run from iteration {self.iteration_counter} (seed {self.seed})")
+
+
+    def save_checkpoint(self):
+        return CheckpointUtils.save_checkpoint(
+            self.durchlauf_verzeichnis,
+            self.generations[-1],
+            self.iteration_counter,
+            self.seed,
+            self.iteration_times,
+            time.time() - self.start_time
+        )
+
+
+    def start_worker_pool(self):
+        # parallel loss calculation (only worth it with multiple cores and bigger populations)
+        num_workers = self.konfiguration.get("num_workers", 1)
+        if num_workers > 1:
+            self.worker_pool = WorkerPool(self.instance, num_workers, self.konfiguration.get("parallel_min_population", 16))
+            if self.instance.incremental_evaluation or self.instance.load_bucket_size:
+                # the workers only send back the losses, the evaluation caches of the solutions are not built
+                warnings.warn(
+                    "incremental_evaluation and load_bucket_size are not incremental with num_workers > 1: generations with at least "
+                    f"parallel_min_population ({self.worker_pool.min_population}) solutions are evaluated from scratch in the workers",
+                    RuntimeWarning
+                )
+
+
+    def load_instance(self):
+        """
+        Reads the input data (the JSON dict or a CompiledInstance) and creates the ProblemInstance shared by all possible solutions
+        """
+        compiled = self.eingabe_daten if isinstance(self.eingabe_daten, CompiledInstance) else None
 
         # read graph data and set some general variable
-        self.ra_list = self.eingabe_daten["residential_areas"]
-        self.pr_list = self.eingabe_daten["places_of_refuge"]
-        self.edges_list = self.eingabe_daten["edges"]
+        if compiled is not None:
+            self.ra_list = compiled.ra_list()
+            self.pr_list = compiled.pr_list()
+        else:
+            self.ra_list = self.eingabe_daten["residential_areas"]
+            self.pr_list = self.eingabe_daten["places_of_refuge"]
+            self.edges_list = self.eingabe_daten["edges"]
 
         # Analyze the input data a little bit
         print("-------------------")
@@ -47,35 +156,51 @@ class GeneticMetaheuristik(Metaheuristik):
         print(f"City RAs capacity: total={sum(pr_capacity_array)}, max RA={max(pr_capacity_array)}, mean RA={np.mean(pr_capacity_array)}, min RA={min(pr_capacity_array)}")
         del pr_capacity_array
 
+        print(f"Seed {self.seed}")
         print("-------------------")
 
         city_population = sum([ra["population"] for ra in self.ra_list])
         self.max_street_capacity = math.ceil(self.konfiguration["street_capacity"] * city_population)
 
+        # instance data shared by all possible solutions
+        instance_options = dict(
+            max_street_capacity=self.max_street_capacity,
+            num_clusters=self.konfiguration["num_clusters"],
+            route_group_size=self.konfiguration["route_group_size"],
+            vectorized_loss=self.konfiguration.get("vectorized_loss", True),
+            aggregated_genome=self.konfiguration.get("aggregated_genome", False),
+            incremental_evaluation=self.konfiguration.get("incremental_evaluation", False),
+            balanced_reclustering=self.konfiguration.get("balanced_reclustering", False),
+            load_bucket_size=self.konfiguration.get("load_bucket_size", 0),
+            recluster_routes=self.konfiguration.get("recluster_routes", False)
+        )
+        if compiled is not None:
+            self.instance = ProblemInstance.from_compiled(compiled, ra_list=self.ra_list, pr_list=self.pr_list, **instance_options)
+        else:
+            self.instance = ProblemInstance(pr_list=self.pr_list, ra_list=self.ra_list, edges_list=self.edges_list, **instance_options)
+
         # check if the problem is solvable with the given amount of clusters
         assert city_population / self.konfiguration["num_clusters"] < self.max_street_capacity, "You need more clusters to stay under the street_overflow bound"
 
-        first_generation = Generation()
-
-        print("Generating Initial Start Population..")
-        for i in range(self.konfiguration["population_size"]): #"population_size" as in: population of solutions, not city_population
-            possible_solution = GeneticUtils.create_new_possible_solution(self.pr_list, self.ra_list, self.edges_list, self.max_street_capacity, self.konfiguration["num_clusters"], self.konfiguration["route_group_size"])
-            print(f"done with init population {i+1}/{self.konfiguration['population_size']}")
-            first_generation.append(possible_solution)
-
-        first_generation.set_losses()
-
-        first_generation.get_best().write_solution_to_file(self.durchlauf_verzeichnis, 1, self.start_time)
-
-        self.generations.append(first_generation)
-        self.iteration_counter = 1
-
 
     def iteriere(self):
-        start_time = time.time()
         """
         In the iteration we create a new generation of possible solutions
         """
+        iteration = self.iteration_counter
+        if self.profile_interval and iteration % self.profile_interval == 0:
+            profiler = cProfile.Profile()
+            profiler.runcall(self.create_next_generation)
+            profiler.dump_stats(os.path.join(self.durchlauf_verzeichnis, f"profile_iteration_{iteration}.prof"))
+        else:
+            self.create_next_generation()
+
+        self.writer.append_json_line(PHASE_TIMES_FILE, {"iteration": iteration, **self.phase_timer.as_record()})
+        self.phase_timer = PhaseTimer() # the record is written by the writer, it must not be changed afterwards
+
+
+    def create_next_generation(self):
+        start_time = time.time()
         latest_generation = self.generations[-1]
         new_generation = Generation()
         
@@ -87,53 +212,64 @@ class GeneticMetaheuristik(Metaheuristik):
         num_elits = math.floor(num_childs * 0.1)
         num_repairs= math.floor(num_childs * 0.2)
 
-        # ----
-        # CROSSOVERS
-        print("- Generating Crossovers")
-        for i in range(num_crossovers):
-            parent1, parent2 = GeneticUtils.select_two_by_roulette(latest_generation)
-            child = GeneticUtils.mutation_crossover(parent1, parent2, self.pr_list)
-            new_generation.append(child)
-
-        # ----
-        # EXPLORATIVE MUTANTS
-        print("- Explorative Mutants")
-        for i in range(num_explorative_mutants):
-            parent1, _ = GeneticUtils.select_two_by_roulette(latest_generation)
-            child = GeneticUtils.apply_mutation(
-                possible_solution=parent1,
-                all_prs=self.pr_list,
-                route_change_rate=random.randrange(20,90)/100
-            )
-            new_generation.append(child)
-
-        # Removed this one due to performance and not really bringing benefits
-        # ----
-        # RANDOM NEW SOLUTIONS
-        #for i in range(num_new_random_solutions):
-        #    child = GeneticUtils.create_new_possible_solution(self.pr_list, self.ra_list, self.edges_list, self.max_street_capacity, self.konfiguration["num_clusters"])
-        #    new_generation.append(child)
+        # parents are selected here, the children are created afterwards (possibly in the worker processes)
+        selection_rng = make_rng(self.seed, STREAM_SELECTION, self.iteration_counter)
+        offspring_tasks = []
+        repair_tasks = []
+        with self.phase_timer.phase("selection"):
+            selection = Selection(latest_generation, self.selection_method, self.tournament_size)
+
+            # ----
+            # CROSSOVERS
+            print("- Generating Crossovers")
+            parents = selection.draw(selection_rng, 2 * num_crossovers)
+            for parent1, parent2 in zip(parents[0::2], parents[1::2]):
+                offspring_tasks.append(("crossover", (parent1, parent2)))
+
+            # ----
+            # EXPLORATIVE MUTANTS
+            print("- Explorative Mutants")
+            for parent1 in selection.draw(selection_rng, num_explorative_mutants):
+                offspring_tasks.append(("mutation", (parent1,)))
+
+            # Removed this one due to performance and not really bringing benefits
+            # ----
+            # RANDOM NEW SOLUTIONS
+            #for i in range(num_new_random_solutions):
+            #    child = GeneticUtils.create_new_possible_solution(self.instance)
+            #    new_generation.append(child)
+
+            # ----
+            # REPAIRS -> get the best solutions and repair them (no PR overflows ) # TODO also fix Street capacity here
+            print("- Generating Repairs")
+            best_solutions = selection.best(max(num_repairs, num_elits))
+            repair_candidates = best_solutions[:num_repairs]
+            for repair_candidate in repair_candidates:
+                repair_tasks.append(("repaired", (repair_candidate,)))
+
+        with self.phase_timer.phase("offspring"):
+            children = self.create_offspring(offspring_tasks)
+        # the repairs follow the other children in the random streams
+        with self.phase_timer.phase("repairs"):
+            repaired_children = self.create_offspring(repair_tasks, first_child_idx=len(offspring_tasks))
+        new_generation += children
 
         # ----
         # ELITS
         print("- Getting Elits")
-        elits = sorted(latest_generation, key=lambda p: p.loss)[:num_elits]
-        for elit in elits:
-            elit.birth_type = "elit"
+        with self.phase_timer.phase("elites"):
+            elits = best_solutions[:num_elits]
+            for elit in elits:
+                elit.birth_type = "elit"
         new_generation += elits
-
-        # ----
-        # REPAIRS -> get the best solutions and repair them (no PR overflows ) # TODO also fix Street capacity here
-        print("- Generating Repairs")
-        repair_candidates = sorted(latest_generation, key=lambda p: p.loss)[:num_repairs]
-        for repair_candidate in repair_candidates:
-            repaired = RepairUtils.repair_possible_solution(deepcopy(repair_candidate))
-            repaired.birth_type = "repaired"
-            new_generation.append(repaired)
+        new_generation += repaired_children
 
         # Set losses
         print("Calculating Losses")
-        new_generation.set_losses()
+        with self.phase_timer.phase("losses"):
+            new_generation.set_losses(self.worker_pool, self.loss_cache)
+        if self.loss_cache is not None:
+            print(f"Loss cache (hits/misses/hit rate/size): {self.loss_cache.hits} / {self.loss_cache.misses} / {round(self.loss_cache.hit_rate(), 2)} / {len(self.loss_cache)}")
 
         self.generations.append(new_generation)
         self.iteration_counter += 1
@@ -144,6 +280,7 @@ class GeneticMetaheuristik(Metaheuristik):
 
         end_time = time.time()
         self.iteration_times.append(end_time - start_time)
+        self.phase_timer.add_phase("iteration", end_time - start_time)
         print("Iteration time (current/avr/max/min): {} / {} / {} / {}  (minutes)".format(
             round((self.iteration_times[-1]/60), 2),
             round((sum(self.iteration_times)/len(self.iteration_times) / 60), 2),
@@ -153,6 +290,57 @@ class GeneticMetaheuristik(Metaheuristik):
 
         #
 
+    def create_initial_population(self, population_size):
+        """
+        Creates the random initial solutions at once, the random draws are made in the worker processes if enabled.
+        Solution i always uses the random stream (seed, i), so a seed gives the same population for any number of workers.
+        """
+        use_pool = self.konfiguration.get("parallel_initial_population", False) and self.worker_pool is not None
+        if use_pool and self.worker_pool.use_for(population_size):
+            return self.worker_pool.create_initial_population(self.seed, population_size)
+
+        rngs = [make_rng(self.seed, STREAM_INITIAL_POPULATION, 0, i) for i in range(population_size)]
+        return GeneticUtils.create_new_possible_solutions(self.instance, rngs)
+
+
+    def create_offspring(self, offspring_tasks, first_child_idx=0):
+        """
+        Creates the children of the given (offspring_type, parents) tasks, in the worker processes if enabled.
+        Child i always uses the random stream (seed, iteration, first_child_idx + i), so a seed gives the same run for any number of workers.
+        The creation time of every child is added to the phase timer by its birth type.
+        """
+        if self.worker_pool is not None and self.worker_pool.use_for(len(offspring_tasks)):
+            return self.worker_pool.create_offspring(offspring_tasks, self.seed, self.iteration_counter, self.phase_timer, first_child_idx)
+
+        children = []
+        for child_idx, (offspring_type, parents) in enumerate(offspring_tasks, first_child_idx):
+            start = time.perf_counter()
+            child = GeneticUtils.create_offspring(offspring_type, parents, make_rng(self.seed, STREAM_OFFSPRING, self.iteration_counter, child_idx))
+            self.phase_timer.add_operator(child.birth_type, time.perf_counter() - start)
+            children.append(child)
+        return children
+
+
+    def get_best_solutions(self, k):
+        """
+        Returns the k best solutions of the latest generation
+        """
+        return Selection(self.generations[-1]).best(k)
+
+
+    def add_migrants(self, migrants):
+        """
+        Replaces the worst solutions of the latest generation by the given solutions (e.g. from other islands)
+        """
+        for migrant in migrants:
+            migrant.birth_type = "migrant"
+        Generation(migrants).set_losses(loss_cache=self.loss_cache)
+
+        latest_generation = self.generations[-1]
+        survivors = Selection(latest_generation).best(len(latest_generation) - len(migrants))
+        self.generations[-1] = Generation(survivors + migrants)
+
+
     def bewerte_loesung(self):
         return self.generations[-1].get_best().loss
 
@@ -163,35 +351,64 @@ class GeneticMetaheuristik(Metaheuristik):
         """
         avg_loss = self.generations[-1].average_loss()
         best_solution = self.generations[-1].get_best()
+        loss_dict = best_solution.loss_dict if best_solution.loss_dict is not None else best_solution.get_loss_dict()
+
+        # one columnar record per iteration (read by MetricsUtils.load_metrics)
+        birth_types, losses, loss_components = self.generations[-1].loss_columns()
+        self.writer.append_json_line(MetricsUtils.METRICS_FILE, {
+            "iteration": self.iteration_counter,
+            "average_loss": float(avg_loss),
+            "best_loss": float(best_solution.loss),
+            "best_loss_components": [float(c) for c in loss_dict],
+            "birth_types": birth_types,
+            "losses": losses,
+            "loss_components": loss_components
+        })
+
+        # the records are formatted and written by the writer (possibly in its background thread)
+        if self.legacy_loss_logs:
+            self.writer.append_line("average_losses.csv", avg_loss)
+            self.writer.append_line("best_losses.csv", best_solution.loss)
+            self.writer.append_line("best_solution_loss_dict.csv", loss_dict)
+            self.writer.append_line("detailed_generation_loss.csv", self.generations[-1].dict_all_inds_loss())
 
-        avg_path = os.path.join(self.durchlauf_verzeichnis, "average_losses.csv")
-        best_path = os.path.join(self.durchlauf_verzeichnis, "best_losses.csv")
-        best_solution_path = os.path.join(self.durchlauf_verzeichnis, "best_solution_loss_dict.csv")
-        detailed_generation_loss_path = os.path.join(self.durchlauf_verzeichnis, f"detailed_generation_loss.csv")
-
-        with open(avg_path, 'a') as f_avg:
-            f_avg.write(f"{avg_loss}\n")
-
-        with open(best_path, 'a') as f_best:
-            f_best.write(f"{best_solution.loss}\n")
+        print(f"Logged average: {avg_loss}, best: {best_solution.loss}")
 
-        with open(best_solution_path, 'a') as f_best:
-            f_best.write(f"{best_solution.get_loss_dict()}\n")
+        # save in ouput directory
+        self.write_snapshot(best_solution, self.iteration_counter)
 
-        with open(detailed_generation_loss_path, 'a') as f_best:
-            f_best.write(f"{self.generations[-1].dict_all_inds_loss()}\n")
+        if self.checkpoint_interval and self.iteration_counter % self.checkpoint_interval == 0:
+            self.writer.flush() # the logs contain all iterations of the checkpoint
+            print(f"Saved checkpoint {self.save_checkpoint()}")
 
-        print(f"Logged average: {avg_loss}, best: {best_solution.loss}")
 
-        # save in ouput directory
-        best_solution.write_solution_to_file(self.durchlauf_verzeichnis, self.iteration_counter, self.start_time)
+    def write_snapshot(self, solution, iteration):
+        """
+        Writes evacuation_result_iteration_N.json of the given solution (iteration 1 and then every snapshot_interval iterations)
+        """
+        if (iteration - 1) % self.snapshot_interval == 0:
+            self.writer.write_json(f"evacuation_result_iteration_{iteration}.json", solution.convert_to_desired_format(iteration, self.start_time))
 
 
     def gebe_endloesung_aus(self):
         best_solution = self.get_best_solution()
+        if self.instance.load_bucket_size:
+            # the losses of the run are approximated on the time grid, the final solution is re-scored with the exact sweep
+            best_solution.set_loss(best_solution.get_exact_loss_dict())
+            return best_solution.convert_to_desired_format(len(self.generations), self.start_time), best_solution.loss
         return best_solution.convert_to_desired_format(len(self.generations), self.start_time), self.bewerte_loesung()
 
     
     def get_best_solution(self):
         return self.generations[-1].get_best() 
 
+
+    def close(self):
+        """
+        Stops the worker processes (if any) and writes the queued results
+        """
+        if self.worker_pool is not None:
+            self.worker_pool.close()
+            self.worker_pool = None
+        self.writer.close()
+
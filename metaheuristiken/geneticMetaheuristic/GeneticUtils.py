@@ -1,22 +1,35 @@
-import random
-from copy import deepcopy
 from metaheuristiken.geneticMetaheuristic.PossibleSolution import PossibleSolution
-from metaheuristiken.geneticMetaheuristic.Route import Route
+from metaheuristiken.geneticMetaheuristic.Genome import Genome
+from metaheuristiken.geneticMetaheuristic.ClusterMapper import ClusterMapper
+from metaheuristiken.geneticMetaheuristic.RandomUtils import get_rng, weighted_choice
+from metaheuristiken.geneticMetaheuristic import RepairUtils
 import numpy as np
 import math
-from collections import defaultdict
 
-def select_two_by_roulette(population):
+def create_offspring(offspring_type, parents, rng):
     """
-    Taking the Roulette Function randomly selecting two solutions. Low less functions makes the solution more likeley to get picked
+    Creates one child of the given type ("crossover", "mutation" or "repaired") from its selected parents.
+    All random decisions are taken from the given generator, so a child only depends on its parents and its stream.
     """
-    EPSILON = 1e-8  # To avoid division by zero
-    weights = [1 / (ind.loss + EPSILON) for ind in population]
-    selected = random.choices(population, weights=weights, k=2)
-    return selected[0], selected[1]
+    if offspring_type == "crossover":
+        return mutation_crossover(parents[0], parents[1], rng=rng)
 
+    if offspring_type == "mutation":
+        return apply_mutation(
+            possible_solution=parents[0],
+            route_change_rate=int(rng.integers(20, 90))/100,
+            rng=rng
+        )
 
-def mutation_crossover(parent1, parent2, all_prs, mutation_rate=0.2):
+    if offspring_type == "repaired":
+        repaired = RepairUtils.repair_possible_solution(parents[0].clone(), rng)
+        repaired.birth_type = "repaired"
+        return repaired
+
+    raise ValueError(f"Unknown offspring type {offspring_type}")
+
+
+def mutation_crossover(parent1, parent2, mutation_rate=0.2, rng=None):
     """
     Mutation Method
     Uses the "crossover" method to combine existing solutions
@@ -24,152 +37,204 @@ def mutation_crossover(parent1, parent2, all_prs, mutation_rate=0.2):
     """
     
     # Take the first parent as a base --> clusters can't be mixed randomly but have to stay consistend
-    child = deepcopy(parent1)
+    rng = get_rng(rng)
+    child = parent1.clone()
     child.birth_type = "crossover" 
 
-    # Mix the routes goal PRs
-    crossover_point = random.randint(1, len(parent1.routes) - 1)
-    mixed_routes = (
-        deepcopy(parent1.routes[:crossover_point]) +
-        deepcopy(parent2.routes[crossover_point:])
-    )
-    
-    for i, route in enumerate(child.routes):
-        route.PR = mixed_routes[i].PR
+    if child.instance.aggregated_genome:
+        # Mix the PR splits of the RAs (the RAs before the crossover point come from parent 1, the rest from parent 2)
+        if len(child.ra_list) < 2: # no crossover point
+            return child
+        crossover_point = int(rng.integers(1, len(child.ra_list)))
+        head = parent1.genome.take(parent1.genome.ra_idx < crossover_point)
+        tail = parent2.genome.take(parent2.genome.ra_idx >= crossover_point)
+
+        # the clusters of parent 1 are kept
+        tail.cluster_idx = child.get_ra_route_clusters()[tail.ra_idx]
+
+        child.genome = Genome.concatenate([head, tail])
+    else:
+        # Mix the routes goal PRs (both parents share the same route layout, so the rows can be mixed directly)
+        if len(parent1.genome) < 2: # no crossover point
+            return child
+        crossover_point = int(rng.integers(1, len(parent1.genome)))
+        changed_routes = crossover_point + np.flatnonzero(
+            (child.genome.pr_idx[crossover_point:] != parent2.genome.pr_idx[crossover_point:])
+            | (child.genome.distance[crossover_point:] != parent2.genome.distance[crossover_point:])
+        )
+        child.genome.pr_idx[changed_routes] = parent2.genome.pr_idx[changed_routes]
+        child.genome.distance[changed_routes] = parent2.genome.distance[changed_routes]
+        child.mark_changed_routes(changed_routes)
 
     # Apply mutation randomly depending on mutation rate in crossover
-    if random.random() < mutation_rate:
-        child = apply_mutation(child, all_prs)
+    if rng.random() < mutation_rate:
+        child = apply_mutation(child, rng=rng)
         child.birth_type = "crossover_mutated" 
 
     return child
 
 
-def apply_mutation(possible_solution, all_prs, route_change_rate=0.5, reclustering_rate=0.5):
+def apply_mutation(possible_solution, route_change_rate=0.5, reclustering_rate=0.5, rng=None):
     """
     Mutation Method
     Applies slight random Mutation on existing solutions
     """
-    new_possible_solution = deepcopy(possible_solution)
+    rng = get_rng(rng)
+    new_possible_solution = possible_solution.clone()
     new_possible_solution.birth_type = "mutation"
 
     # ---------
     # Mutation 1: Reorder the cluster distribution
-    if random.random() > reclustering_rate: 
-        k = random.random()
+    if rng.random() > reclustering_rate: 
+        k = rng.random()
         if k < 0.4:
-            new_possible_solution.cluster_mapper.recluster_population()
+            new_possible_solution.cluster_mapper.recluster_population(rng, new_possible_solution.instance.balanced_reclustering)
         else:
-            for ra in new_possible_solution.ra_list:
-                if random.random() < 0.3: # todo maybe configurable but its neglectable
-                    new_possible_solution.cluster_mapper.reassign_random_ra(ra["id"])
+            for ra_idx in range(len(new_possible_solution.ra_list)):
+                if rng.random() < 0.3: # todo maybe configurable but its neglectable
+                    new_possible_solution.cluster_mapper.reassign_random_ra_idx(ra_idx, rng)
+        if new_possible_solution.instance.recluster_routes:
+            new_possible_solution.update_route_clusters()
 
     # ---------
     # Mutation 2: Cluster Start Times
     for cluster in new_possible_solution.cluster_mapper.clusters:
-        if random.random() < 0.25: # todo check if all these probs should go in conf, i think not
-            new_starting_time = cluster.start_time + random.randrange(-5000, 5000) # todo set step size variable
+        if rng.random() < 0.25: # todo check if all these probs should go in conf, i think not
+            new_starting_time = cluster.start_time + int(rng.integers(-5000, 5000)) # todo set step size variable
             cluster.start_time = math.floor(max(0, new_starting_time)) # floor just to have nice starting times
 
     # ---------
     # Mutation 3: Route PR Goals
 
-    # precompute selection weights
-    # Pre-index PRs for O(1) lookup
-    pr_dict = {pr["id"]: pr for pr in all_prs}
-
-    # Pre-group edges by RA
-    edges_by_ra = defaultdict(list)
-    for edge in new_possible_solution.edges_list:
-        edges_by_ra[edge["from"]].append(edge)
-
-    # Precompute selection weights
-    ra_edge_selection_weights = {}
-    for ra in set(route.RA for route in new_possible_solution.routes):
-        available_edges = edges_by_ra[ra]
-
-        weights_distance = np.array([
-            1 / max(0.001, float(edge["distance_km"])) for edge in available_edges
-        ])
-        weights_capacity = np.array([
-            pr_dict[edge["to"]]["capacity"] for edge in available_edges
-        ])
-
-        normalized_weights_distance = safe_min_max_normalize(weights_distance)
-        normalized_weights_capacity = safe_min_max_normalize(weights_capacity)
-
-        ra_edge_selection_weights[ra] = {
-            "edges": available_edges,
-            "distance_weights": normalized_weights_distance,
-            "capacity_weights": normalized_weights_capacity,
-        }
-        
+    # the PR candidates and weights of every RA are precomputed in the ProblemIndex
+    index = new_possible_solution.instance.index
+
+    if new_possible_solution.instance.aggregated_genome:
+        mutate_aggregated_route_prs(new_possible_solution, route_change_rate, rng)
+        return new_possible_solution
+
     # than update route PR based on weights and mutation rate
-    for route in new_possible_solution.routes:
-        if random.random() < route_change_rate:
-            data = ra_edge_selection_weights[route.RA]
-            edges = data["edges"]
-            weights = 0.5 * data["distance_weights"] + 4 * data["capacity_weights"]
+    genome = new_possible_solution.genome
+    changed_routes = np.flatnonzero(rng.random(len(genome)) < route_change_rate)
+    changed_routes = changed_routes[np.argsort(genome.ra_idx[changed_routes], kind="stable")] # group the routes by RA
+    changed_ras, ra_starts = np.unique(genome.ra_idx[changed_routes], return_index=True)
+
+    for ra, routes_to_change in zip(changed_ras.tolist(), np.split(changed_routes, ra_starts[1:])):
+        pr_candidates, distances, weights = index.edge_selection(ra)
 
-            # Sample new edge based on combined weights
-            route.PR = random.choices(edges, weights=weights, k=1)[0]["to"]
+        # Sample new edges based on combined weights
+        new_edges = weighted_choice(rng, weights, k=len(routes_to_change))
+        genome.pr_idx[routes_to_change] = pr_candidates[new_edges]
+        genome.distance[routes_to_change] = distances[new_edges]
+    new_possible_solution.mark_changed_routes(changed_routes)
 
     return new_possible_solution
      
 
-def create_new_possible_solution(pr_list, ra_list, edges_list, max_street_capacity, num_clusters, route_group_size=1):
+def mutate_aggregated_route_prs(possible_solution, route_change_rate, rng):
+    """
+    Route PR mutation for the aggregated genome.
+    Every person of a (RA, PR) split changes its PR with the route_change_rate (like with route_group_size=1),
+    the moving people are distributed over the new PRs by the same weights as the single routes.
+    """
+    genome = possible_solution.genome
+    moving_people = rng.binomial(genome.group_size, route_change_rate)
+    genome.group_size -= moving_people.astype(np.int32)
+
+    # the moving people of all splits of one RA share the same weights and can be distributed at once
+    people_per_ra = np.bincount(genome.ra_idx, weights=moving_people, minlength=len(possible_solution.ra_list)).astype(np.int64)
+    ra_cluster_idx = possible_solution.get_ra_route_clusters()
+
+    new_splits = []
+    for ra in np.flatnonzero(people_per_ra).tolist():
+        pr_candidates, distances, weights = possible_solution.instance.index.edge_selection(ra)
+        moved = rng.multinomial(people_per_ra[ra], weights / weights.sum())
+        targets = np.flatnonzero(moved)
+
+        new_splits.append(Genome(
+            ra_idx=np.full(len(targets), ra),
+            pr_idx=pr_candidates[targets],
+            distance=distances[targets],
+            cluster_idx=np.full(len(targets), ra_cluster_idx[ra]),
+            group_size=moved[targets]
+        ))
+
+    possible_solution.genome = Genome.concatenate([genome] + new_splits).aggregated(len(possible_solution.pr_list))
+
+
+def create_new_possible_solution(instance, rng=None):
+    """
+    Generates one random solution (see create_new_possible_solutions)
+    """
+    return create_new_possible_solutions(instance, [get_rng(rng)])[0]
+
+
+def create_new_possible_solutions(instance, rngs):
     """
-    Optimized version of generating a random solution.
+    Optimized version of generating random solutions, one solution per given generator, all built at once.
     Each RA is assigned to a PR once, and then replicated by population.
+    Solution i only draws from rngs[i], so it is the same no matter with which other solutions (or in which process) it is created.
     """
-    possible_solution = PossibleSolution(
-        max_street_capacity=max_street_capacity,
-        pr_list=pr_list,
-        ra_list=ra_list,
-        edges_list=edges_list,
-        num_clusters=num_clusters,
-        birth_type="new_random"
-    )
-
-    # Precompute PR IDs and edge lookup dictionary
-    pr_ids = [pr["id"] for pr in pr_list]
-    edge_dict = {(edge["from"], edge["to"]): float(edge["distance_km"]) * 1000 for edge in edges_list}
-
-    rescue_routes = []
-
-    for ra in ra_list:
-        ra_id = ra["id"]
-        ra_cluster = possible_solution.cluster_mapper.find_RA_cluster(ra_id)
-
-        # Select one random PR for this RA
-        target_pr_id = random.choice(pr_ids)
-        distance = edge_dict.get((ra_id, target_pr_id))  # Use 0 or raise if missing
-
-        # Create the routes for all groups
-        full_groups = ra["population"] // route_group_size
-        remainder = ra["population"] % route_group_size
-
-        computed_route_group_sizes = [route_group_size] * full_groups
-        if remainder:
-            computed_route_group_sizes.append(remainder)
-
-        rescue_routes.extend([
-            Route(
-                ra_id=ra_id,
-                pr_id=target_pr_id,
-                distance=distance,
-                cluster=ra_cluster,
-                group_size=group_size
-            ) for group_size in computed_route_group_sizes
-        ])
-
-    possible_solution.routes = rescue_routes
-    return possible_solution
-
-
-def safe_min_max_normalize(arr):
-    min_val = np.min(arr)
-    max_val = np.max(arr)
-    if max_val == min_val:
-        return np.ones_like(arr, dtype=float)
-    return (arr - min_val) / (max_val - min_val)
+    return build_new_possible_solutions(instance, *draw_new_possible_solutions(instance, rngs))
+
+
+def draw_new_possible_solutions(instance, rngs):
+    """
+    Random part of the new solutions (only arrays per RA and cluster, small enough to send between processes):
+    the cluster start times, the cluster of every RA and one target PR per RA of every solution
+    """
+    num_ras = len(instance.ra_list)
+
+    # random draws of every solution: RA order for the cluster distribution, cluster start times and one PR per RA
+    permutations, start_times, target_prs = [], [], []
+    for rng in rngs:
+        permutations.append(rng.permutation(num_ras))
+        start_times.append(rng.integers(0, int(instance.max_start_time), size=instance.num_clusters).tolist())
+        target_prs.append(rng.integers(len(instance.pr_list), size=num_ras).astype(np.int32))
+
+    assignments = ClusterMapper.lowest_population_assignments(instance, np.array(permutations, dtype=np.int64).reshape(len(rngs), num_ras))
+    return start_times, list(assignments), target_prs
+
+
+def build_new_possible_solutions(instance, start_times, assignments, target_prs):
+    """
+    Expands the drawn RA assignments of draw_new_possible_solutions to the routes of the solutions
+    """
+    ra_idx, group_size = get_route_layout(instance)
+    all_ras = np.arange(len(instance.ra_list))
+
+    possible_solutions = []
+    for solution_start_times, assignment, ra_target_prs in zip(start_times, assignments, target_prs):
+        ra_distances = instance.index.distance_m[all_ras, ra_target_prs]  # nan if the edge is missing
+        genome = Genome(
+            ra_idx=ra_idx.copy(),
+            pr_idx=ra_target_prs[ra_idx],
+            distance=ra_distances[ra_idx],
+            cluster_idx=assignment[ra_idx],
+            group_size=group_size.copy()
+        )
+        possible_solutions.append(PossibleSolution.from_state(instance, (genome, (solution_start_times, assignment), "new_random")))
+
+    return possible_solutions
+
+
+def get_route_layout(instance):
+    """
+    Returns the RA index and the group size of every route of a new solution (the routes of an RA are its population split
+    into groups of route_group_size, the last group takes the remainder; the aggregated genome has one route per RA)
+    """
+    population = instance.ra_population
+    if instance.aggregated_genome:
+        populated = np.flatnonzero(population > 0)
+        return populated.astype(np.int32), population[populated].astype(np.int32)
+
+    route_group_size = instance.route_group_size
+    remainders = population % route_group_size
+    routes_per_ra = population // route_group_size + (remainders > 0)
+
+    ra_idx = np.repeat(np.arange(len(population), dtype=np.int32), routes_per_ra)
+    group_size = np.full(len(ra_idx), route_group_size, dtype=np.int32)
+    with_remainder = remainders > 0
+    group_size[np.cumsum(routes_per_ra)[with_remainder] - 1] = remainders[with_remainder]
+    return ra_idx, group_size
+
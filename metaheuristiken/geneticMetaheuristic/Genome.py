@@ -0,0 +1,77 @@
+import numpy as np
+
+
+class Genome:
+    """
+    Structure-of-arrays storage for the routes of a PossibleSolution.
+    Row i of all arrays describes one route (a group of people walking from an RA to a PR).
+    RAs, PRs and clusters are stored as integer indices into ra_list, pr_list and cluster_mapper.clusters.
+    """
+    __slots__ = ("ra_idx", "pr_idx", "distance", "cluster_idx", "group_size")
+
+    def __init__(self, ra_idx, pr_idx, distance, cluster_idx, group_size):
+        self.ra_idx = np.asarray(ra_idx, dtype=np.int32)
+        self.pr_idx = np.asarray(pr_idx, dtype=np.int32)
+        self.distance = np.asarray(distance, dtype=np.float64) # distance in meters (not km like in json)
+        self.cluster_idx = np.asarray(cluster_idx, dtype=np.int32)
+        self.group_size = np.asarray(group_size, dtype=np.int32)
+
+
+    def __len__(self):
+        return len(self.ra_idx)
+
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(#routes={len(self)}, bytes={self.nbytes})"
+
+
+    @property
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self.__slots__)
+
+
+    def copy(self):
+        return Genome(
+            self.ra_idx.copy(),
+            self.pr_idx.copy(),
+            self.distance.copy(),
+            self.cluster_idx.copy(),
+            self.group_size.copy()
+        )
+
+
+    def take(self, rows):
+        """
+        Returns a new genome with the given rows (indices or boolean mask)
+        """
+        return Genome(
+            self.ra_idx[rows],
+            self.pr_idx[rows],
+            self.distance[rows],
+            self.cluster_idx[rows],
+            self.group_size[rows]
+        )
+
+
+    def aggregated(self, num_prs):
+        """
+        Returns the aggregated form of this genome: one row per (RA, PR) pair carrying all people of that pair,
+        ordered by RA and PR. Rows without people are dropped.
+        """
+        keys = self.ra_idx.astype(np.int64) * num_prs + self.pr_idx
+        _, first_rows, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        people = np.bincount(inverse, weights=self.group_size, minlength=len(first_rows)).astype(np.int32)
+
+        aggregated_genome = self.take(first_rows[people > 0])
+        aggregated_genome.group_size = people[people > 0]
+        return aggregated_genome
+
+
+    @classmethod
+    def concatenate(cls, genomes):
+        return cls(*(np.concatenate([getattr(g, name) for g in genomes]) for name in cls.__slots__))
+
+
+    @classmethod
+    def empty(cls):
+        return cls([], [], [], [], [])
@@ -0,0 +1,193 @@
+"""
+Generator of synthetic evacuation instances in the input format (residential_areas, places_of_refuge, edges).
+
+    python -m metaheuristiken.geneticMetaheuristic.InstanceGeneratorUtils data/input/large_evacuation_data.json --num-ras 100000 --num-prs 500
+
+RAs and PRs are placed randomly on a square area, every RA is connected to its nearest PRs (edge_density is the share
+of PRs connected to each RA, by default all like in the given instances, the random initial solutions of the
+GeneticMetaheuristik expect every edge to exist) with the distance of a random detour. The instance only depends on
+the parameters and the seed. The RAs are generated in fixed chunks with their own random streams, so write_instance streams arbitrarily
+large instances to disk with the memory of one chunk.
+"""
+from metaheuristiken.geneticMetaheuristic.RandomUtils import make_rng
+import numpy as np
+import argparse
+import json
+
+RA_CHUNK_SIZE = 4096 # RAs per random stream, changing it changes the generated instances
+DISTANCE_BLOCK_CELLS = 2**20 # max. RA x PR distances computed at once
+
+POPULATION_DISTRIBUTIONS = ("uniform", "lognormal", "pareto")
+
+# kinds of random streams of the generator
+_STREAM_PR_CAPACITIES = 0
+_STREAM_PR_COORDINATES = 1
+_STREAM_RAS = 2
+
+
+def generate_instance(num_ras, num_prs, seed=0, **parameters):
+    """
+    Returns the instance as dict (same as json.load of the file written by write_instance)
+    """
+    return {
+        "residential_areas": [ra for chunk in iter_residential_area_chunks(num_ras, seed, **parameters) for ra in chunk],
+        "places_of_refuge": places_of_refuge(num_ras, num_prs, seed, **parameters),
+        "edges": [edge for chunk in iter_edge_chunks(num_ras, num_prs, seed, **parameters) for edge in chunk]
+    }
+
+
+def write_instance(path, num_ras, num_prs, seed=0, **parameters):
+    """
+    Writes the instance as json file chunk by chunk, the RAs and edges are never held in memory at once
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"residential_areas": [')
+        _write_chunks(f, (", ".join(json.dumps(ra) for ra in chunk) for chunk in iter_residential_area_chunks(num_ras, seed, **parameters)))
+        f.write('], "places_of_refuge": [')
+        _write_chunks(f, [", ".join(json.dumps(pr) for pr in places_of_refuge(num_ras, num_prs, seed, **parameters))])
+        f.write('], "edges": [')
+        # the edges are formatted directly (same text as json.dumps of the edge dicts, but much faster)
+        _write_chunks(f, (
+            ", ".join(
+                f'{{"from": "RA_{start + i}", "to": "PR_{j}", "distance_km": {d!r}}}'
+                for i, (pr_row, distance_row) in enumerate(zip(nearest.tolist(), distances.tolist()))
+                for j, d in zip(pr_row, distance_row)
+            )
+            for start, nearest, distances in _iter_edge_arrays(num_ras, num_prs, seed, **parameters)
+        ))
+        f.write(']}\n')
+
+
+def iter_residential_area_chunks(num_ras, seed=0, population_distribution="lognormal", mean_population=250, **_):
+    """
+    Yields the RAs ({"id", "population"}) in chunks of RA_CHUNK_SIZE
+    """
+    for start, populations, _ in _iter_ra_chunks(num_ras, seed, population_distribution, mean_population, area_km=1.0):
+        yield [{"id": f"RA_{start + i}", "population": p} for i, p in enumerate(populations.tolist())]
+
+
+def places_of_refuge(num_ras, num_prs, seed=0, population_distribution="lognormal", mean_population=250, capacity_slack=0.2, **_):
+    """
+    Returns the PRs ({"id", "capacity"}), their total capacity is (1 + capacity_slack) times the city population
+    """
+    city_population = sum(int(populations.sum()) for _, populations, _ in _iter_ra_chunks(num_ras, seed, population_distribution, mean_population, area_km=1.0))
+    shares = make_rng(seed, _STREAM_PR_CAPACITIES).uniform(0.5, 1.5, size=num_prs)
+    capacities = np.floor(shares / shares.sum() * city_population * (1 + capacity_slack)).astype(np.int64)
+    return [{"id": f"PR_{j}", "capacity": c} for j, c in enumerate(capacities.tolist())]
+
+
+def iter_edge_chunks(num_ras, num_prs, seed=0, **parameters):
+    """
+    Yields the edges ({"from", "to", "distance_km"}) in chunks of RA_CHUNK_SIZE RAs.
+    Every RA is connected to its max(1, round(edge_density * num_prs)) nearest PRs, the distance is the straight
+    line distance times a random detour factor between 1 and max_detour (at least 10m).
+    """
+    for start, nearest, distances in _iter_edge_arrays(num_ras, num_prs, seed, **parameters):
+        yield [
+            {"from": f"RA_{start + i}", "to": f"PR_{j}", "distance_km": d}
+            for i, (pr_row, distance_row) in enumerate(zip(nearest.tolist(), distances.tolist()))
+            for j, d in zip(pr_row, distance_row)
+        ]
+
+
+def default_area_km(num_ras):
+    """
+    Side length of the area, grows with the number of RAs (about 4 RAs per square km, at least 5km)
+    """
+    return max(5.0, float(np.sqrt(num_ras / 4)))
+
+
+def _iter_edge_arrays(num_ras, num_prs, seed, population_distribution="lognormal", mean_population=250, edge_density=1.0, area_km=None, max_detour=1.5, **_):
+    """
+    Yields (first RA index, PR indices, distances in km) of the edges of every chunk of RAs (one row per RA)
+    """
+    area_km = area_km if area_km is not None else default_area_km(num_ras)
+    num_edges_per_ra = min(num_prs, max(1, round(edge_density * num_prs)))
+    pr_coordinates = make_rng(seed, _STREAM_PR_COORDINATES).uniform(0, area_km, size=(num_prs, 2))
+    block_rows = max(1, DISTANCE_BLOCK_CELLS // num_prs)
+
+    for start, _, (ra_coordinates, detours) in _iter_ra_chunks(num_ras, seed, population_distribution, mean_population, area_km, num_edges_per_ra, max_detour):
+        nearest, distances = [], []
+        for block_start in range(0, len(ra_coordinates), block_rows):
+            block = ra_coordinates[block_start:block_start + block_rows]
+            block_distances = np.hypot(block[:, None, 0] - pr_coordinates[None, :, 0], block[:, None, 1] - pr_coordinates[None, :, 1])
+            if num_edges_per_ra < num_prs:
+                block_nearest = np.argpartition(block_distances, num_edges_per_ra - 1, axis=1)[:, :num_edges_per_ra]
+            else:
+                block_nearest = np.broadcast_to(np.arange(num_prs), block_distances.shape)
+            block_nearest = np.sort(block_nearest, axis=1)
+            nearest.append(block_nearest)
+            distances.append(np.take_along_axis(block_distances, block_nearest, axis=1))
+
+        nearest = np.concatenate(nearest)
+        distances = np.round(np.maximum(np.concatenate(distances) * detours, 0.01), 3)
+        yield start, nearest, distances
+
+
+def _iter_ra_chunks(num_ras, seed, population_distribution, mean_population, area_km, num_edges_per_ra=0, max_detour=1.5):
+    """
+    Yields (first RA index, populations, (coordinates, detour factors of the edges)) of every chunk of RAs.
+    All values of a chunk are drawn from its own stream in a fixed order, so every caller sees the same RAs.
+    """
+    if population_distribution not in POPULATION_DISTRIBUTIONS:
+        raise ValueError(f"Unknown population distribution {population_distribution}, use one of {POPULATION_DISTRIBUTIONS}")
+
+    for chunk_idx, start in enumerate(range(0, num_ras, RA_CHUNK_SIZE)):
+        size = min(RA_CHUNK_SIZE, num_ras - start)
+        rng = make_rng(seed, _STREAM_RAS, chunk_idx)
+
+        if population_distribution == "uniform":
+            populations = rng.uniform(0, 2 * mean_population, size=size)
+        elif population_distribution == "lognormal":
+            sigma = 0.75
+            populations = rng.lognormal(np.log(mean_population) - sigma**2 / 2, sigma, size=size)
+        else:
+            alpha = 2.5 # heavy tail: few very large RAs
+            populations = (rng.pareto(alpha, size=size) + 1) * mean_population * (alpha - 1) / alpha
+        populations = np.maximum(np.round(populations), 1).astype(np.int64)
+
+        coordinates = rng.uniform(0, area_km, size=(size, 2))
+        detours = rng.uniform(1.0, max_detour, size=(size, num_edges_per_ra))
+        yield start, populations, (coordinates, detours)
+
+
+def _write_chunks(f, chunks):
+    """
+    Writes the formatted chunks (comma separated json values) as one comma separated list
+    """
+    first = True
+    for chunk in chunks:
+        if not chunk:
+            continue
+        if not first:
+            f.write(", ")
+        f.write(chunk)
+        first = False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic evacuation instance")
+    parser.add_argument("path", help="output json file")
+    parser.add_argument("--num-ras", type=int, required=True)
+    parser.add_argument("--num-prs", type=int, required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--population-distribution", choices=POPULATION_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--mean-population", type=float, default=250)
+    parser.add_argument("--capacity-slack", type=float, default=0.2, help="total PR capacity is (1 + slack) times the population")
+    parser.add_argument("--edge-density", type=float, default=1.0, help="share of the PRs connected to every RA")
+    parser.add_argument("--area-km", type=float, help="side length of the area (default grows with the number of RAs)")
+    args = parser.parse_args(argv)
+
+    write_instance(
+        args.path, args.num_ras, args.num_prs, args.seed,
+        population_distribution=args.population_distribution,
+        mean_population=args.mean_population,
+        capacity_slack=args.capacity_slack,
+        edge_density=args.edge_density,
+        area_km=args.area_km
+    )
+    print(f"Instance saved to: {args.path}")
+
+
+if __name__ == "__main__":
+    main()
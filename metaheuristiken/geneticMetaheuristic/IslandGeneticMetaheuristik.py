@@ -0,0 +1,172 @@
+from metaheuristiken.geneticMetaheuristic.GeneticMetaheuristik import GeneticMetaheuristik
+from metaheuristiken.geneticMetaheuristic.Generation import Generation
+from metaheuristiken.geneticMetaheuristic.PossibleSolution import PossibleSolution
+from metaheuristiken.geneticMetaheuristic.RandomUtils import derive_seed, STREAM_ISLAND
+import multiprocessing
+import os
+import time
+
+
+def _run_island(connection, instanz_daten, konfiguration, durchlauf_verzeichnis):
+    """
+    Main loop of an island process: a normal GeneticMetaheuristik controlled by commands from the main process
+    """
+    mh = GeneticMetaheuristik(instanz_daten, konfiguration, durchlauf_verzeichnis)
+
+    while True:
+        command, argument = connection.recv()
+
+        if command == "initialisiere":
+            mh.initialisiere()
+        elif command == "iteriere":
+            mh.iteriere()
+        elif command == "emigrants":
+            connection.send([ps.get_state() for ps in mh.get_best_solutions(argument)])
+            continue
+        elif command == "immigrants":
+            mh.add_migrants([PossibleSolution.from_state(mh.instance, state) for state in argument])
+        elif command == "close":
+            mh.close()
+            connection.send(None)
+            return
+
+        # report the best solution of the island after every change of its population
+        best_solution = mh.get_best_solution()
+        connection.send((best_solution.get_state(), best_solution.loss_dict))
+
+
+class IslandGeneticMetaheuristik(GeneticMetaheuristik):
+    """
+    Island model: num_islands independent populations evolve in separate processes and exchange their best
+    individuals every migration_interval iterations (ring or fully connected topology).
+    The generations of this class contain the best solution of every island, so the existing outputs of
+    speichere_zwischenergebnis report the global best (and the average over the island bests).
+    """
+    def __init__(self, instanz_daten, konfiguration, durchlauf_verzeichnis):
+        super().__init__(instanz_daten, konfiguration, durchlauf_verzeichnis)
+
+        self.num_islands = konfiguration.get("num_islands", 4)
+        self.migration_interval = konfiguration.get("migration_interval", 5)
+        self.migration_topology = konfiguration.get("migration_topology", "ring")
+        self.num_migrants = konfiguration.get("num_migrants", 2)
+        assert self.migration_topology in ["ring", "fully_connected"], f"Unknown migration topology {self.migration_topology}"
+        assert not self.checkpoint_interval, "Checkpoints are not supported for the island model (the populations live in the island processes)"
+
+        self.islands = [] # (process, connection) of every island
+
+
+    def initialisiere(self):
+        # the instance is only needed to rebuild the reported solutions of the islands
+        self.load_instance()
+
+        for i in range(self.num_islands):
+            island_konfiguration = dict(self.konfiguration)
+            island_konfiguration["seed"] = derive_seed(self.seed, STREAM_ISLAND, i)
+            island_konfiguration["num_workers"] = 1 # every island already is a process
+
+            connection, island_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=_run_island,
+                args=(island_connection, self.eingabe_daten, island_konfiguration, os.path.join(self.durchlauf_verzeichnis, f"island_{i}")),
+                daemon=True
+            )
+            process.start()
+            # only the island process holds its end of the pipe, so recv raises an EOFError if the island dies
+            island_connection.close()
+            self.islands.append((process, connection))
+
+        self.generations.append(self.send_to_islands("initialisiere"))
+        self.write_snapshot(self.generations[-1].get_best(), 1)
+        self.iteration_counter = 1
+
+
+    def iteriere(self):
+        start_time = time.time()
+
+        new_generation = self.send_to_islands("iteriere")
+        self.iteration_counter += 1
+
+        if self.iteration_counter % self.migration_interval == 0:
+            print("- Migrating best individuals between the islands")
+            new_generation = self.migrate()
+
+        self.generations.append(new_generation)
+        if len(self.generations) > 3:
+            self.generations.pop(0)
+
+        self.iteration_times.append(time.time() - start_time)
+        print(f"Island iteration time: {round(self.iteration_times[-1] / 60, 2)} (minutes), island bests: {[round(float(ps.loss), 4) for ps in new_generation]}")
+
+
+    def migrate(self):
+        """
+        Sends the best individuals of every island to its neighbours (ring) or to all other islands (fully connected)
+        """
+        for i in range(len(self.islands)):
+            self.send_to_island(i, ("emigrants", self.num_migrants))
+        emigrants = [self.receive_from_island(i) for i in range(len(self.islands))]
+
+        for i in range(len(self.islands)):
+            if self.migration_topology == "ring":
+                immigrants = emigrants[i - 1]
+            else:
+                immigrants = [state for j, states in enumerate(emigrants) if j != i for state in states]
+            self.send_to_island(i, ("immigrants", immigrants))
+
+        return self.collect_island_bests()
+
+
+    def send_to_islands(self, command, argument=None):
+        """
+        Sends the command to all islands (they work in parallel) and collects their best solutions
+        """
+        for i in range(len(self.islands)):
+            self.send_to_island(i, (command, argument))
+        return self.collect_island_bests()
+
+
+    def send_to_island(self, i, message):
+        process, connection = self.islands[i]
+        try:
+            connection.send(message)
+        except (BrokenPipeError, ConnectionResetError) as error:
+            raise RuntimeError(f"Island {i} (pid {process.pid}) died with exit code {process.exitcode}") from error
+
+
+    def receive_from_island(self, i):
+        """
+        Waits for the answer of the island, raises a RuntimeError instead of blocking forever if the island process died
+        """
+        process, connection = self.islands[i]
+        try:
+            while not connection.poll(1):
+                if not process.is_alive():
+                    raise EOFError
+            return connection.recv()
+        except EOFError as error:
+            process.join(1)
+            raise RuntimeError(f"Island {i} (pid {process.pid}) died with exit code {process.exitcode}") from error
+
+
+    def collect_island_bests(self):
+        island_bests = Generation()
+        for i in range(len(self.islands)):
+            state, loss_dict = self.receive_from_island(i)
+            best_solution = PossibleSolution.from_state(self.instance, state)
+            best_solution.set_loss(loss_dict)
+            island_bests.append(best_solution)
+        return island_bests
+
+
+    def close(self):
+        """
+        Stops the island processes (the dead ones are only joined)
+        """
+        for i, (process, connection) in enumerate(self.islands):
+            if process.is_alive():
+                self.send_to_island(i, ("close", None))
+                self.receive_from_island(i)
+            process.join()
+            connection.close()
+        self.islands = []
+        super().close()
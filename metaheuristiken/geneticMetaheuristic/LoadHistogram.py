@@ -0,0 +1,195 @@
+from metaheuristiken.geneticMetaheuristic import EvaluationUtils
+import numpy as np
+from copy import copy
+
+
+class LoadHistogram:
+    """
+    Approximate street evaluation on a time grid of load_bucket_size: every cluster has a fixed load histogram (people on
+    the street and street events per bucket, relative to its start) and the street load is the sum of the histograms
+    shifted by the start buckets of the clusters. A clone is re-scored from the histogram of its parent: the changed
+    routes (new cluster, distance or group size) are removed from the histograms of their old clusters and added to the
+    new ones and the touched or shifted clusters are moved (O(buckets) per cluster) instead of sorting all street events.
+    Every event of a bucket is counted with the highest load of the bucket (and the start times are rounded down to the
+    grid), so the street overflow is only approximated, mostly overestimated.
+    Like the EvaluationCache a histogram is never changed after its creation and can be shared by clones.
+    """
+    __slots__ = (
+        "cluster_idx", "distance", "group_size",
+        "start_buckets", "cluster_loads", "cluster_events", "cluster_max_distance",
+        "loads", "events"
+    )
+
+    # above this share of changed routes the histogram is rebuilt
+    MAX_CHANGED_ROUTES = 0.25
+
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(#clusters={len(self.start_buckets)}, #buckets={len(self.loads)})"
+
+
+    @classmethod
+    def evaluate(cls, instance, genome, cluster_start_times, histogram=None, changed_routes=None):
+        """
+        Returns the histogram of the given genome, updated from the given (parent) histogram if possible
+        """
+        if histogram is None:
+            return cls.create(instance, genome, cluster_start_times)
+        return histogram.update(instance, genome, cluster_start_times, changed_routes)
+
+
+    @classmethod
+    def create(cls, instance, genome, cluster_start_times):
+        num_clusters = len(cluster_start_times)
+
+        histogram = object.__new__(cls)
+        histogram.cluster_idx = genome.cluster_idx.copy()
+        histogram.distance = genome.distance.copy()
+        histogram.group_size = genome.group_size.copy()
+
+        width = int(np.ceil(genome.distance / instance.load_bucket_size).max(initial=0)) + 1
+        histogram.cluster_loads, histogram.cluster_events = cls._route_histograms(
+            instance, genome.cluster_idx, genome.distance, genome.group_size, num_clusters, width
+        )
+
+        histogram.cluster_max_distance = np.full(num_clusters, -np.inf)
+        np.maximum.at(histogram.cluster_max_distance, genome.cluster_idx, genome.distance)
+
+        histogram.start_buckets = histogram._start_buckets(instance, cluster_start_times)
+        histogram.loads = np.zeros(int(histogram.start_buckets.max(initial=0)) + width, dtype=np.int64)
+        histogram.events = np.zeros_like(histogram.loads)
+        for cluster_idx in range(num_clusters):
+            histogram._add_cluster(cluster_idx, 1)
+        return histogram
+
+
+    @staticmethod
+    def _route_histograms(instance, rows, distance, group_size, num_rows, width):
+        """
+        Sums the load and event histograms of the given routes into the given rows (e.g. their clusters)
+        """
+        # a route is on the street in the buckets [0, ceil(distance / bucket_size)) after the start of its cluster
+        bucket_size = instance.load_bucket_size
+        group_sizes = group_size.astype(np.int64)
+        exit_buckets = np.floor(distance / bucket_size).astype(np.int64)
+        last_buckets = np.ceil(distance / bucket_size).astype(np.int64)
+
+        # the aggregated genome is evaluated like single persons (one event per person)
+        event_weights = group_sizes if instance.aggregated_genome else np.ones(len(group_sizes), dtype=np.int64)
+
+        size = num_rows * width
+        row_offsets = rows.astype(np.int64) * width
+        load_changes = np.bincount(row_offsets, weights=group_sizes, minlength=size) - \
+            np.bincount(row_offsets + last_buckets, weights=group_sizes, minlength=size)
+        events = np.bincount(row_offsets, weights=event_weights, minlength=size) + \
+            np.bincount(row_offsets + exit_buckets, weights=event_weights, minlength=size)
+        loads = np.cumsum(load_changes.reshape(num_rows, width), axis=1).round().astype(np.int64)
+        return loads, events.reshape(num_rows, width).round().astype(np.int64)
+
+
+    def update(self, instance, genome, cluster_start_times, changed_routes=None):
+        """
+        Returns the histogram of the given genome, which is derived from the genome of this histogram.
+        changed_routes are the rows changed in place since this histogram, without them the whole genome is compared.
+        The changed routes are moved between the cluster histograms and only the touched or shifted clusters are moved,
+        a changed route layout, too many changed routes or longer routes than the histogram width rebuild the histogram.
+        """
+        if len(genome) != len(self.cluster_idx):
+            return self.create(instance, genome, cluster_start_times)
+
+        if changed_routes is None:
+            changed_routes = np.arange(len(genome))
+        is_changed = (
+            (genome.cluster_idx[changed_routes] != self.cluster_idx[changed_routes])
+            | (genome.distance[changed_routes] != self.distance[changed_routes])
+            | (genome.group_size[changed_routes] != self.group_size[changed_routes])
+        )
+        changed_routes = changed_routes[is_changed]
+        if len(changed_routes) > self.MAX_CHANGED_ROUTES * len(genome):
+            return self.create(instance, genome, cluster_start_times)
+
+        width = self.cluster_loads.shape[1]
+        new_distance = genome.distance[changed_routes]
+        if np.ceil(new_distance / instance.load_bucket_size).max(initial=0) >= width:
+            return self.create(instance, genome, cluster_start_times)
+
+        start_buckets = self._start_buckets(instance, cluster_start_times)
+        old_clusters = self.cluster_idx[changed_routes]
+        new_clusters = genome.cluster_idx[changed_routes]
+        touched_clusters = np.union1d(old_clusters, new_clusters)
+        moved_clusters = np.union1d(touched_clusters, np.flatnonzero(start_buckets != self.start_buckets))
+        if len(moved_clusters) == 0:
+            return self
+
+        histogram = copy(self)
+        required_buckets = int(start_buckets.max()) + width
+        histogram.loads = np.pad(self.loads, (0, max(0, required_buckets - len(self.loads))))
+        histogram.events = np.pad(self.events, (0, max(0, required_buckets - len(self.events))))
+        for cluster_idx in moved_clusters.tolist():
+            histogram._add_cluster(cluster_idx, -1)
+
+        if len(changed_routes):
+            histogram.cluster_idx = genome.cluster_idx.copy()
+            histogram.distance = genome.distance.copy()
+            histogram.group_size = genome.group_size.copy()
+
+            # histograms of the touched clusters without the old and with the new routes
+            num_touched = len(touched_clusters)
+            old_loads, old_events = self._route_histograms(
+                instance, np.searchsorted(touched_clusters, old_clusters), self.distance[changed_routes], self.group_size[changed_routes], num_touched, width
+            )
+            new_loads, new_events = self._route_histograms(
+                instance, np.searchsorted(touched_clusters, new_clusters), new_distance, genome.group_size[changed_routes], num_touched, width
+            )
+            histogram.cluster_loads = self.cluster_loads.copy()
+            histogram.cluster_events = self.cluster_events.copy()
+            histogram.cluster_loads[touched_clusters] += new_loads - old_loads
+            histogram.cluster_events[touched_clusters] += new_events - old_events
+
+            histogram.cluster_max_distance = self.cluster_max_distance.copy()
+            np.maximum.at(histogram.cluster_max_distance, new_clusters, new_distance)
+            if (self.distance[changed_routes] >= self.cluster_max_distance[old_clusters]).any():
+                # a removed route was the longest one of its cluster
+                histogram.cluster_max_distance = np.full(len(cluster_start_times), -np.inf)
+                np.maximum.at(histogram.cluster_max_distance, genome.cluster_idx, genome.distance)
+
+        histogram.start_buckets = start_buckets
+        for cluster_idx in moved_clusters.tolist():
+            histogram._add_cluster(cluster_idx, 1)
+        return histogram
+
+
+    def _add_cluster(self, cluster_idx, sign):
+        start = self.start_buckets[cluster_idx]
+        end = start + self.cluster_loads.shape[1]
+        self.loads[start:end] += sign * self.cluster_loads[cluster_idx]
+        self.events[start:end] += sign * self.cluster_events[cluster_idx]
+
+
+    @staticmethod
+    def _start_buckets(instance, cluster_start_times):
+        return np.floor(np.maximum(cluster_start_times, 0) / instance.load_bucket_size).astype(np.int64)
+
+
+    def street_overflow_metrics(self, instance, cluster_start_times):
+        """
+        Returns the same values as EvaluationUtils.street_overflow_metrics, the overflows approximated on the time grid
+        (the time of the last event is exact)
+        """
+        overflows = np.maximum(self.loads - instance.max_street_capacity, 0)
+        amount_street_overflows = int(self.events[overflows > 0].sum())
+        street_overflow_sum = int((self.events * overflows).sum())
+
+        last_event_time = float(np.max(cluster_start_times + self.cluster_max_distance, initial=0.0))
+        longest_distance = max(0.0, float(self.distance.max()))
+        normalized_time = last_event_time / longest_distance - 1
+        return amount_street_overflows, street_overflow_sum, normalized_time, last_event_time
+
+
+    def loss_dict(self, instance, genome, cluster_start_times):
+        """
+        Weighted loss components of the genome, with the approximated street overflow
+        """
+        _, street_overflow_sum, normalized_time, _ = self.street_overflow_metrics(instance, cluster_start_times)
+        _, pr_overflows = EvaluationUtils.pr_usage(genome.pr_idx, genome.group_size, instance.pr_capacity)
+        return EvaluationUtils.weighted_loss(instance, street_overflow_sum, int(pr_overflows.sum()), normalized_time, np.sum(genome.group_size))
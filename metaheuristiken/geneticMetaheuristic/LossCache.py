@@ -0,0 +1,60 @@
+from metaheuristiken.geneticMetaheuristic.Genome import Genome
+from collections import OrderedDict
+import hashlib
+
+
+class LossCache:
+    """
+    Bounded LRU cache of the loss components of already evaluated solutions (e.g. elites carried into the next generation).
+    The key is a fingerprint of everything the loss depends on: the genome arrays and the cluster start times.
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(size={len(self.entries)}/{self.max_size}, hits={self.hits}, misses={self.misses})"
+
+
+    def __len__(self):
+        return len(self.entries)
+
+
+    @staticmethod
+    def fingerprint(possible_solution):
+        """
+        Hashes the genome and the cluster start times (much cheaper than the street sweep)
+        """
+        genome = possible_solution.genome
+        fingerprint = hashlib.blake2b(digest_size=16)
+        fingerprint.update(len(genome).to_bytes(8, "little"))
+        for name in Genome.__slots__:
+            fingerprint.update(getattr(genome, name).tobytes())
+        fingerprint.update(possible_solution.get_cluster_start_times().tobytes())
+        return fingerprint.digest()
+
+
+    def get(self, key):
+        loss_dict = self.entries.get(key)
+        if loss_dict is None:
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return loss_dict
+
+
+    def put(self, key, loss_dict):
+        self.entries[key] = loss_dict
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False) # least recently used
+
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
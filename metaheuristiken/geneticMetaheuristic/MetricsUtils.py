@@ -0,0 +1,76 @@
+import ast
+import json
+import os
+import re
+import warnings
+import numpy as np
+
+METRICS_FILE = "metrics.jsonl"
+
+
+def load_metrics(path):
+    """
+    Loads the metrics of a run directory in bulk as NumPy columns.
+    Per iteration: iteration, average_loss, best_loss, best_loss_components (n x 3)
+    Per individual: individual_iteration, birth_type, loss, loss_components (n x 3)
+    Reads metrics.jsonl and falls back to the legacy csv logs for runs without it.
+    """
+    metrics_file = os.path.join(path, METRICS_FILE)
+    if not os.path.exists(metrics_file):
+        return load_legacy_metrics(path)
+
+    with open(metrics_file, "r") as f:
+        records = json.loads("[" + ",".join(line for line in f.read().splitlines() if line.strip()) + "]")
+
+    individuals_per_iteration = [len(record["losses"]) for record in records]
+    iterations = np.array([record["iteration"] for record in records], dtype=np.int64)
+
+    return {
+        "iteration": iterations,
+        "average_loss": np.array([record["average_loss"] for record in records], dtype=np.float64),
+        "best_loss": np.array([record["best_loss"] for record in records], dtype=np.float64),
+        "best_loss_components": np.array([record["best_loss_components"] for record in records], dtype=np.float64).reshape(-1, 3),
+        "individual_iteration": np.repeat(iterations, individuals_per_iteration),
+        "birth_type": np.array([bt for record in records for bt in record["birth_types"]], dtype=str),
+        "loss": np.array([loss for record in records for loss in record["losses"]], dtype=np.float64),
+        "loss_components": np.array([c for record in records for c in record["loss_components"]], dtype=np.float64).reshape(-1, 3),
+    }
+
+
+def load_legacy_metrics(path):
+    """
+    Reads the csv logs of older runs (average_losses.csv, best_losses.csv, best_solution_loss_dict.csv and
+    detailed_generation_loss.csv) into the same columns as load_metrics. Missing files give empty columns,
+    the iterations are numbered by line and the components of the individuals are unknown (nan).
+    """
+    def read_lines(filename):
+        file_path = os.path.join(path, filename)
+        if not os.path.exists(file_path):
+            return []
+        with open(file_path, "r") as f:
+            # remove the np.float64(...), as it is not valid python literal syntax
+            return [re.sub(r'np\.float64\(([^)]+)\)', r'\1', line.strip()) for line in f if line.strip()]
+
+    average_losses = [float(line) for line in read_lines("average_losses.csv")]
+    best_losses = [float(line) for line in read_lines("best_losses.csv")]
+    best_loss_components = [ast.literal_eval(line) for line in read_lines("best_solution_loss_dict.csv")]
+
+    generations = []
+    for idx, line in enumerate(read_lines("detailed_generation_loss.csv")):
+        try:
+            generations.append(ast.literal_eval(line))
+        except Exception as e:
+            warnings.warn(f"Skipped line {idx + 1} of detailed_generation_loss.csv, it could not be parsed: {e}", RuntimeWarning)
+
+    individuals = [(gen_idx, ind["birth_type"], ind["loss"]) for gen_idx, generation in enumerate(generations) for ind in generation]
+
+    return {
+        "iteration": np.arange(len(average_losses), dtype=np.int64),
+        "average_loss": np.array(average_losses, dtype=np.float64),
+        "best_loss": np.array(best_losses, dtype=np.float64),
+        "best_loss_components": np.array(best_loss_components, dtype=np.float64).reshape(-1, 3),
+        "individual_iteration": np.array([ind[0] for ind in individuals], dtype=np.int64),
+        "birth_type": np.array([ind[1] for ind in individuals], dtype=str),
+        "loss": np.array([ind[2] for ind in individuals], dtype=np.float64),
+        "loss_components": np.full((len(individuals), 3), np.nan),
+    }
@@ -0,0 +1,47 @@
+from contextlib import contextmanager
+import time
+
+
+class PhaseTimer():
+    """
+    Records the wall time and number of calls of named phases (e.g. the steps of an iteration)
+    and of the offspring operators (by birth type) for one generation.
+    """
+    def __init__(self):
+        self.phases = {}
+        self.operators = {}
+
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(phases={list(self.phases)}, operators={list(self.operators)})"
+
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_phase(name, time.perf_counter() - start)
+
+
+    def add_phase(self, name, seconds, calls=1):
+        self._add(self.phases, name, seconds, calls)
+
+
+    def add_operator(self, birth_type, seconds, calls=1):
+        self._add(self.operators, birth_type, seconds, calls)
+
+
+    def as_record(self):
+        """
+        Returns the recorded times as json serializable dict {"phases": {name: {"seconds", "calls"}}, "operators": {...}}
+        """
+        return {"phases": self.phases, "operators": self.operators}
+
+
+    @staticmethod
+    def _add(timings, name, seconds, calls):
+        timing = timings.setdefault(name, {"seconds": 0.0, "calls": 0})
+        timing["seconds"] += seconds
+        timing["calls"] += calls
@@ -2,35 +2,24 @@ import matplotlib.pyplot as plt
 import os
 import random
 import matplotlib.cm as cm
-import ast
 import numpy as np
-from collections import defaultdict
-import re
+from metaheuristiken.geneticMetaheuristic.MetricsUtils import load_metrics
 
 def plot_losses(path):
     """
-    Plots the average and best losses from text files in the given directory.
+    Plots the average and best losses of the run in the given directory.
     
     Args:
-        path (str): Directory containing 'average_losses.txt' and 'best_losses.txt'
+        path (str): Run directory containing 'metrics.jsonl' (or the legacy 'average_losses.csv' and 'best_losses.csv')
     """
-    avg_file = os.path.join(path, "average_losses.csv")
-    best_file = os.path.join(path, "best_losses.csv")
-
-    if not os.path.exists(avg_file) or not os.path.exists(best_file):
-        print("One or both loss files do not exist in the given path.")
+    metrics = load_metrics(path)
+    if len(metrics["average_loss"]) == 0 or len(metrics["best_loss"]) == 0:
+        print("No losses were logged in the given path.")
         return
 
-    # Read average losses
-    with open(avg_file, 'r') as f:
-        average_losses = [float(line.strip()) for line in f if line.strip()]
-
-    # Read best losses
-    with open(best_file, 'r') as f:
-        best_losses = [float(line.strip()) for line in f if line.strip()]
-
-    # Create x-axis values
-    generations = list(range(len(average_losses)))
+    average_losses = metrics["average_loss"]
+    best_losses = metrics["best_loss"]
+    generations = metrics["iteration"]
 
     # Plotting
     plt.figure(figsize=(10, 6))
@@ -53,23 +42,12 @@ def plot_loss_dict(path):
     """
     Plots all losses of the best solution of each generation to analyze how they relate and develop
     """
-    # Load data
-    value1_list = []
-    value2_list = []
-    value3_list = []
-
-    dict_file = os.path.join(path, "best_solution_loss_dict.csv")
-
-    with open(dict_file, 'r') as f:
-        for row in f:
-            # Convert string like "(140.8, 1, 1.0)" to actual tuple
-            tup = eval(row.strip())  # Safe here if you fully trust the file
-            value1_list.append(tup[0])
-            value2_list.append(tup[1])
-            value3_list.append(tup[2])
+    # Load data (street overflow, PR overflow and time component of the best solutions)
+    metrics = load_metrics(path)
+    value1_list, value2_list, value3_list = metrics["best_loss_components"].T
 
-    # X-axis is just the generation/index
-    x = list(range(len(value1_list)))
+    # X-axis is the generation
+    x = metrics["iteration"][:len(value1_list)]
 
     # Plot
     plt.figure(figsize=(12, 6))
@@ -161,38 +139,17 @@ def plot_people_on_street(path, routes, your_max_capacity, step_size=10):
 
 
 def plot_generation_birthtype_loss(path, top_y=None):
-    file_path = os.path.join(path, "detailed_generation_loss.csv")
     output_path = os.path.join(path, "generation_birthtype_loss.png")
 
     if not top_y is None:
         output_path = os.path.join(path, "generation_birthtype_loss_zoomed_y.png")
 
-    generations = []
-
-    # Read and parse file line by line
-    with open(file_path, "r") as file:
-        for idx, line in enumerate(file):
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                # remove the np.float64(...), as it is not valid python literal syntax and causes a Value error (at least for me)
-                line = re.sub(r'np\.float64\(([^)]+)\)', r'\1', line)
-                generation = ast.literal_eval(line)
-                generations.append(generation)
-            except Exception as e:
-                print(f"⚠️ Failed to parse line {idx + 1}: {e}")
-                continue
-
-    # Organize data for fast plotting
-    birth_type_data = defaultdict(lambda: {"x": [], "y": []})
-
-    for gen_idx, generation in enumerate(generations):
-        for ind in generation:
-            bt = ind["birth_type"]
-            loss = ind["loss"]
-            birth_type_data[bt]["x"].append(gen_idx)
-            birth_type_data[bt]["y"].append(loss)
+    # Load the losses of all individuals at once and group them by birth type for fast plotting
+    metrics = load_metrics(path)
+    birth_type_data = {
+        bt: {"x": metrics["individual_iteration"][metrics["birth_type"] == bt], "y": metrics["loss"][metrics["birth_type"] == bt]}
+        for bt in np.unique(metrics["birth_type"]).tolist()
+    }
 
     # Setup color map
     birth_types = sorted(birth_type_data.keys())
@@ -1,58 +1,189 @@
 from metaheuristiken.geneticMetaheuristic.ClusterMapper import ClusterMapper
+from metaheuristiken.geneticMetaheuristic.Genome import Genome
+from metaheuristiken.geneticMetaheuristic.Route import Route
+from metaheuristiken.geneticMetaheuristic.EvaluationCache import EvaluationCache
+from metaheuristiken.geneticMetaheuristic.LoadHistogram import LoadHistogram
+from metaheuristiken.geneticMetaheuristic import EvaluationUtils
 import numpy as np
 import json
 import os
 import time
-from collections import defaultdict
+from copy import copy
 
 
 class PossibleSolution:
-    def __init__(self, pr_list, ra_list, edges_list, num_clusters, max_street_capacity, routes=[], birth_type=""):
-        self.routes = routes
+    def __init__(self, instance, genome=None, birth_type="", rng=None):
+        self.instance = instance # shared ProblemInstance, never copied
+        self.genome = genome if genome is not None else Genome.empty()
         self.loss = float("inf") # goal: loss = 0
-        self.max_street_capacity = max_street_capacity
-        self.pr_list = pr_list
-        self.ra_list = ra_list
-        self.edges_list = edges_list
-        self.num_clusters = num_clusters
-        
+        self.loss_dict = None # loss components of the last evaluation
+        self.evaluation_cache = None # only used with incremental_evaluation or load_bucket_size, shared with clones until they are evaluated
+        self.changed_routes = None # rows changed since the genome of the evaluation cache (None: unknown or not tracked, the whole genome is compared)
+
         # initialize cluster
-        max_start_time = max([edge["distance_km"] for edge in self.edges_list]) * self.num_clusters # heuristic - TODO can be optimized
-        self.cluster_mapper = ClusterMapper(self.ra_list, self.num_clusters, max_start_time)
+        self.cluster_mapper = ClusterMapper(self.instance, rng)
 
         # For Analysis / Debugging
         self.birth_type = birth_type
 
 
     def __repr__(self):
-        return f"{self.__class__.__name__}(#routes={len(self.routes)}, loss={self.loss}, street_cap={self.max_street_capacity})"        
-        
+        return f"{self.__class__.__name__}(#routes={len(self.genome)}, loss={self.loss}, street_cap={self.max_street_capacity})"        
+
+
+    @property
+    def pr_list(self):
+        return self.instance.pr_list
+
+    @property
+    def ra_list(self):
+        return self.instance.ra_list
+
+    @property
+    def edges_list(self):
+        return self.instance.edges_list
+
+    @property
+    def max_street_capacity(self):
+        return self.instance.max_street_capacity
+
+    @property
+    def num_clusters(self):
+        return self.instance.num_clusters
+
+
+    def clone(self):
+        """
+        Copies the genome and the clusters of this solution, the instance data and the evaluation cache are shared by reference
+        """
+        new_possible_solution = copy(self)
+        new_possible_solution.genome = self.genome.copy()
+        new_possible_solution.cluster_mapper = self.cluster_mapper.copy()
+        return new_possible_solution
+
+
+    def get_state(self):
+        """
+        Returns the solution without the instance data (genome, clusters, birth type), e.g. to send it to other processes
+        """
+        return self.genome, self.cluster_mapper.get_state(), self.birth_type
+
+
+    @classmethod
+    def from_state(cls, instance, state):
+        genome, cluster_state, birth_type = state
+        possible_solution = object.__new__(cls)
+        possible_solution.instance = instance
+        possible_solution.genome = genome
+        possible_solution.loss = float("inf")
+        possible_solution.loss_dict = None
+        possible_solution.evaluation_cache = None
+        possible_solution.changed_routes = None
+        possible_solution.cluster_mapper = ClusterMapper.from_state(instance, cluster_state)
+        possible_solution.birth_type = birth_type
+        return possible_solution
+
+
+    @property
+    def routes(self):
+        """
+        Route views on the genome rows (only for compatibility, e.g. plots and exports)
+        """
+        return [Route(self, i) for i in range(len(self.genome))]
+
 
     def set_routes(self, routes):
-        self.routes = routes
+        """
+        Builds the genome from route like objects (RA, PR, distance, cluster, group_size)
+        """
+        cluster_index = {id(c): i for i, c in enumerate(self.cluster_mapper.clusters)}
+        self.genome = Genome(
+            ra_idx=[self.instance.ra_index[r.RA] for r in routes],
+            pr_idx=[self.instance.pr_index[r.PR] for r in routes],
+            distance=[r.distance for r in routes],
+            cluster_idx=[cluster_index[id(r.cluster)] for r in routes],
+            group_size=[r.group_size for r in routes]
+        )
+        self.changed_routes = None
+
+
+    def update_route_clusters(self):
+        """
+        Sets the cluster of every route to the current cluster of its RA (with recluster_routes, after the RAs were moved
+        between clusters)
+        """
+        cluster_idx = self.cluster_mapper.assignment[self.genome.ra_idx]
+        self.mark_changed_routes(np.flatnonzero(cluster_idx != self.genome.cluster_idx))
+        self.genome.cluster_idx = cluster_idx
 
 
-    def set_loss(self):
-        street_cap_loss, pr_overflow_loss, time_loss = self.get_loss_dict()
-        self.loss = street_cap_loss + pr_overflow_loss + time_loss
-        #print(f"LOSS: {street_overflow_sum / self.max_street_capacity}, {sum_pr_overflows}, {normalized_time} ")
+    def get_ra_route_clusters(self):
+        """
+        Returns the cluster of the routes of every RA: with recluster_routes the current cluster of the RA, otherwise the
+        cluster the routes were created in (cluster mutations only change the ClusterMapper and the start times)
+        """
+        if self.instance.recluster_routes:
+            return self.cluster_mapper.assignment
+        ra_cluster_idx = np.zeros(len(self.ra_list), dtype=np.int32)
+        ra_cluster_idx[self.genome.ra_idx] = self.genome.cluster_idx
+        return ra_cluster_idx
 
-    
-    def get_loss_dict(self):
-        amount_street_overflows, street_overflow_sum, normalized_time, steps_took = self.get_street_overflows()
 
-        population_size = np.sum([r.group_size for r in self.routes])
-        normalized_street_overflow = street_overflow_sum / self.max_street_capacity / population_size
+    def mark_changed_routes(self, rows):
+        """
+        Remembers the rows of the genome which were changed in place (PR, distance or cluster), so that the incremental
+        evaluation only has to compare these rows. The rows are only tracked after an evaluation with a cache (grouped genome),
+        genome edits which are not marked have to reset changed_routes to None.
+        """
+        if self.changed_routes is not None:
+            is_changed = np.zeros(len(self.genome), dtype=bool)
+            is_changed[self.changed_routes] = True
+            is_changed[rows] = True
+            self.changed_routes = np.flatnonzero(is_changed)
 
-        sum_pr_overflows = self.get_sum_pr_overflows()
-        normalized_pr_overflow = sum_pr_overflows / population_size
 
-        weighted_time = normalized_time
-        # make sure these two are always maximum penalized
-        weighted_street_overflow = 0 if normalized_street_overflow == 0 else  normalized_street_overflow * 10 + weighted_time * 2
-        weighted_pr_overflow = 0 if normalized_pr_overflow == 0 else normalized_pr_overflow * 5 + weighted_time
+    def track_changed_routes(self):
+        """
+        The genome equals the genome of the evaluation cache now. The operators replace the aggregated genome instead of
+        marking its rows, so its changes are not tracked.
+        """
+        self.changed_routes = None if self.instance.aggregated_genome else np.empty(0, dtype=np.intp)
+
 
-        return weighted_street_overflow, weighted_pr_overflow, weighted_time
+    def get_cluster_start_times(self):
+        return np.array([c.start_time for c in self.cluster_mapper.clusters], dtype=np.float64)
+
+
+    def set_loss(self, loss_dict=None):
+        """
+        Sets the loss, the loss components can be passed if they were already calculated (e.g. by a worker process)
+        """
+        if loss_dict is None:
+            loss_dict = self.get_loss_dict()
+        self.loss_dict = loss_dict
+        street_cap_loss, pr_overflow_loss, time_loss = loss_dict
+        self.loss = street_cap_loss + pr_overflow_loss + time_loss
+        #print(f"LOSS: {street_overflow_sum / self.max_street_capacity}, {sum_pr_overflows}, {normalized_time} ")
+
+    
+    def get_loss_dict(self):
+        if self.instance.load_bucket_size:
+            cluster_start_times = self.get_cluster_start_times()
+            self.evaluation_cache = LoadHistogram.evaluate(self.instance, self.genome, cluster_start_times, self.evaluation_cache, self.changed_routes)
+            self.track_changed_routes()
+            return self.evaluation_cache.loss_dict(self.instance, self.genome, cluster_start_times)
+        if self.instance.incremental_evaluation:
+            self.evaluation_cache = EvaluationCache.evaluate(self.instance, self.genome, self.get_cluster_start_times(), self.evaluation_cache, self.changed_routes)
+            self.track_changed_routes()
+            return self.evaluation_cache.loss_dict(self.instance, self.genome)
+        return self.get_exact_loss_dict()
+
+
+    def get_exact_loss_dict(self):
+        """
+        Loss components with the exact street sweep (also with load_bucket_size)
+        """
+        return EvaluationUtils.loss_dict(self.instance, self.genome, self.get_cluster_start_times())
 
     #
     # Analysis Functions
@@ -60,58 +191,22 @@ class PossibleSolution:
 
     # gets the amount of street overflows
     # -> Should be used to optimize start_time
-    def get_street_overflows(self):
-        events = []  # (time, delta_people), delta +1 for enter, -1 for exit
-        longest_distance = 0
-
-        for route in self.routes:
-            enter_time = route.cluster.start_time
-            exit_time = route.cluster.start_time + route.distance
-
-            events.append((enter_time, route.group_size))   # person enters street
-            events.append((exit_time, -1 * route.group_size))  # person leaves street
-
-            if route.distance > longest_distance:
-                longest_distance = route.distance
-
-        # Sort events by time
-        events.sort()
-
-        persons_on_street = 0
-        amount_street_overflows = 0
-        street_overflow_sum = 0
-        last_event_time = 0
-
-        for time, delta in events:
-            persons_on_street += delta
-            if persons_on_street > self.max_street_capacity:
-                amount_street_overflows += 1
-                street_overflow_sum += persons_on_street - self.max_street_capacity
-            last_event_time = time
-    
-        # Normalize last_event_time
-        normalized_time = last_event_time / longest_distance -1 # 0 would be the optimal solution
-        #print(f"STREET OVERFLOW: {amount_street_overflows}, {street_overflow_sum}, {normalized_time}, {last_event_time}")
-        return amount_street_overflows, street_overflow_sum, normalized_time, last_event_time
+    def get_street_overflows(self, vectorized=None):
+        return EvaluationUtils.street_overflow_metrics(self.instance, self.genome, self.get_cluster_start_times(), vectorized)
 
 
     # gets the amount of PR overflows
     # -> Should be used to optimize PR selection
     def get_sum_pr_overflows(self):
-        sum_pr_overflows = 0
+        _, pr_overflows = self.get_pr_usage()
+        return int(pr_overflows.sum())
 
-        prs_with_usage = self.pr_list.copy()
-        for pr in prs_with_usage:
-            pr['current_usage'] = 0
 
-        for route in self.routes:
-            next(pr for pr in prs_with_usage if pr['id'] == route.PR)['current_usage'] += route.group_size
-
-        for pr in prs_with_usage:
-            if pr['current_usage'] > pr['capacity']:
-                sum_pr_overflows += pr['current_usage'] - pr['capacity']
-
-        return sum_pr_overflows
+    def get_pr_usage(self):
+        """
+        Returns the amount of people assigned to each PR and the overflow of each PR (both in the order of pr_list)
+        """
+        return EvaluationUtils.pr_usage(self.genome.pr_idx, self.genome.group_size, self.instance.pr_capacity)
     
 
     #
@@ -154,22 +249,22 @@ class PossibleSolution:
 
     def convert_to_desired_format(self, number_of_iterations, start_time):
 
-        # get flows
-        route_counts = defaultdict(int)
-        for r in self.routes:
-            route_counts[(r.RA, r.PR)] += r.group_size
+        # get flows (sum up the group sizes of all routes with the same RA -> PR pair, ordered by RA and PR)
+        num_prs = len(self.pr_list)
+        flow_keys = self.genome.ra_idx.astype(np.int64) * num_prs + self.genome.pr_idx
+        unique_keys, inverse = np.unique(flow_keys, return_inverse=True)
+        route_counts = np.bincount(inverse, weights=self.genome.group_size, minlength=len(unique_keys))
 
         flows = []
-        for ra in self.ra_list:
-            for pr in self.pr_list:
-                persons = route_counts.get((ra['id'], pr['id']), 0)
-                if persons == 0:
-                    continue
-                flows.append({
-                    "from": ra['id'],
-                    "to": pr['id'],
-                    "persons": persons,
-                })
+        for key, persons in zip(unique_keys.tolist(), route_counts.tolist()):
+            if persons == 0:
+                continue
+            ra_idx, pr_idx = divmod(key, num_prs)
+            flows.append({
+                "from": self.ra_list[ra_idx]['id'],
+                "to": self.pr_list[pr_idx]['id'],
+                "persons": int(persons),
+            })
         # get clusters
         clusters = []
 
@@ -0,0 +1,115 @@
+import numpy as np
+
+
+class ProblemIndex:
+    """
+    Lookup structures of the instance data, built once per run (part of the ProblemInstance).
+    - ID <-> index maps of the RAs and PRs
+    - dense RA x PR distance matrix in meters (nan if there is no edge)
+    - per RA candidate arrays in CSR form (the edges of RA i are the rows edge_offsets[i]:edge_offsets[i+1]),
+      with the PR index, the distance in meters and the precomputed PR selection weight of every edge
+    - per RA order of the candidates by distance (closest PR first), e.g. for the repair
+    """
+    def __init__(self, ra_list, pr_list, edges_list, pr_capacity):
+        ra_ids = [ra["id"] for ra in ra_list]
+        pr_ids = [pr["id"] for pr in pr_list]
+        ra_index = {ra_id: i for i, ra_id in enumerate(ra_ids)}
+        pr_index = {pr_id: i for i, pr_id in enumerate(pr_ids)}
+        edge_ra = np.array([ra_index[edge["from"]] for edge in edges_list], dtype=np.int32)
+        edge_pr = np.array([pr_index[edge["to"]] for edge in edges_list], dtype=np.int32)
+        edge_distance_m = np.array([float(edge["distance_km"]) for edge in edges_list], dtype=np.float64) * 1000
+        self._build(ra_ids, pr_ids, edge_ra, edge_pr, edge_distance_m, pr_capacity)
+
+
+    @classmethod
+    def from_arrays(cls, ra_ids, pr_ids, edge_ra, edge_pr, edge_distance_m, pr_capacity):
+        """
+        Builds the index from edge arrays (RA index, PR index and distance in meters per edge), e.g. of a CompiledInstance
+        """
+        index = cls.__new__(cls)
+        index._build(list(ra_ids), list(pr_ids), np.asarray(edge_ra, dtype=np.int32), np.asarray(edge_pr, dtype=np.int32),
+                     np.asarray(edge_distance_m, dtype=np.float64), pr_capacity)
+        return index
+
+
+    def _build(self, ra_ids, pr_ids, edge_ra, edge_pr, edge_distance_m, pr_capacity):
+        self.ra_ids = ra_ids
+        self.pr_ids = pr_ids
+        self.ra_index = {ra_id: i for i, ra_id in enumerate(self.ra_ids)}
+        self.pr_index = {pr_id: i for i, pr_id in enumerate(self.pr_ids)}
+
+        num_ras, num_prs = len(ra_ids), len(pr_ids)
+        self.distance_m = np.full((num_ras, num_prs), np.nan)
+        self.distance_m[edge_ra, edge_pr] = edge_distance_m
+
+        # group the edges by RA (keeping the order of the edges within an RA)
+        order = np.argsort(edge_ra, kind="stable")
+        edge_ra, edge_pr, self.edge_distance = edge_ra[order], edge_pr[order], edge_distance_m[order]
+        edges_per_ra = np.bincount(edge_ra, minlength=num_ras)
+        self.edge_offsets = np.concatenate(([0], np.cumsum(edges_per_ra)))
+        self.edge_pr = edge_pr
+        edge_km = self.edge_distance / 1000
+
+        # New PRs are selected by a weighted combination of proximity and capacity
+        weights_distance = 1 / np.maximum(0.001, edge_km)
+        weights_capacity = pr_capacity[edge_pr].astype(np.float64)
+        self.edge_weight = 0.5 * self.min_max_normalize_per_ra(weights_distance, edges_per_ra) + \
+            4 * self.min_max_normalize_per_ra(weights_capacity, edges_per_ra)
+
+        # closest PRs first (ties by PR index), the edges stay grouped by RA
+        self.edges_by_distance = self.sort_edges_by_distance(edge_ra, self.edge_distance, self.edge_pr, num_ras, num_prs)
+
+        for name in ("distance_m", "edge_offsets", "edge_pr", "edge_distance", "edge_weight", "edges_by_distance"):
+            getattr(self, name).flags.writeable = False
+
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(#RAs={len(self.ra_ids)}, #PRs={len(self.pr_ids)}, #edges={len(self.edge_pr)})"
+
+
+    def edge_selection(self, ra_idx):
+        """
+        Returns the PR indices, distances (in meters) and selection weights of the edges of one RA (read only views)
+        """
+        edges = slice(self.edge_offsets[ra_idx], self.edge_offsets[ra_idx + 1])
+        return self.edge_pr[edges], self.edge_distance[edges], self.edge_weight[edges]
+
+
+    def closest_prs(self, ra_idx):
+        """
+        Returns the PR indices and distances (in meters) of the edges of one RA, closest PR first
+        """
+        edges = self.edges_by_distance[self.edge_offsets[ra_idx]:self.edge_offsets[ra_idx + 1]]
+        return self.edge_pr[edges], self.edge_distance[edges]
+
+
+    @staticmethod
+    def sort_edges_by_distance(edge_ra, edge_distance, edge_pr, num_ras, num_prs):
+        """
+        Returns the order of the edges by RA, distance and PR (like np.lexsort), but sorts a single integer key with the
+        distances replaced by their rank, which is several times faster for big instances
+        """
+        distances, distance_rank = np.unique(edge_distance, return_inverse=True)
+        if num_ras * len(distances) * num_prs >= 2**63:
+            return np.lexsort((edge_pr, edge_distance, edge_ra))
+        key = (edge_ra.astype(np.int64) * len(distances) + distance_rank) * num_prs + edge_pr
+        return np.argsort(key, kind="stable")
+
+
+    @staticmethod
+    def min_max_normalize_per_ra(values, edges_per_ra):
+        """
+        Min-max normalizes the values of every RA separately (1 if all values of an RA are equal)
+        """
+        normalized = np.ones_like(values)
+        has_edges = edges_per_ra > 0
+        if not has_edges.any():
+            return normalized
+
+        starts = np.concatenate(([0], np.cumsum(edges_per_ra)))[:-1][has_edges]
+        min_values = np.repeat(np.minimum.reduceat(values, starts), edges_per_ra[has_edges])
+        max_values = np.repeat(np.maximum.reduceat(values, starts), edges_per_ra[has_edges])
+
+        varying = max_values != min_values
+        normalized[varying] = (values[varying] - min_values[varying]) / (max_values[varying] - min_values[varying])
+        return normalized
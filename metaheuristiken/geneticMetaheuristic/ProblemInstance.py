@@ -0,0 +1,99 @@
+from metaheuristiken.geneticMetaheuristic.ProblemIndex import ProblemIndex
+import numpy as np
+
+
+class ProblemInstance:
+    """
+    Immutable instance data (RAs, PRs, edges and the derived constants) of one run.
+    It is created once in GeneticMetaheuristik.initialisiere and shared by reference by all possible solutions,
+    copying an individual never copies the instance.
+    """
+    def __init__(self, pr_list, ra_list, edges_list, max_street_capacity, num_clusters, route_group_size=1, vectorized_loss=True, aggregated_genome=False, incremental_evaluation=False, balanced_reclustering=False, load_bucket_size=0, recluster_routes=False, index=None):
+        self.pr_list = pr_list
+        self.ra_list = ra_list
+        self._edges_list = edges_list # None if the index was built from a CompiledInstance
+        self.max_street_capacity = max_street_capacity
+        self.num_clusters = num_clusters
+        self.route_group_size = route_group_size
+        self.vectorized_loss = vectorized_loss # False uses the legacy python sweep for the street overflows
+        self.aggregated_genome = aggregated_genome # one genome row per (RA, PR) split instead of one per group
+        # approximate the street load on a time grid of this size (0: exact sweep), see LoadHistogram
+        self.load_bucket_size = load_bucket_size
+        # re-score changed clones from the cached state of their parent (only the grouped vectorized sweep has a cached form)
+        self.incremental_evaluation = incremental_evaluation and vectorized_loss and not aggregated_genome and not load_bucket_size
+        self.balanced_reclustering = balanced_reclustering # recluster by population shares instead of RA counts
+        self.recluster_routes = recluster_routes # the routes follow their RA into its new cluster after cluster mutations
+
+        self.ra_population = self._read_only(np.array([ra["population"] for ra in ra_list], dtype=np.int64))
+        self.pr_capacity = self._read_only(np.array([pr["capacity"] for pr in pr_list], dtype=np.int64))
+        self.city_population = int(self.ra_population.sum())
+
+        # ID maps, distance matrix and PR candidates of every RA (the genome only stores indices)
+        self.index = index if index is not None else ProblemIndex(ra_list, pr_list, edges_list, self.pr_capacity)
+
+        # heuristic - TODO can be optimized
+        self.max_start_time = float(self.index.edge_distance.max()) / 1000 * num_clusters
+
+        self._frozen = True
+
+
+    @classmethod
+    def from_compiled(cls, compiled, max_street_capacity, num_clusters, ra_list=None, pr_list=None, **kwargs):
+        """
+        Creates the instance from a CompiledInstance, the index is built from its arrays (the edge dicts are not created).
+        RA and PR lists which were already created from the compiled instance can be passed, so they are shared instead of built again.
+        """
+        ra_list = ra_list if ra_list is not None else compiled.ra_list()
+        pr_list = pr_list if pr_list is not None else compiled.pr_list()
+        index = ProblemIndex.from_arrays(compiled.ra_ids.tolist(), compiled.pr_ids.tolist(), compiled.edge_ra, compiled.edge_pr, compiled.edge_distance_m, compiled.pr_capacity)
+        return cls(pr_list, ra_list, None, max_street_capacity, num_clusters, index=index, **kwargs)
+
+
+    @property
+    def edges_list(self):
+        """
+        The edges in the input format, recreated from the index for compiled instances (only needed for exports)
+        """
+        if self._edges_list is not None:
+            return self._edges_list
+        return [
+            {"from": self.index.ra_ids[ra_idx], "to": self.index.pr_ids[pr_idx], "distance_km": distance / 1000}
+            for ra_idx, pr_idx, distance in zip(
+                np.repeat(np.arange(len(self.ra_list)), np.diff(self.index.edge_offsets)).tolist(),
+                self.index.edge_pr.tolist(),
+                self.index.edge_distance.tolist()
+            )
+        ]
+
+
+    @property
+    def ra_index(self):
+        return self.index.ra_index
+
+    @property
+    def pr_index(self):
+        return self.index.pr_index
+
+
+    def __setattr__(self, name, value):
+        if getattr(self, "_frozen", False):
+            raise AttributeError(f"{self.__class__.__name__} is immutable, can't set '{name}'")
+        super().__setattr__(name, value)
+
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(#RAs={len(self.ra_list)}, #PRs={len(self.pr_list)}, #edges={len(self.index.edge_pr)}, street_cap={self.max_street_capacity})"
+
+
+    # shared by reference, never copied
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+    @staticmethod
+    def _read_only(array):
+        array.flags.writeable = False
+        return array
@@ -0,0 +1,44 @@
+import numpy as np
+
+# kinds of random streams, part of the key of every stream
+STREAM_SELECTION = 0
+STREAM_OFFSPRING = 1
+STREAM_INITIAL_POPULATION = 2
+STREAM_ISLAND = 3
+
+
+def make_rng(seed, *keys):
+    """
+    Creates an independent random generator for the given run seed and stream key (e.g. kind, iteration, child).
+    The same seed and key always give the same stream, no matter in which process or order it is created.
+    """
+    return np.random.Generator(np.random.PCG64(np.random.SeedSequence(seed, spawn_key=keys)))
+
+
+def derive_seed(seed, *keys):
+    """
+    Derives an independent run seed (e.g. for an island) from the given seed and key
+    """
+    return int(np.random.SeedSequence(seed, spawn_key=keys).generate_state(1, np.uint64)[0] % (2**63))
+
+
+def new_run_seed():
+    """
+    Draws a random run seed (used if no seed is configured, it is logged so the run can be reproduced)
+    """
+    return int(np.random.SeedSequence().entropy % (2**63))
+
+
+def get_rng(rng):
+    """
+    Returns the given generator or a new unseeded one
+    """
+    return rng if rng is not None else np.random.default_rng()
+
+
+def weighted_choice(rng, weights, k=1):
+    """
+    Draws k indices with replacement, proportional to the given (non negative) weights
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    return rng.choice(len(weights), size=k, p=weights / weights.sum())
@@ -1,69 +1,372 @@
-import random
+import numpy as np
+from collections import deque
+from metaheuristiken.geneticMetaheuristic.Genome import Genome
 
-def repair_possible_solution(possible_solution):
+MAX_PR_CANDIDATES = 8 # cheapest PRs with free capacity tried per (RA, overflown PR) pair before the augmenting paths
+
+def repair_possible_solution(possible_solution, rng=None):
     """
     Fix overflown PRs by redistributing routes to underutilized PRs with available capacity.
-    Also tries to fix the street capacity overflow
+    Also fixes the street capacity overflow by rescheduling the cluster start times.
+    The repair is deterministic, rng is only accepted like for the other offspring operators.
     """
     # ------
     #  Repair PR Distribution
-
-    # Count current PR usage
-    pr_usage = {pr["id"]: 0 for pr in possible_solution.pr_list}
-    for route in possible_solution.routes:
-        pr_usage[route.PR] += route.group_size
-
-    # Identify overflown and underused PRs
-    pr_capacity = {pr["id"]: pr["capacity"] for pr in possible_solution.pr_list}
-    overflown_prs = {pr_id for pr_id, usage in pr_usage.items() if usage > pr_capacity[pr_id]}
-    underused_prs = {pr_id for pr_id, usage in pr_usage.items() if usage < pr_capacity[pr_id]}
-
-    # Preprocess a map from each RA to available PRs with distances
-    ra_to_pr_edges = {}
-    for edge in possible_solution.edges_list:
-        if edge["to"] in underused_prs:
-            ra_to_pr_edges.setdefault(edge["from"], []).append({
-                "to": edge["to"],
-                "distance": float(edge["distance_km"]) * 1000  # convert to meters
-            })
-
-    # Reassign routes from overflown PRs
-    for route in possible_solution.routes:
-        if route.PR in overflown_prs:
-            ra_id = route.RA
-            candidates = ra_to_pr_edges.get(ra_id, [])
-            if not candidates:
-                continue  # no valid PRs available
-
-            # Sort by distance to minimize extra travel
-            candidates.sort(key=lambda x: x["distance"])
-            for candidate in candidates:
-                pr_id = candidate["to"]
-                if pr_usage[pr_id] + route.group_size <= pr_capacity[pr_id]:
-                    old_pr = route.PR
-                    # Reassign route
-                    route.set_pr(pr_id, candidate["distance"])
-                    pr_usage[old_pr] -= route.group_size  # remove from old
-                    pr_usage[route.PR] += route.group_size
-                    break  # move to next route
-
+    repair_pr_overflows(possible_solution)
 
     # ------
     #  Repair Street Capacity Overflow
-    attempt = 0
-    max_attempts = 5
-    while attempt < max_attempts:
-        amount_overflow, overflow_sum, norm_time, last_time = possible_solution.get_street_overflows()
-        if overflow_sum == 0:
-            break  # Repaired successfully
+    schedule_cluster_start_times(possible_solution)
 
-        # Sort clusters by size (largest first)
-        clusters = sorted(possible_solution.cluster_mapper.clusters, key=lambda c: c.size, reverse=True)
+    return possible_solution
 
-        for cluster in clusters:
-            # Try delaying this cluster's start time slightly
-            cluster.start_time += random.randrange(0, 200)
 
-        attempt += 1
+def schedule_cluster_start_times(possible_solution):
+    """
+    Sets the start times of the clusters in one pass (in the order of their current start times): every cluster starts
+    at the earliest (integer) time where its load profile fits under max_street_capacity on top of the street load of the
+    already scheduled clusters. A cluster which alone exceeds the capacity only starts when no other cluster is on the
+    street while it overflows. So the street is not overflown afterwards if no cluster alone overflows it.
+    With a load_bucket_size the schedule is made in buckets like in the LoadHistogram: the start times are on the grid and
+    every route occupies the street for whole buckets, so the approximated street overflow is 0 as well.
+    """
+    genome = possible_solution.genome
+    clusters = possible_solution.cluster_mapper.clusters
+    max_street_capacity = possible_solution.max_street_capacity
+    bucket_size = possible_solution.instance.load_bucket_size
 
-    return possible_solution
+    # the rows of every cluster
+    rows_by_cluster = np.argsort(genome.cluster_idx, kind="stable")
+    row_offsets = np.searchsorted(genome.cluster_idx[rows_by_cluster], np.arange(len(clusters) + 1))
+
+    enter_times, exit_times, group_sizes = [], [], []
+    load_times, load = np.zeros(1), np.zeros(1, dtype=np.int64) # empty street
+    for cluster in sorted(clusters, key=lambda c: c.start_time):
+        rows = rows_by_cluster[row_offsets[cluster.index]:row_offsets[cluster.index + 1]]
+        if len(rows) == 0:
+            continue
+
+        distance, group_size = genome.distance[rows], genome.group_size[rows].astype(np.int64)
+        if bucket_size:
+            distance = np.ceil(distance / bucket_size)
+        start_time = earliest_start_time(load_times, load, *get_load_profile(distance, group_size), max_street_capacity)
+        cluster.start_time = start_time * bucket_size if bucket_size else start_time
+
+        enter_times.append(np.full(len(rows), float(start_time)))
+        exit_times.append(start_time + distance)
+        group_sizes.append(group_size)
+        load_times, load = get_street_load(np.concatenate(enter_times), np.concatenate(exit_times), np.concatenate(group_sizes))
+
+
+def get_load_profile(distance, group_size):
+    """
+    Returns the street load of one cluster relative to its start time: the times at which the load changes (0 and the
+    distances) and the load from each of these times on (non increasing, 0 after the longest route)
+    """
+    order = np.argsort(distance, kind="stable")
+    offsets, starts = np.unique(np.concatenate(([0.0], distance[order])), return_index=True)
+    arrived = np.concatenate(([0], np.cumsum(group_size[order])))
+    # unique returns the first occurrence, the routes with the same distance arrive together
+    ends = np.append(starts[1:], len(arrived)) - 1
+    return offsets, arrived[-1] - arrived[ends]
+
+
+def get_street_load(enter_times, exit_times, group_sizes):
+    """
+    Returns the times at which the street load changes and the load from each of these times on
+    (people leaving at the same time as others enter are not counted together, like in the street sweep)
+    """
+    times, inverse = np.unique(np.concatenate((enter_times, exit_times)), return_inverse=True)
+    deltas = np.bincount(inverse.reshape(-1), weights=np.concatenate((group_sizes, -group_sizes)), minlength=len(times))
+    return times, np.cumsum(deltas).round().astype(np.int64)
+
+
+def earliest_start_time(load_times, load, offsets, profile, max_street_capacity):
+    """
+    Returns the earliest integer start time at which the load profile (offsets, profile) fits on top of the street load
+    (load_times, load): the load may not exceed max_street_capacity, or the own load of the profile where it is larger.
+    If the profile collides at time t, all starts up to t collide as well (the profile is non increasing), so the search
+    jumps to the next change of the street load after t that leaves room for the start of the profile.
+    """
+    start_time = 0
+    while True:
+        profile_times = start_time + offsets
+        # all changes of the street load or the profile while the profile is on the street
+        inside = load_times[np.searchsorted(load_times, start_time, side="right"):np.searchsorted(load_times, profile_times[-1], side="left")]
+        times = np.sort(np.concatenate((profile_times[:-1], inside)))
+
+        load_idx = np.searchsorted(load_times, times, side="right") - 1
+        street_load = np.where(load_idx >= 0, load[np.maximum(load_idx, 0)], 0)
+        own_load = profile[np.searchsorted(profile_times, times, side="right") - 1]
+
+        collisions = np.flatnonzero(street_load + own_load > np.maximum(own_load, max_street_capacity))
+        if len(collisions) == 0:
+            return start_time
+
+        # next change after the collision to a street load which leaves room for the start of the profile
+        after_collision = np.searchsorted(load_times, times[collisions[0]], side="right")
+        room = max(profile[0], max_street_capacity) - profile[0]
+        next_change = after_collision + np.argmax(load[after_collision:] <= room)
+        start_time = int(np.ceil(load_times[next_change]))
+
+
+def repair_pr_overflows(possible_solution):
+    """
+    Moves the overflow of the overflown PRs to PRs with free capacity: first by the cheap moves of move_pr_overflows
+    (repeated while they reduce the overflow), the overflow which is left is moved along augmenting paths
+    (augment_pr_overflows).
+    """
+    while move_pr_overflows(possible_solution) > 0:
+        pass
+    augment_pr_overflows(possible_solution)
+
+
+def move_pr_overflows(possible_solution):
+    """
+    For every (RA, overflown PR) pair its MAX_PR_CANDIDATES closest PRs with free capacity are the possible moves. All
+    moves are sorted once by their extra travel distance and applied cheapest first, as long as the old PR is still
+    overflown and the new PR has capacity left. Returns the amount of overflow which was moved.
+    """
+    instance = possible_solution.instance
+    genome = possible_solution.genome
+
+    pr_usage, _ = possible_solution.get_pr_usage()
+    excess = np.maximum(pr_usage - instance.pr_capacity, 0)
+    free = np.maximum(instance.pr_capacity - pr_usage, 0)
+    if not excess.any() or not free.any():
+        return 0
+
+    rows = np.flatnonzero(excess[genome.pr_idx] > 0)
+    pair_ra, pair_pr, row_pair, moves = get_pr_moves(instance.index, genome.ra_idx[rows], genome.pr_idx[rows], free > 0)
+
+    # the rows (routes) of every (RA, overflown PR) pair, the biggest groups are moved first
+    rows = rows[np.lexsort((-genome.group_size[rows], row_pair))]
+    pair_offsets = np.searchsorted(np.sort(row_pair), np.arange(len(pair_ra) + 1)).tolist()
+    rows = rows.tolist()
+    rows_of_pair = [rows[pair_offsets[pair]:pair_offsets[pair + 1]] for pair in range(len(pair_ra))]
+
+    if instance.aggregated_genome:
+        return repair_aggregated_pr_distribution(possible_solution, pair_pr, rows_of_pair, moves, excess.tolist(), free.tolist())
+    return repair_grouped_pr_distribution(possible_solution, pair_pr, rows_of_pair, moves, excess.tolist(), free.tolist())
+
+
+def get_pr_moves(index, ra_idx, pr_idx, has_free_capacity):
+    """
+    Returns the unique (RA, PR) pairs of the given rows (pair_ra, pair_pr), the pair of every row and the possible moves
+    as (pair, new PR, distance) lists: the moves of every pair to the MAX_PR_CANDIDATES closest PRs with free capacity
+    of its RA, sorted by extra distance compared to the old PR (ties by pair and PR)
+    """
+    num_prs = len(index.pr_ids)
+    keys, row_pair = np.unique(ra_idx.astype(np.int64) * num_prs + pr_idx, return_inverse=True)
+    pair_ra, pair_pr = keys // num_prs, keys % num_prs
+
+    # the closest PRs with free capacity of every RA (the edges of an RA are sorted by distance in edges_by_distance)
+    ras = np.unique(pair_ra)
+    positions, edges = get_ranges(index.edge_offsets, ras)
+    edges = index.edges_by_distance[edges]
+    available = has_free_capacity[index.edge_pr[edges]]
+    positions, edges = positions[available], edges[available]
+    rank = np.arange(len(positions)) - np.searchsorted(positions, positions)
+    positions, edges = positions[rank < MAX_PR_CANDIDATES], edges[rank < MAX_PR_CANDIDATES]
+
+    candidate_offsets = np.searchsorted(positions, np.arange(len(ras) + 1))
+    move_pair, candidates = get_ranges(candidate_offsets, np.searchsorted(ras, pair_ra))
+    move_pr = index.edge_pr[edges[candidates]]
+    move_distance = index.edge_distance[edges[candidates]]
+
+    old_distance = np.nan_to_num(index.distance_m[pair_ra, pair_pr], nan=0.0)
+    extra_distance = move_distance - old_distance[move_pair]
+    order = np.lexsort((move_pr, move_pair, extra_distance))
+    moves = (move_pair[order].tolist(), move_pr[order].tolist(), move_distance[order].tolist())
+    return pair_ra, pair_pr.tolist(), row_pair.reshape(-1), moves
+
+
+def get_ranges(offsets, keys):
+    """
+    Returns the elements of the CSR ranges offsets[key]:offsets[key + 1] of all keys as (position in keys, element) arrays,
+    e.g. all edges of some RAs with the edge_offsets of the ProblemIndex
+    """
+    starts = offsets[keys]
+    counts = offsets[keys + 1] - starts
+    positions = np.repeat(np.arange(len(keys)), counts)
+    elements = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(starts, counts)
+    return positions, elements
+
+
+def repair_grouped_pr_distribution(possible_solution, pair_pr, rows_of_pair, moves, excess, free):
+    """
+    Moves whole routes (groups): for every move (cheapest first) the routes of the pair which fit into the free
+    capacity of the new PR are moved until the old PR is not overflown anymore. Returns the amount of overflow moved.
+    """
+    genome = possible_solution.genome
+    group_size = genome.group_size.tolist()
+
+    total_excess, moved = sum(excess), 0
+    moved_rows = []
+    for pair, pr_idx, distance in zip(*moves):
+        if moved >= total_excess:
+            break
+        old_pr = pair_pr[pair]
+        if excess[old_pr] <= 0 or free[pr_idx] <= 0:
+            continue
+
+        remaining_rows = []
+        for row in rows_of_pair[pair]:
+            if excess[old_pr] > 0 and group_size[row] <= free[pr_idx]:
+                genome.pr_idx[row] = pr_idx
+                genome.distance[row] = distance
+                moved_rows.append(row)
+                moved += min(group_size[row], excess[old_pr])
+                excess[old_pr] -= group_size[row]
+                free[pr_idx] -= group_size[row]
+            else:
+                remaining_rows.append(row)
+        rows_of_pair[pair] = remaining_rows
+
+    possible_solution.mark_changed_routes(moved_rows)
+    return moved
+
+
+def repair_aggregated_pr_distribution(possible_solution, pair_pr, rows_of_pair, moves, excess, free):
+    """
+    PR repair for the aggregated genome: the people of a split are moved like single persons, so a split can be
+    divided over several PRs (cheapest first), exactly the overflow of the old PR is moved. Returns the amount moved.
+    """
+    genome = possible_solution.genome
+    people = {row: int(genome.group_size[row]) for pair_rows in rows_of_pair for row in pair_rows}
+    new_splits = []
+
+    total_excess, total_moved = sum(excess), 0
+    for pair, pr_idx, distance in zip(*moves):
+        if total_moved >= total_excess:
+            break
+        old_pr = pair_pr[pair]
+        if excess[old_pr] <= 0 or free[pr_idx] <= 0:
+            continue
+
+        for row in rows_of_pair[pair]:
+            moved = min(excess[old_pr], free[pr_idx], people[row])
+            if moved <= 0:
+                continue
+
+            new_splits.append(Genome([genome.ra_idx[row]], [pr_idx], [distance], [genome.cluster_idx[row]], [moved]))
+            people[row] -= moved
+            total_moved += moved
+            excess[old_pr] -= moved
+            free[pr_idx] -= moved
+
+    for row, row_people in people.items():
+        genome.group_size[row] = row_people
+
+    possible_solution.genome = Genome.concatenate([genome] + new_splits).aggregated(len(possible_solution.pr_list))
+    return total_moved
+
+
+def augment_pr_overflows(possible_solution):
+    """
+    Moves the remaining overflow along augmenting paths: people of an overflown PR move to another PR of their RA,
+    which passes the same amount on to a further PR and so on, until a PR with free capacity is reached (shortest path
+    by breadth first search over the PRs, found by find_augmenting_path).
+    With the aggregated genome this is a max flow, so no PR stays overflown whenever the capacities and edges allow a
+    distribution without overflow. The grouped genome moves whole routes along the path (every PR on the path passes on
+    at least the people it has no room for), so a rest can remain.
+    """
+    instance = possible_solution.instance
+    unreachable = set() # overflown PRs without a path, they stay unreachable when other overflows are moved
+
+    while True:
+        pr_usage, _ = possible_solution.get_pr_usage()
+        excess = np.maximum(pr_usage - instance.pr_capacity, 0)
+        free = np.maximum(instance.pr_capacity - pr_usage, 0)
+        sources = [pr_idx for pr_idx in np.flatnonzero(excess).tolist() if pr_idx not in unreachable]
+        if not sources or not free.any():
+            return
+
+        path = find_augmenting_path(possible_solution, sources[0], excess, free)
+        if path is None:
+            unreachable.add(sources[0])
+        else:
+            apply_augmenting_path(possible_solution, path, excess, free)
+
+
+def find_augmenting_path(possible_solution, source, excess, free):
+    """
+    Breadth first search from the overflown PR source to a PR with free capacity. The PR of a route (row) is connected
+    to all PRs of its RA. Every PR is reached by its cheapest connection (extra distance), with the grouped genome by the
+    smallest route first, which has to fit into the free capacity at the end of the path or its people have to be passed on.
+    Returns the path as list of (row, new PR), starting at the source, or None.
+    """
+    instance = possible_solution.instance
+    genome = possible_solution.genome
+    index = instance.index
+    aggregated = instance.aggregated_genome
+    num_prs = len(instance.pr_capacity)
+
+    rows_by_pr = np.argsort(genome.pr_idx, kind="stable")
+    pr_offsets = np.searchsorted(genome.pr_idx[rows_by_pr], np.arange(num_prs + 1))
+
+    visited = np.zeros(num_prs, dtype=bool)
+    visited[source] = True
+    incoming = {source: None} # PR -> (row moved into it, PR of the row before)
+    queue = deque([source])
+    while queue:
+        pr_idx = queue.popleft()
+        rows = rows_by_pr[pr_offsets[pr_idx]:pr_offsets[pr_idx + 1]]
+        rows = rows[genome.group_size[rows] > 0]
+        if not aggregated and pr_idx != source:
+            # the PR has to pass on at least the people of the incoming route it has no room for
+            incoming_people = int(genome.group_size[incoming[pr_idx][0]])
+            rows = rows[genome.group_size[rows] >= incoming_people - free[pr_idx]]
+
+        positions, edges = get_ranges(index.edge_offsets, genome.ra_idx[rows])
+        arc_row, arc_pr = rows[positions], index.edge_pr[edges]
+        new = ~visited[arc_pr]
+        arc_row, arc_pr = arc_row[new], arc_pr[new]
+        extra_distance = index.edge_distance[edges[new]] - genome.distance[arc_row]
+
+        if aggregated:
+            order = np.lexsort((extra_distance, arc_pr))
+        else:
+            order = np.lexsort((extra_distance, genome.group_size[arc_row], arc_pr))
+        arc_row, arc_pr = arc_row[order], arc_pr[order]
+        firsts = np.flatnonzero(np.diff(arc_pr, prepend=-1) != 0)
+
+        for row, next_pr in zip(arc_row[firsts].tolist(), arc_pr[firsts].tolist()):
+            visited[next_pr] = True
+            incoming[next_pr] = (row, pr_idx)
+            if free[next_pr] > 0 and (aggregated or genome.group_size[row] <= free[next_pr]):
+                path = []
+                while incoming[next_pr] is not None:
+                    row, previous_pr = incoming[next_pr]
+                    path.append((row, next_pr))
+                    next_pr = previous_pr
+                return path[::-1]
+            queue.append(next_pr)
+
+    return None
+
+
+def apply_augmenting_path(possible_solution, path, excess, free):
+    """
+    Moves the people along the path. The aggregated genome moves the largest possible amount (limited by the overflow
+    of the source, the free capacity at the end and the people of the moved splits), the grouped genome whole routes.
+    """
+    genome = possible_solution.genome
+    distance_m = possible_solution.instance.index.distance_m
+
+    if not possible_solution.instance.aggregated_genome:
+        for row, pr_idx in path:
+            genome.pr_idx[row] = pr_idx
+            genome.distance[row] = distance_m[genome.ra_idx[row], pr_idx]
+        possible_solution.mark_changed_routes([row for row, _ in path])
+        return
+
+    source, sink = genome.pr_idx[path[0][0]], path[-1][1]
+    moved = min(int(excess[source]), int(free[sink]), *(int(genome.group_size[row]) for row, _ in path))
+    new_splits = []
+    for row, pr_idx in path:
+        ra_idx = genome.ra_idx[row]
+        new_splits.append(Genome([ra_idx], [pr_idx], [distance_m[ra_idx, pr_idx]], [genome.cluster_idx[row]], [moved]))
+        genome.group_size[row] -= moved
+
+    possible_solution.genome = Genome.concatenate([genome] + new_splits).aggregated(len(possible_solution.pr_list))
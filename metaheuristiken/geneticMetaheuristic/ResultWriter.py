@@ -0,0 +1,130 @@
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+
+
+class ResultWriter:
+    """
+    Writes the logs (lines appended to files) and the solution snapshots (json files) of a run into its directory.
+    With background=True the records are queued and written by a background thread, which collects them for up to
+    flush_interval seconds and writes them in one batch (every file is opened once per batch), so slow disks never
+    stall the optimization. Otherwise every record is written immediately.
+    """
+    def __init__(self, directory, background=False, flush_interval=5.0):
+        self.directory = directory
+        self.background = background
+        self.flush_interval = flush_interval
+        self.error = None # exception of the background thread, raised in the main thread
+
+        self.queue = None
+        self.thread = None
+        if background:
+            self.queue = queue.Queue()
+            self.thread = threading.Thread(target=self._run, name="ResultWriter", daemon=True)
+            self.thread.start()
+            atexit.register(self.close)
+
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(directory={self.directory}, background={self.background}, flush_interval={self.flush_interval})"
+
+
+    def append_line(self, filename, value):
+        """
+        Appends str(value) as a line to the file (the value is formatted by the writer, it must not be changed afterwards)
+        """
+        self._put(("line", filename, value))
+
+
+    def append_json_line(self, filename, record):
+        """
+        Appends the record as one json line to the file (JSON Lines)
+        """
+        self._put(("json_line", filename, record))
+
+
+    def write_json(self, filename, data):
+        self._put(("json", filename, data))
+
+
+    def flush(self):
+        """
+        Blocks until all queued records are written
+        """
+        if self.thread is not None:
+            done = threading.Event()
+            self.queue.put(("flush", None, done))
+            done.wait()
+        self._raise_error()
+
+
+    def close(self):
+        if self.thread is not None:
+            done = threading.Event()
+            self.queue.put(("close", None, done))
+            done.wait()
+            self.thread.join()
+            self.thread = None
+            atexit.unregister(self.close)
+        self._raise_error()
+
+
+    def _put(self, record):
+        self._raise_error()
+        if self.thread is None:
+            self._write_batch([record])
+        else:
+            self.queue.put(record)
+
+
+    def _raise_error(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise RuntimeError("Writing the run results failed") from error
+
+
+    def _run(self):
+        while True:
+            # collect records until the flush interval is over or a flush/close is requested
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while batch[-1][0] not in ("flush", "close"):
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                self.error = e
+
+            if batch[-1][0] in ("flush", "close"):
+                batch[-1][2].set()
+                if batch[-1][0] == "close":
+                    return
+
+
+    def _write_batch(self, batch):
+        os.makedirs(self.directory, exist_ok=True)
+
+        # lines of the same file are written at once (in order)
+        lines = {}
+        for kind, filename, value in batch:
+            if kind == "line":
+                lines.setdefault(filename, []).append(f"{value}\n")
+            elif kind == "json_line":
+                lines.setdefault(filename, []).append(json.dumps(value) + "\n")
+            elif kind == "json":
+                with open(os.path.join(self.directory, filename), "w") as f:
+                    json.dump(value, f, indent=2)
+
+        for filename, file_lines in lines.items():
+            with open(os.path.join(self.directory, filename), "a") as f:
+                f.write("".join(file_lines))
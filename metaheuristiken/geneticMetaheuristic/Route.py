@@ -1,14 +1,41 @@
 class Route:
-    def __init__(self, ra_id, pr_id, distance, cluster, group_size):
-        self.RA = ra_id  
-        self.PR = pr_id
-        self.distance = distance # distance in meters (not km like in json)
-        self.cluster = cluster
-        self.group_size = group_size # Is used to simplify the optimizatino / make the algorithm faster and not calculate each route individual
+    """
+    Thin view on one row of a PossibleSolution genome.
+    It is only used for compatibility (plots, exports), the algorithm itself works on the genome arrays.
+    """
+    __slots__ = ("solution", "index")
+
+    def __init__(self, solution, index):
+        self.solution = solution
+        self.index = index
 
     def __repr__(self):
         return f"{self.__class__.__name__}({self.RA} -> {self.PR}, m={self.distance})"
 
-    def set_pr(self, pr_id, distance):
-        self.PR = pr_id
-        self.distance = distance
\ No newline at end of file
+    @property
+    def RA(self):
+        return self.solution.ra_list[self.solution.genome.ra_idx[self.index]]["id"]
+
+    @property
+    def PR(self):
+        return self.solution.pr_list[self.solution.genome.pr_idx[self.index]]["id"]
+
+    @property
+    def distance(self):
+        return float(self.solution.genome.distance[self.index]) # distance in meters (not km like in json)
+
+    @property
+    def cluster(self):
+        return self.solution.cluster_mapper.clusters[self.solution.genome.cluster_idx[self.index]]
+
+    @property
+    def group_size(self):
+        return int(self.solution.genome.group_size[self.index]) # Is used to simplify the optimizatino / make the algorithm faster and not calculate each route individual
+
+    def set_pr(self, pr_id, distance=None):
+        instance = self.solution.instance
+        pr_idx = instance.pr_index[pr_id]
+        self.solution.genome.pr_idx[self.index] = pr_idx
+        # by default the distance of the edge (RA -> new PR)
+        self.solution.genome.distance[self.index] = distance if distance is not None else instance.index.distance_m[self.solution.genome.ra_idx[self.index], pr_idx]
+        self.solution.mark_changed_routes([self.index])
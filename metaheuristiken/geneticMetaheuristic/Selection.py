@@ -0,0 +1,65 @@
+import numpy as np
+
+SELECTION_METHODS = ("roulette", "tournament")
+
+
+class Selection():
+    """
+    Parent selection and best solutions of one generation.
+    The losses (and the roulette probabilities) are computed once, afterwards all parents of the next generation are drawn
+    in batches and the k best solutions are found by partial selection instead of sorting the whole generation.
+    """
+    EPSILON = 1e-8  # To avoid division by zero
+
+    def __init__(self, population, method="roulette", tournament_size=3):
+        if method not in SELECTION_METHODS:
+            raise ValueError(f"Unknown selection method {method}, use one of {SELECTION_METHODS}")
+
+        self.population = population
+        self.method = method
+        self.tournament_size = tournament_size
+        self.losses = np.array([ind.loss for ind in population], dtype=np.float64)
+
+        # Roulette: low loss makes a solution more likely to get picked
+        self.probabilities = None
+        if method == "roulette":
+            weights = 1 / (self.losses + self.EPSILON)
+            self.probabilities = weights / weights.sum()
+
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(method={self.method}, population_size={len(self.population)})"
+
+
+    def draw(self, rng, k):
+        """
+        Draws k parents (with replacement) at once
+        """
+        return [self.population[i] for i in self.draw_indices(rng, k).tolist()]
+
+
+    def draw_indices(self, rng, k):
+        if self.method == "roulette":
+            return rng.choice(len(self.population), size=k, p=self.probabilities)
+
+        # Tournament: the best of tournament_size uniformly drawn solutions wins
+        contestants = rng.integers(len(self.population), size=(k, self.tournament_size))
+        return contestants[np.arange(k), np.argmin(self.losses[contestants], axis=1)]
+
+
+    def best(self, k):
+        """
+        Returns the k solutions with the lowest loss, best first (equal losses keep the order of the generation, like sorted())
+        """
+        return [self.population[i] for i in self.best_indices(k).tolist()]
+
+
+    def best_indices(self, k):
+        k = max(0, min(k, len(self.losses)))
+        if k == 0:
+            return np.empty(0, dtype=np.int64)
+
+        # only the solutions up to the k-th lowest loss are sorted
+        kth_loss = np.partition(self.losses, k - 1)[k - 1]
+        candidates = np.flatnonzero(self.losses <= kth_loss)
+        return candidates[np.argsort(self.losses[candidates], kind="stable")][:k]
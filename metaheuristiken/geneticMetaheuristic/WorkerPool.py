@@ -0,0 +1,108 @@
+from concurrent.futures import ProcessPoolExecutor
+import math
+import time
+from metaheuristiken.geneticMetaheuristic import EvaluationUtils
+from metaheuristiken.geneticMetaheuristic import GeneticUtils
+from metaheuristiken.geneticMetaheuristic.LoadHistogram import LoadHistogram
+from metaheuristiken.geneticMetaheuristic.PossibleSolution import PossibleSolution
+from metaheuristiken.geneticMetaheuristic.RandomUtils import make_rng, STREAM_OFFSPRING, STREAM_INITIAL_POPULATION
+import numpy as np
+
+# shared ProblemInstance of a worker process, it is sent only once when the process starts
+_worker_instance = None
+
+
+def _init_worker(instance):
+    global _worker_instance
+    _worker_instance = instance
+
+
+def _evaluate_genome(task):
+    genome, cluster_start_times = task
+    if _worker_instance.load_bucket_size:
+        return LoadHistogram.create(_worker_instance, genome, cluster_start_times).loss_dict(_worker_instance, genome, cluster_start_times)
+    return EvaluationUtils.loss_dict(_worker_instance, genome, cluster_start_times)
+
+
+def _create_offspring(task):
+    offspring_type, parent_states, seed, stream_key = task
+    parents = [PossibleSolution.from_state(_worker_instance, state) for state in parent_states]
+    start = time.perf_counter()
+    child = GeneticUtils.create_offspring(offspring_type, parents, make_rng(seed, *stream_key))
+    return child.get_state(), time.perf_counter() - start
+
+
+def _draw_new_solutions(task):
+    seed, solution_indices = task
+    rngs = [make_rng(seed, STREAM_INITIAL_POPULATION, 0, i) for i in solution_indices]
+    return GeneticUtils.draw_new_possible_solutions(_worker_instance, rngs)
+
+
+class WorkerPool():
+    """
+    Persistent process pool of a GeneticMetaheuristik run.
+    Every worker receives the ProblemInstance once, afterwards only genomes are sent to the workers.
+    """
+    def __init__(self, instance, num_workers, min_population=16):
+        self.instance = instance
+        self.num_workers = num_workers
+        self.min_population = min_population # below this amount of individuals the IPC costs more than it saves
+        self.executor = ProcessPoolExecutor(max_workers=num_workers, initializer=_init_worker, initargs=(instance,))
+
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(num_workers={self.num_workers}, min_population={self.min_population})"
+
+
+    def use_for(self, num_individuals):
+        return self.executor is not None and num_individuals >= self.min_population
+
+
+    def calculate_loss_dicts(self, possible_solutions):
+        """
+        Calculates the loss components of all given solutions in the worker processes (same order as the input)
+        """
+        tasks = [(ps.genome, ps.get_cluster_start_times()) for ps in possible_solutions]
+        chunksize = max(1, math.ceil(len(tasks) / (self.num_workers * 4)))
+        return list(self.executor.map(_evaluate_genome, tasks, chunksize=chunksize))
+
+
+    def create_offspring(self, offspring_tasks, seed, iteration, phase_timer=None, first_child_idx=0):
+        """
+        Creates the children of the given (offspring_type, parents) tasks in the worker processes.
+        Every child uses its own random stream (seed, iteration, first_child_idx + task index), so the result does not depend on the number of workers.
+        The creation times measured in the workers are added to the phase timer (if given) by birth type.
+        """
+        tasks = []
+        for child_idx, (offspring_type, parents) in enumerate(offspring_tasks, first_child_idx):
+            tasks.append((offspring_type, [p.get_state() for p in parents], seed, (STREAM_OFFSPRING, iteration, child_idx)))
+
+        chunksize = max(1, math.ceil(len(tasks) / (self.num_workers * 4)))
+        children = []
+        for state, seconds in self.executor.map(_create_offspring, tasks, chunksize=chunksize):
+            child = PossibleSolution.from_state(self.instance, state)
+            if phase_timer is not None:
+                phase_timer.add_operator(child.birth_type, seconds)
+            children.append(child)
+        return children
+
+
+    def create_initial_population(self, seed, population_size):
+        """
+        Creates the random initial solutions in batches, the random draws and cluster distributions are made in the worker processes,
+        only the (much bigger) routes are expanded here, so that just arrays per RA have to be sent back.
+        Solution i always uses the random stream (seed, i), so the result does not depend on the number of workers.
+        """
+        tasks = [(seed, chunk.tolist()) for chunk in np.array_split(np.arange(population_size), self.num_workers) if len(chunk)]
+        start_times, assignments, target_prs = [], [], []
+        for chunk_start_times, chunk_assignments, chunk_target_prs in self.executor.map(_draw_new_solutions, tasks):
+            start_times += chunk_start_times
+            assignments += chunk_assignments
+            target_prs += chunk_target_prs
+        return GeneticUtils.build_new_possible_solutions(self.instance, start_times, assignments, target_prs)
+
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
@@ -0,0 +1,28 @@
+from metaheuristiken.geneticMetaheuristic import CheckpointUtils
+from metaheuristiken.geneticMetaheuristic import GeneticUtils
+from metaheuristiken.geneticMetaheuristic.Generation import Generation
+from metaheuristiken.geneticMetaheuristic.Genome import Genome
+from metaheuristiken.geneticMetaheuristic.ProblemInstance import ProblemInstance
+import numpy as np
+
+def test_1_checkpoint_round_trip(tmp_path):
+    ra_list = [{"id": f"RA{i}", "population": 30 + i} for i in range(8)]
+    pr_list = [{"id": f"PR{i}", "capacity": 100} for i in range(3)]
+    edges_list = [{"from": ra["id"], "to": pr["id"], "distance_km": 1.0 + i} for ra in ra_list for i, pr in enumerate(pr_list)]
+    instance = ProblemInstance(pr_list, ra_list, edges_list, max_street_capacity=80, num_clusters=3, route_group_size=10)
+
+    generation = Generation(GeneticUtils.create_new_possible_solutions(instance, [np.random.default_rng(i) for i in range(4)]))
+    generation.set_losses()
+    generation[0].birth_type = "elit"
+
+    CheckpointUtils.save_checkpoint(str(tmp_path), generation, iteration_counter=7, seed=123, iteration_times=[1.5, 2.5], elapsed_time=4.0)
+    loaded, run_state = CheckpointUtils.load_checkpoint(str(tmp_path), instance)
+
+    assert run_state == {"iteration_counter": 7, "seed": 123, "iteration_times": [1.5, 2.5], "elapsed_time": 4.0}
+    for original, restored in zip(generation, loaded):
+        for name in Genome.__slots__:
+            assert getattr(original.genome, name).tolist() == getattr(restored.genome, name).tolist()
+        assert original.cluster_mapper.get_state()[0] == restored.cluster_mapper.get_state()[0]
+        assert original.cluster_mapper.assignment.tolist() == restored.cluster_mapper.assignment.tolist()
+        assert (original.loss, original.birth_type) == (restored.loss, restored.birth_type)
+        assert restored.get_loss_dict() == restored.loss_dict
@@ -0,0 +1,52 @@
+from metaheuristiken.geneticMetaheuristic.ClusterMapper import ClusterMapper
+from metaheuristiken.geneticMetaheuristic.ProblemInstance import ProblemInstance
+import numpy as np
+
+def create_instance():
+    ra_list = [{"id": f"RA{i}", "population": 10 * (i + 1)} for i in range(6)]
+    pr_list = [{"id": "PR0", "capacity": 1000}]
+    edges_list = [{"from": ra["id"], "to": "PR0", "distance_km": 1.0} for ra in ra_list]
+    return ProblemInstance(pr_list, ra_list, edges_list, max_street_capacity=100, num_clusters=3)
+
+def test_1_reassign_updates_populations_and_lookup():
+    instance = create_instance()
+    cluster_mapper = ClusterMapper(instance, np.random.default_rng(1))
+    assert sum(c.size for c in cluster_mapper.clusters) == instance.city_population
+
+    old_cluster = cluster_mapper.find_RA_cluster("RA5")
+    new_cluster = cluster_mapper.clusters[(old_cluster.index + 1) % 3]
+    old_size, new_size = old_cluster.size, new_cluster.size
+
+    cluster_mapper.reassign_ra(instance.ra_index["RA5"], new_cluster.index)
+
+    assert cluster_mapper.find_RA_cluster("RA5") is new_cluster
+    assert "RA5" in new_cluster.ra_ids and "RA5" not in old_cluster.ra_ids
+    assert (old_cluster.size, new_cluster.size) == (old_size - 60, new_size + 60)
+
+def test_2_state_round_trip():
+    instance = create_instance()
+    cluster_mapper = ClusterMapper(instance, np.random.default_rng(2))
+    cluster_mapper.recluster_population(np.random.default_rng(3))
+
+    copied = cluster_mapper.copy()
+    copied.reassign_ra(0, (copied.assignment[0] + 1) % 3)
+
+    assert [c.start_time for c in copied.clusters] == [c.start_time for c in cluster_mapper.clusters]
+    assert (copied.assignment != cluster_mapper.assignment).sum() == 1
+    assert sum(c.size for c in cluster_mapper.clusters) == sum(c.size for c in copied.clusters) == instance.city_population
+
+def test_3_balanced_reclustering_cuts_at_population_shares():
+    ra_list = [{"id": f"RA{i}", "population": 100} for i in range(9)] + [{"id": "RA9", "population": 900}]
+    pr_list = [{"id": "PR0", "capacity": 10000}]
+    edges_list = [{"from": ra["id"], "to": "PR0", "distance_km": 1.0} for ra in ra_list]
+    instance = ProblemInstance(pr_list, ra_list, edges_list, max_street_capacity=1000, num_clusters=2)
+    cluster_mapper = ClusterMapper(instance, np.random.default_rng(4))
+
+    for seed in range(5):
+        cluster_mapper.recluster_population(np.random.default_rng(seed))
+        assert sorted(len(c.ra_ids) for c in cluster_mapper.clusters) == [5, 5]
+
+        cluster_mapper.recluster_population(np.random.default_rng(seed), balanced=True)
+        assert sum(c.size for c in cluster_mapper.clusters) == 1800
+        assert max(c.size for c in cluster_mapper.clusters) <= 1300 # the big RA can't be split
+        assert len(cluster_mapper.find_RA_cluster("RA9").ra_ids) <= 5
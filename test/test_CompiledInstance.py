@@ -0,0 +1,58 @@
+from metaheuristiken.geneticMetaheuristic.CompiledInstance import CompiledInstance
+from metaheuristiken.geneticMetaheuristic.ProblemInstance import ProblemInstance
+from metaheuristiken.geneticMetaheuristic.GeneticMetaheuristik import GeneticMetaheuristik
+from metaheuristiken.geneticMetaheuristic.InstanceGeneratorUtils import generate_instance
+import json
+import numpy as np
+import os
+
+def test_1_compiled_instance_matches_json(tmp_path):
+    data = generate_instance(20, 5, seed=1, edge_density=0.6)
+    json_path = os.path.join(tmp_path, "instance.json")
+    with open(json_path, "w") as f:
+        json.dump(data, f)
+
+    compiled = CompiledInstance.load_cached(json_path)
+    assert os.path.exists(CompiledInstance.cache_path(json_path))
+    assert compiled.ra_list() == data["residential_areas"]
+    assert compiled.pr_list() == data["places_of_refuge"]
+
+    from_json = ProblemInstance(data["places_of_refuge"], data["residential_areas"], data["edges"], 1000, 3)
+    from_compiled = ProblemInstance.from_compiled(CompiledInstance.load_cached(json_path), 1000, 3)
+    for name in ("distance_m", "edge_offsets", "edge_pr", "edge_distance", "edge_weight", "edges_by_distance"):
+        assert np.array_equal(getattr(from_json.index, name), getattr(from_compiled.index, name), equal_nan=True)
+    assert from_json.max_start_time == from_compiled.max_start_time
+    key = lambda edge: (edge["from"], edge["to"])
+    assert sorted(from_compiled.edges_list, key=key) == sorted(data["edges"], key=key)
+
+def test_2_changed_json_gets_a_new_cache_file(tmp_path):
+    json_path = os.path.join(tmp_path, "instance.json")
+    with open(json_path, "w") as f:
+        json.dump(generate_instance(5, 2, seed=1), f)
+    first_path = CompiledInstance.cache_path(json_path)
+    CompiledInstance.load_cached(json_path)
+
+    with open(json_path, "w") as f:
+        json.dump(generate_instance(6, 2, seed=1), f)
+    assert CompiledInstance.cache_path(json_path) != first_path
+    assert len(CompiledInstance.load_cached(json_path).ra_ids) == 6
+
+def test_3_run_builds_the_lists_once(tmp_path, monkeypatch):
+    json_path = os.path.join(tmp_path, "instance.json")
+    with open(json_path, "w") as f:
+        json.dump(generate_instance(20, 4, seed=0), f)
+    compiled = CompiledInstance.load_cached(json_path)
+
+    calls = []
+    for name in ("ra_list", "pr_list"):
+        method = getattr(CompiledInstance, name)
+        monkeypatch.setattr(CompiledInstance, name, lambda self, method=method, name=name: calls.append(name) or method(self))
+
+    konfiguration = {"max_laufzeit": 600, "max_iterationen": 1, "patience": 1, "route_group_size": 20, "population_size": 4, "street_capacity": 0.2, "num_clusters": 10, "seed": 1}
+    mh = GeneticMetaheuristik(compiled, konfiguration, os.path.join(tmp_path, "run"))
+    try:
+        mh.load_instance()
+    finally:
+        mh.close()
+    assert sorted(calls) == ["pr_list", "ra_list"]
+    assert mh.instance.ra_list is mh.ra_list and mh.instance.pr_list is mh.pr_list
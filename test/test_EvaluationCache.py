@@ -0,0 +1,77 @@
+from metaheuristiken.geneticMetaheuristic.EvaluationCache import EvaluationCache
+from metaheuristiken.geneticMetaheuristic.ProblemInstance import ProblemInstance
+from metaheuristiken.geneticMetaheuristic.Genome import Genome
+from metaheuristiken.geneticMetaheuristic import EvaluationUtils, GeneticUtils
+import numpy as np
+
+def create_instance(num_ras, num_prs, max_street_capacity):
+    ra_list = [{"id": f"RA{i}", "population": 100} for i in range(num_ras)]
+    pr_list = [{"id": f"PR{i}", "capacity": 60 * num_ras // num_prs} for i in range(num_prs)]
+    edges_list = [{"from": ra["id"], "to": pr["id"], "distance_km": 1.5} for ra in ra_list for pr in pr_list]
+    return ProblemInstance(pr_list, ra_list, edges_list, max_street_capacity, num_clusters=4, route_group_size=10, incremental_evaluation=True)
+
+def test_1_incremental_updates_equal_full_evaluation():
+    rng = np.random.default_rng(3)
+    instance = create_instance(num_ras=30, num_prs=5, max_street_capacity=400)
+
+    # few distinct times, so that many events share the same time
+    num_routes = 300
+    genome = Genome(
+        ra_idx=np.repeat(np.arange(30), 10),
+        pr_idx=rng.integers(0, 5, size=num_routes),
+        distance=rng.integers(1, 6, size=num_routes) * 500.0,
+        cluster_idx=rng.integers(0, 4, size=num_routes),
+        group_size=rng.integers(1, 20, size=num_routes)
+    )
+    start_times = rng.integers(0, 4, size=4).astype(np.float64) * 1000
+    cache = EvaluationCache.create(instance, genome, start_times)
+
+    for _ in range(50):
+        genome = genome.copy()
+        changed = rng.integers(0, num_routes, size=rng.integers(1, 20))
+        genome.pr_idx[changed] = rng.integers(0, 5, size=len(changed))
+        genome.distance[changed] = rng.integers(1, 6, size=len(changed)) * 500.0
+        if rng.random() < 0.3:
+            start_times = start_times.copy()
+            start_times[rng.integers(0, 4)] = rng.integers(0, 4) * 1000
+
+        cache = cache.update(instance, genome, start_times)
+        assert cache.loss_dict(instance, genome) == EvaluationUtils.loss_dict(instance, genome, start_times)
+
+def test_2_unchanged_genome_keeps_cache():
+    instance = create_instance(num_ras=4, num_prs=2, max_street_capacity=50)
+    genome = Genome([0, 1, 2, 3], [0, 1, 0, 1], [1000.0, 1500.0, 500.0, 1500.0], [0, 1, 2, 3], [100, 100, 100, 100])
+    start_times = np.array([0.0, 500.0, 1000.0, 1500.0])
+
+    cache = EvaluationCache.create(instance, genome, start_times)
+    assert cache.update(instance, genome.copy(), start_times) is cache
+
+def test_3_offspring_take_the_incremental_path(monkeypatch):
+    rng = np.random.default_rng(5)
+    # different distances and capacities, so that every changed route changes the loss
+    ra_list = [{"id": f"RA{i}", "population": 100} for i in range(30)]
+    pr_list = [{"id": f"PR{j}", "capacity": 300 + 200 * j} for j in range(5)]
+    edges_list = [{"from": ra["id"], "to": pr["id"], "distance_km": float(rng.uniform(0.5, 3))} for ra in ra_list for pr in pr_list]
+    instance = ProblemInstance(pr_list, ra_list, edges_list, max_street_capacity=400, num_clusters=4, route_group_size=10, incremental_evaluation=True,
+                               recluster_routes=True)
+    full_evaluations = []
+    create = EvaluationCache.create.__func__
+    monkeypatch.setattr(EvaluationCache, "create", classmethod(lambda cls, *args: full_evaluations.append(args) or create(cls, *args)))
+    # the start time mutation shifts whole clusters, so any share of changed routes is updated here
+    monkeypatch.setattr(EvaluationCache, "MAX_CHANGED_ROUTES", 1.0)
+
+    parent1 = GeneticUtils.create_new_possible_solution(instance, rng)
+    for i, cluster in enumerate(parent1.cluster_mapper.clusters):
+        cluster.start_time = 2000 * i # a reclustered route moves on the street
+    parent1.set_loss()
+    parent2 = GeneticUtils.apply_mutation(parent1, route_change_rate=0.05, reclustering_rate=1.0, rng=rng)
+    parent2.set_loss()
+    crossover_child = GeneticUtils.mutation_crossover(parent1, parent2, mutation_rate=0.0, rng=rng)
+    crossover_child.set_loss()
+    mutated_child = GeneticUtils.apply_mutation(crossover_child, reclustering_rate=0.0, rng=rng) # with reclustering
+    mutated_child.set_loss()
+
+    assert len(full_evaluations) == 1 # only the first parent
+    for child in [parent2, crossover_child, mutated_child]:
+        assert child.loss_dict == EvaluationUtils.loss_dict(instance, child.genome, child.get_cluster_start_times())
+        assert len(child.changed_routes) == 0
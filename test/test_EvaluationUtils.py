@@ -0,0 +1,41 @@
+from metaheuristiken.geneticMetaheuristic import EvaluationUtils
+import numpy as np
+
+def test_1_vectorized_street_overflows_equal_legacy():
+    rng = np.random.default_rng(42)
+
+    for max_street_capacity in [50, 500, 5000]:
+        # few distinct start times and distances, so that many events share the same time
+        group_sizes = rng.integers(1, 100, size=300)
+        enter_times = rng.integers(0, 5, size=300).astype(np.float64) * 1000
+        exit_times = enter_times + rng.integers(1, 8, size=300) * 500
+
+        assert EvaluationUtils.street_overflows(enter_times, exit_times, group_sizes, max_street_capacity) == \
+               EvaluationUtils.street_overflows_legacy(enter_times, exit_times, group_sizes, max_street_capacity)
+
+def test_2_pr_usage():
+    pr_idx = np.array([0, 2, 2, 1, 2])
+    group_sizes = np.array([10, 5, 5, 3, 20])
+    pr_capacity = np.array([10, 5, 20])
+
+    usage, overflows = EvaluationUtils.pr_usage(pr_idx, group_sizes, pr_capacity)
+
+    assert usage.tolist() == [10, 3, 30]
+    assert overflows.tolist() == [0, 0, 10]
+    assert pr_capacity.tolist() == [10, 5, 20]
+
+def test_3_per_person_street_overflows_equal_single_person_events():
+    rng = np.random.default_rng(7)
+
+    for max_street_capacity in [20, 200, 2000]:
+        group_sizes = rng.integers(1, 60, size=80)
+        enter_times = rng.integers(0, 4, size=80).astype(np.float64) * 1000
+        exit_times = enter_times + rng.integers(1, 6, size=80) * 500
+
+        # legacy sweep with one event per person (route_group_size=1)
+        single_persons = np.repeat(np.arange(80), group_sizes)
+        expected = EvaluationUtils.street_overflows_legacy(
+            enter_times[single_persons], exit_times[single_persons], np.ones(len(single_persons), dtype=np.int64), max_street_capacity
+        )
+
+        assert EvaluationUtils.street_overflows_per_person(enter_times, exit_times, group_sizes, max_street_capacity) == expected
@@ -1,4 +1,6 @@
 from metaheuristiken.geneticMetaheuristic.GeneticMetaheuristik import GeneticMetaheuristik
+from metaheuristiken.geneticMetaheuristic.InstanceGeneratorUtils import generate_instance
+import numpy as np
 import os
 from hashlib import md5
 import time
@@ -115,3 +117,43 @@ def test_3_number_of_people():
 
     assert total_population_input == total_persons_output
 
+
+def test_4_same_seed_same_run_with_and_without_workers():
+    eingabe_daten = generate_instance(30, 5, seed=3)
+
+    def run(num_workers):
+        mh = GeneticMetaheuristik(
+            eingabe_daten,
+            {
+                "max_laufzeit": 999999999999,
+                "max_iterationen": 3,
+                "patience": 3,
+                "route_group_size": 20,
+                "population_size": 10,
+                "street_capacity": 0.2,
+                "num_clusters": 10,
+                "seed": 42,
+                "num_workers": num_workers,
+                "parallel_min_population": 1, # the pool is used for every batch
+                "parallel_initial_population": True
+            },
+            os.path.join(OUTPUT_VERZEICHNIS, f'geneticMetaheuristic_TEST_4_{num_workers}')
+        )
+        try:
+            mh.initialisiere()
+            losses = [[ps.loss for ps in mh.generations[-1]]]
+            for _ in range(3):
+                mh.iteriere()
+                losses.append([ps.loss for ps in mh.generations[-1]])
+            best_solution = mh.get_best_solution()
+            return losses, best_solution.genome, best_solution.get_cluster_start_times()
+        finally:
+            mh.close()
+
+    serial_losses, serial_genome, serial_start_times = run(0)
+    pool_losses, pool_genome, pool_start_times = run(2)
+
+    assert pool_losses == serial_losses
+    for column in ["ra_idx", "pr_idx", "distance", "cluster_idx", "group_size"]:
+        assert np.array_equal(getattr(pool_genome, column), getattr(serial_genome, column))
+    assert np.array_equal(pool_start_times, serial_start_times)
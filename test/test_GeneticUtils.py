@@ -0,0 +1,66 @@
+from metaheuristiken.geneticMetaheuristic import GeneticUtils
+from metaheuristiken.geneticMetaheuristic.Genome import Genome
+from metaheuristiken.geneticMetaheuristic.ProblemInstance import ProblemInstance
+import numpy as np
+
+def create_instance(aggregated_genome=False, **kwargs):
+    ra_list = [{"id": f"RA{i}", "population": p} for i, p in enumerate([25, 0, 7, 40, 13])]
+    pr_list = [{"id": f"PR{i}", "capacity": 50} for i in range(3)]
+    edges_list = [{"from": ra["id"], "to": pr["id"], "distance_km": 0.5 + i} for ra in ra_list for i, pr in enumerate(pr_list)]
+    return ProblemInstance(pr_list, ra_list, edges_list, max_street_capacity=30, num_clusters=2, route_group_size=10, aggregated_genome=aggregated_genome,
+                           **kwargs)
+
+def test_1_route_layout():
+    ra_idx, group_size = GeneticUtils.get_route_layout(create_instance())
+    assert ra_idx.tolist() == [0, 0, 0, 2, 3, 3, 3, 3, 4, 4]
+    assert group_size.tolist() == [10, 10, 5, 7, 10, 10, 10, 10, 10, 3]
+
+    ra_idx, group_size = GeneticUtils.get_route_layout(create_instance(aggregated_genome=True))
+    assert ra_idx.tolist() == [0, 2, 3, 4]
+    assert group_size.tolist() == [25, 7, 40, 13]
+
+def test_2_batched_solutions_equal_single_solutions():
+    instance = create_instance()
+    batch = GeneticUtils.create_new_possible_solutions(instance, [np.random.default_rng(i) for i in range(5)])
+
+    for i, possible_solution in enumerate(batch):
+        single = GeneticUtils.create_new_possible_solution(instance, np.random.default_rng(i))
+        for name in Genome.__slots__:
+            assert getattr(possible_solution.genome, name).tolist() == getattr(single.genome, name).tolist()
+        assert possible_solution.cluster_mapper.get_state()[0] == single.cluster_mapper.get_state()[0]
+
+        # every RA is sent to one PR and all its routes are in its cluster
+        genome = possible_solution.genome
+        assert (genome.cluster_idx == possible_solution.cluster_mapper.assignment[genome.ra_idx]).all()
+        assert (genome.distance == instance.index.distance_m[genome.ra_idx, genome.pr_idx]).all()
+        assert possible_solution.birth_type == "new_random"
+
+def test_3_cluster_mutations_keep_the_route_clusters():
+    for aggregated_genome in (False, True):
+        for recluster_routes in (False, True):
+            instance = create_instance(aggregated_genome, recluster_routes=recluster_routes)
+            parent = GeneticUtils.create_new_possible_solution(instance, np.random.default_rng(0))
+            for seed in range(20):
+                child = GeneticUtils.apply_mutation(parent, route_change_rate=0.0, reclustering_rate=0.0, rng=np.random.default_rng(seed))
+                genome = child.genome
+                if recluster_routes: # the routes follow their RA into its new cluster
+                    assert (genome.cluster_idx == child.cluster_mapper.assignment[genome.ra_idx]).all()
+                else: # by default only the ClusterMapper is changed
+                    assert genome.cluster_idx.tolist() == parent.genome.cluster_idx.tolist()
+            assert (child.cluster_mapper.assignment != parent.cluster_mapper.assignment).any()
+
+def test_4_crossover_of_a_single_ra():
+    ra_list = [{"id": "RA0", "population": 10}]
+    pr_list = [{"id": f"PR{i}", "capacity": 50} for i in range(2)]
+    edges_list = [{"from": "RA0", "to": pr["id"], "distance_km": 1.0 + i} for i, pr in enumerate(pr_list)]
+    for aggregated_genome in (False, True):
+        instance = ProblemInstance(pr_list, ra_list, edges_list, max_street_capacity=30, num_clusters=1, route_group_size=10,
+                                   aggregated_genome=aggregated_genome)
+        parent1 = GeneticUtils.create_new_possible_solution(instance, np.random.default_rng(0))
+        parent2 = GeneticUtils.create_new_possible_solution(instance, np.random.default_rng(1))
+        assert len(parent1.genome) == 1
+
+        child = GeneticUtils.mutation_crossover(parent1, parent2, mutation_rate=1.0, rng=np.random.default_rng(2))
+        assert child is not parent1 and child.birth_type == "crossover"
+        for name in Genome.__slots__:
+            assert getattr(child.genome, name).tolist() == getattr(parent1.genome, name).tolist()
@@ -0,0 +1,28 @@
+from metaheuristiken.geneticMetaheuristic import InstanceGeneratorUtils
+from metaheuristiken.geneticMetaheuristic.ProblemInstance import ProblemInstance
+import json
+import os
+
+def test_1_generate_instance(monkeypatch):
+    monkeypatch.setattr(InstanceGeneratorUtils, "RA_CHUNK_SIZE", 7) # several chunks
+    data = InstanceGeneratorUtils.generate_instance(30, 10, seed=1, edge_density=0.3, capacity_slack=0.5, population_distribution="pareto")
+
+    assert len(data["residential_areas"]) == 30
+    assert len(data["places_of_refuge"]) == 10
+    assert len(data["edges"]) == 30 * 3
+    city_population = sum(ra["population"] for ra in data["residential_areas"])
+    assert 1.49 < sum(pr["capacity"] for pr in data["places_of_refuge"]) / city_population <= 1.5
+    assert all(edge["distance_km"] > 0 for edge in data["edges"])
+
+    # deterministic from the seed and readable as instance
+    assert data == InstanceGeneratorUtils.generate_instance(30, 10, seed=1, edge_density=0.3, capacity_slack=0.5, population_distribution="pareto")
+    assert data != InstanceGeneratorUtils.generate_instance(30, 10, seed=2, edge_density=0.3, capacity_slack=0.5, population_distribution="pareto")
+    instance = ProblemInstance(data["places_of_refuge"], data["residential_areas"], data["edges"], city_population, 2)
+    assert instance.index.distance_m.shape == (30, 10)
+
+def test_2_write_instance_streams_the_same_instance(tmp_path, monkeypatch):
+    monkeypatch.setattr(InstanceGeneratorUtils, "RA_CHUNK_SIZE", 4)
+    path = os.path.join(tmp_path, "instance.json")
+    InstanceGeneratorUtils.write_instance(path, 10, 3, seed=5, edge_density=1.0)
+    with open(path) as f:
+        assert json.load(f) == InstanceGeneratorUtils.generate_instance(10, 3, seed=5, edge_density=1.0)
@@ -0,0 +1,56 @@
+from metaheuristiken.geneticMetaheuristic.IslandGeneticMetaheuristik import IslandGeneticMetaheuristik
+from metaheuristiken.geneticMetaheuristic.GeneticMetaheuristik import GeneticMetaheuristik
+from metaheuristiken.geneticMetaheuristic.InstanceGeneratorUtils import generate_instance
+import pytest
+
+KONFIGURATION = {
+    "max_laufzeit": 600, "max_iterationen": 2, "patience": 2, "route_group_size": 20, "population_size": 6,
+    "street_capacity": 0.2, "num_clusters": 10, "seed": 1, "legacy_loss_logs": False,
+    "num_islands": 2, "migration_interval": 2, "num_migrants": 1
+}
+
+def test_1_two_islands_migrate_and_report_the_best(tmp_path):
+    mh = IslandGeneticMetaheuristik(generate_instance(20, 4, seed=0), KONFIGURATION, str(tmp_path))
+    try:
+        mh.initialisiere()
+        mh.iteriere() # iteration 2: the islands exchange their best solutions
+        # in the ring of two islands both receive the best of the other one, so both report the global best
+        assert len({float(ps.loss) for ps in mh.generations[-1]}) == 1
+        mh.iteriere()
+
+        island_bests = mh.generations[-1]
+        assert len(island_bests) == 2
+        loesung, loss = mh.gebe_endloesung_aus()
+        assert loss == min(ps.loss for ps in island_bests)
+        assert sum(flow["persons"] for flow in loesung["flows"]) == sum(ra["population"] for ra in mh.eingabe_daten["residential_areas"])
+    finally:
+        mh.close()
+    assert mh.islands == []
+
+def test_2_dead_island_raises_instead_of_blocking(tmp_path):
+    mh = IslandGeneticMetaheuristik(generate_instance(20, 4, seed=0), KONFIGURATION, str(tmp_path))
+    try:
+        mh.initialisiere()
+        process, _ = mh.islands[0]
+        process.kill()
+        process.join()
+        with pytest.raises(RuntimeError, match="Island 0"):
+            mh.iteriere()
+    finally:
+        mh.close()
+
+def test_3_island_crashing_during_a_command_raises(tmp_path, monkeypatch):
+    iteriere = GeneticMetaheuristik.iteriere
+    def crash(self):
+        if self.durchlauf_verzeichnis.endswith("island_1"):
+            raise MemoryError("island crashed")
+        iteriere(self)
+    # the island processes are forked after the patch, so the last island crashes after the command was received
+    monkeypatch.setattr(GeneticMetaheuristik, "iteriere", crash)
+    mh = IslandGeneticMetaheuristik(generate_instance(20, 4, seed=0), KONFIGURATION, str(tmp_path))
+    try:
+        mh.initialisiere()
+        with pytest.raises(RuntimeError, match="Island 1 .* died with exit code 1"):
+            mh.send_to_islands("iteriere")
+    finally:
+        mh.close()
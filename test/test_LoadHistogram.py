@@ -0,0 +1,87 @@
+from metaheuristiken.geneticMetaheuristic.Genome import Genome
+from metaheuristiken.geneticMetaheuristic.LoadHistogram import LoadHistogram
+from metaheuristiken.geneticMetaheuristic.PossibleSolution import PossibleSolution
+from metaheuristiken.geneticMetaheuristic.ProblemInstance import ProblemInstance
+from metaheuristiken.geneticMetaheuristic import EvaluationUtils
+import numpy as np
+
+def create_solution(load_bucket_size, max_street_capacity=100, num_routes=60):
+    ra_list = [{"id": f"RA{i}", "population": 50} for i in range(6)]
+    pr_list = [{"id": f"PR{j}", "capacity": 200} for j in range(2)]
+    edges_list = [{"from": ra["id"], "to": pr["id"], "distance_km": 0.5 + i + 0.7 * j} for i, ra in enumerate(ra_list) for j, pr in enumerate(pr_list)]
+    instance = ProblemInstance(pr_list, ra_list, edges_list, max_street_capacity, num_clusters=3, load_bucket_size=load_bucket_size)
+
+    rng = np.random.default_rng(4)
+    ra_idx, pr_idx = rng.integers(0, 6, size=num_routes), rng.integers(0, 2, size=num_routes)
+    genome = Genome(ra_idx, pr_idx, instance.index.distance_m[ra_idx, pr_idx], ra_idx % 3, rng.integers(1, 10, size=num_routes))
+    return PossibleSolution(instance, genome, rng=rng)
+
+def test_1_shifted_clusters_equal_new_histogram():
+    solution = create_solution(load_bucket_size=100)
+    instance, genome = solution.instance, solution.genome
+    start_times = np.array([0.0, 1500.0, 4000.0])
+    histogram = LoadHistogram.create(instance, genome, start_times)
+
+    for shifted_start_times in [np.array([0.0, 250.0, 4000.0]), np.array([9000.0, 1500.0, 30.0]), start_times]:
+        shifted = histogram.update(instance, genome, shifted_start_times)
+        expected = LoadHistogram.create(instance, genome, shifted_start_times)
+        length = max(len(shifted.loads), len(expected.loads))
+        assert np.array_equal(np.pad(shifted.loads, (0, length - len(shifted.loads))), np.pad(expected.loads, (0, length - len(expected.loads))))
+        assert shifted.loss_dict(instance, genome, shifted_start_times) == expected.loss_dict(instance, genome, shifted_start_times)
+    assert histogram.update(instance, genome, start_times) is histogram
+
+def test_2_approximation():
+    # without overflow the loss is exact (the time of the last event is not approximated)
+    solution = create_solution(load_bucket_size=100, max_street_capacity=1000)
+    assert solution.get_loss_dict() == solution.get_exact_loss_dict()
+
+    # all clusters start together -> the street is overflown
+    solution = create_solution(load_bucket_size=100)
+    for cluster in solution.cluster_mapper.clusters:
+        cluster.start_time = 0
+    street_overflow_loss = solution.get_loss_dict()[0]
+    assert street_overflow_loss > 0
+    assert solution.get_exact_loss_dict() != solution.get_loss_dict()
+    assert solution.get_exact_loss_dict() == EvaluationUtils.loss_dict(solution.instance, solution.genome, solution.get_cluster_start_times())
+
+def assert_equal_histograms(instance, genome, start_times, histogram):
+    expected = LoadHistogram.create(instance, genome, start_times)
+    length = max(len(histogram.loads), len(expected.loads))
+    for values, expected_values in [(histogram.loads, expected.loads), (histogram.events, expected.events)]:
+        assert np.array_equal(np.pad(values, (0, length - len(values))), np.pad(expected_values, (0, length - len(expected_values))))
+    assert histogram.loss_dict(instance, genome, start_times) == expected.loss_dict(instance, genome, start_times)
+
+def test_3_changed_routes_are_moved_between_the_clusters():
+    solution = create_solution(load_bucket_size=50)
+    instance, genome = solution.instance, solution.genome
+    rng = np.random.default_rng(8)
+    start_times = np.array([0.0, 1500.0, 4000.0])
+    histogram = LoadHistogram.create(instance, genome, start_times)
+
+    for _ in range(50):
+        genome = genome.copy()
+        changed = rng.choice(len(genome), size=rng.integers(1, 8), replace=False)
+        genome.cluster_idx[changed] = rng.integers(0, 3, size=len(changed))
+        genome.distance[changed] = rng.integers(1, 70, size=len(changed)) * 100.0 # partly longer than the histogram
+        genome.group_size[changed] = rng.integers(1, 10, size=len(changed))
+        if rng.random() < 0.3:
+            start_times = start_times.copy()
+            start_times[rng.integers(0, 3)] = rng.integers(0, 50) * 100
+
+        changed_routes = None if rng.random() < 0.5 else np.sort(changed)
+        histogram = histogram.update(instance, genome, start_times, changed_routes)
+        assert_equal_histograms(instance, genome, start_times, histogram)
+
+def test_4_marked_clone_is_updated():
+    solution = create_solution(load_bucket_size=50)
+    solution.set_loss()
+    clone = solution.clone()
+    clone.genome.cluster_idx[:5] = (clone.genome.cluster_idx[:5] + 1) % 3
+    clone.mark_changed_routes(np.arange(5))
+    clone.set_loss()
+
+    assert clone.evaluation_cache is not solution.evaluation_cache
+    assert len(clone.changed_routes) == 0
+    start_times = clone.get_cluster_start_times()
+    assert_equal_histograms(clone.instance, clone.genome, start_times, clone.evaluation_cache)
+    assert clone.loss_dict == clone.evaluation_cache.loss_dict(clone.instance, clone.genome, start_times)
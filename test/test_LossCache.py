@@ -0,0 +1,14 @@
+from metaheuristiken.geneticMetaheuristic.LossCache import LossCache
+
+def test_1_least_recently_used_entry_is_evicted():
+    loss_cache = LossCache(max_size=2)
+    loss_cache.put(b"a", (1, 0, 0))
+    loss_cache.put(b"b", (2, 0, 0))
+
+    assert loss_cache.get(b"a") == (1, 0, 0) # "b" is now the least recently used entry
+    loss_cache.put(b"c", (3, 0, 0))
+
+    assert loss_cache.get(b"b") is None
+    assert loss_cache.get(b"c") == (3, 0, 0)
+    assert len(loss_cache) == 2
+    assert (loss_cache.hits, loss_cache.misses) == (2, 1)
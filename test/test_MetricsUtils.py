@@ -0,0 +1,53 @@
+from metaheuristiken.geneticMetaheuristic.MetricsUtils import load_metrics, METRICS_FILE
+from metaheuristiken.geneticMetaheuristic.ResultWriter import ResultWriter
+import numpy as np
+import os
+import pytest
+
+def test_1_load_metrics_jsonl(tmp_path):
+    writer = ResultWriter(str(tmp_path))
+    for i in range(3):
+        writer.append_json_line(METRICS_FILE, {
+            "iteration": i + 1,
+            "average_loss": 2.0 - i * 0.1,
+            "best_loss": 1.0 - i * 0.1,
+            "best_loss_components": [10.0 * i, 0.0, 0.5],
+            "birth_types": ["initial", "crossover"],
+            "losses": [1.0, float("inf")],
+            "loss_components": [[1.0, 2.0, 0.5], [float("nan")] * 3]
+        })
+    writer.close()
+
+    metrics = load_metrics(str(tmp_path))
+    assert metrics["iteration"].tolist() == [1, 2, 3]
+    assert np.allclose(metrics["best_loss"], [1.0, 0.9, 0.8])
+    assert metrics["best_loss_components"].shape == (3, 3)
+    assert metrics["individual_iteration"].tolist() == [1, 1, 2, 2, 3, 3]
+    assert metrics["birth_type"].tolist() == ["initial", "crossover"] * 3
+    assert np.isinf(metrics["loss"][1])
+    assert np.isnan(metrics["loss_components"][1]).all()
+
+def test_2_load_legacy_metrics(tmp_path):
+    with open(os.path.join(tmp_path, "average_losses.csv"), "w") as f:
+        f.write("2.0\n1.5\n")
+    with open(os.path.join(tmp_path, "best_losses.csv"), "w") as f:
+        f.write("np.float64(1.0)\n0.9\n")
+    with open(os.path.join(tmp_path, "best_solution_loss_dict.csv"), "w") as f:
+        f.write("(np.float64(140.8), 1, 1.0)\n(0, 0, np.float64(0.9))\n")
+    with open(os.path.join(tmp_path, "detailed_generation_loss.csv"), "w") as f:
+        f.write("[{'birth_type': 'initial', 'loss': np.float64(1.0)}]\n[{'birth_type': 'mutation', 'loss': 0.9}]\n")
+
+    metrics = load_metrics(str(tmp_path))
+    assert metrics["iteration"].tolist() == [0, 1]
+    assert np.allclose(metrics["best_loss"], [1.0, 0.9])
+    assert np.allclose(metrics["best_loss_components"][0], [140.8, 1, 1.0])
+    assert metrics["birth_type"].tolist() == ["initial", "mutation"]
+    assert metrics["individual_iteration"].tolist() == [0, 1]
+
+def test_3_unparsable_legacy_lines_are_skipped_with_a_warning(tmp_path):
+    with open(os.path.join(tmp_path, "detailed_generation_loss.csv"), "w") as f:
+        f.write("[{'birth_type': 'initial', 'loss': 1.0}]\n[{'birth_type': 'mutation', 'loss': inf}]\n")
+
+    with pytest.warns(RuntimeWarning, match="line 2"):
+        metrics = load_metrics(str(tmp_path))
+    assert metrics["birth_type"].tolist() == ["initial"]
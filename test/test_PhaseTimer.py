@@ -0,0 +1,37 @@
+from metaheuristiken.geneticMetaheuristic.PhaseTimer import PhaseTimer
+from metaheuristiken.geneticMetaheuristic.GeneticMetaheuristik import GeneticMetaheuristik
+from metaheuristiken.geneticMetaheuristic.InstanceGeneratorUtils import generate_instance
+import json
+
+def test_1_phases_and_operators_are_accumulated():
+    timer = PhaseTimer()
+    with timer.phase("losses"):
+        pass
+    with timer.phase("losses"):
+        pass
+    timer.add_operator("mutation", 0.5)
+    timer.add_operator("mutation", 0.25)
+    timer.add_operator("crossover", 1.0)
+
+    record = json.loads(json.dumps(timer.as_record()))
+    assert record["phases"]["losses"]["calls"] == 2
+    assert record["phases"]["losses"]["seconds"] >= 0
+    assert record["operators"] == {"mutation": {"seconds": 0.75, "calls": 2}, "crossover": {"seconds": 1.0, "calls": 1}}
+
+def test_2_iteration_phases(tmp_path):
+    konfiguration = {
+        "max_laufzeit": 600, "max_iterationen": 1, "patience": 1, "route_group_size": 20, "population_size": 10,
+        "street_capacity": 0.2, "num_clusters": 10, "seed": 1, "legacy_loss_logs": False
+    }
+    mh = GeneticMetaheuristik(generate_instance(20, 4, seed=0), konfiguration, str(tmp_path))
+    try:
+        mh.initialisiere()
+        mh.create_next_generation() # iteriere() writes and resets the phase timer
+
+        phases = mh.phase_timer.phases
+        for name in ["selection", "offspring", "repairs", "elites", "losses", "iteration"]:
+            assert phases[name]["calls"] == 1
+        assert mh.phase_timer.operators["repaired"]["calls"] == 2
+        assert sum(ps.birth_type == "repaired" for ps in mh.generations[-1]) == 2
+    finally:
+        mh.close()
@@ -0,0 +1,31 @@
+from metaheuristiken.geneticMetaheuristic.ProblemIndex import ProblemIndex
+import numpy as np
+
+def test_1_edge_selection_and_closest_prs():
+    ra_list = [{"id": "RA0", "population": 10}, {"id": "RA1", "population": 10}, {"id": "RA2", "population": 10}]
+    pr_list = [{"id": "PR0", "capacity": 10}, {"id": "PR1", "capacity": 30}, {"id": "PR2", "capacity": 20}]
+    edges_list = [
+        {"from": "RA1", "to": "PR2", "distance_km": 2.0},
+        {"from": "RA0", "to": "PR0", "distance_km": 1.0},
+        {"from": "RA1", "to": "PR0", "distance_km": 0.5},
+        {"from": "RA1", "to": "PR1", "distance_km": 2.0},
+        # RA2 has no edges
+    ]
+    index = ProblemIndex(ra_list, pr_list, edges_list, np.array([10, 30, 20]))
+
+    pr_candidates, distances, weights = index.edge_selection(1)
+    assert pr_candidates.tolist() == [2, 0, 1] # order of edges_list
+    assert distances.tolist() == [2000.0, 500.0, 2000.0]
+    # 0.5 * normalized(1 / distance_km) + 4 * normalized(capacity)
+    assert np.allclose(weights, [0.5 * 0 + 4 * 0.5, 0.5 * 1 + 4 * 0, 0.5 * 0 + 4 * 1])
+
+    # a single edge is normalized to 1
+    assert index.edge_selection(0)[2].tolist() == [4.5]
+    assert len(index.edge_selection(2)[0]) == 0
+
+    pr_candidates, distances = index.closest_prs(1)
+    assert pr_candidates.tolist() == [0, 1, 2]
+    assert distances.tolist() == [500.0, 2000.0, 2000.0]
+
+    assert index.distance_m[0].tolist()[0] == 1000.0
+    assert np.isnan(index.distance_m[0, 1])
@@ -0,0 +1,140 @@
+from metaheuristiken.geneticMetaheuristic.Genome import Genome
+from metaheuristiken.geneticMetaheuristic.PossibleSolution import PossibleSolution
+from metaheuristiken.geneticMetaheuristic.ProblemInstance import ProblemInstance
+from metaheuristiken.geneticMetaheuristic.EvaluationUtils import street_overflows
+from metaheuristiken.geneticMetaheuristic.RepairUtils import repair_pr_overflows, schedule_cluster_start_times, earliest_start_time, get_street_load, get_load_profile
+import numpy as np
+
+DISTANCES_KM = np.array([[1.0, 2.0, 4.0], [1.0, 3.0, 2.0], [2.0, 1.5, 1.0]]) # RA x PR
+
+def create_solution(aggregated_genome, rows, max_street_capacity=1000, load_bucket_size=0):
+    ra_list = [{"id": f"RA{i}", "population": 40} for i in range(3)]
+    pr_list = [{"id": "PR0", "capacity": 30}, {"id": "PR1", "capacity": 60}, {"id": "PR2", "capacity": 50}]
+    edges_list = [
+        {"from": ra["id"], "to": pr["id"], "distance_km": DISTANCES_KM[i, j]}
+        for i, ra in enumerate(ra_list) for j, pr in enumerate(pr_list)
+    ]
+    instance = ProblemInstance(pr_list, ra_list, edges_list, max_street_capacity=max_street_capacity, num_clusters=2, aggregated_genome=aggregated_genome, load_bucket_size=load_bucket_size)
+
+    ra_idx, pr_idx, group_size = (np.array(column) for column in zip(*rows))
+    distance = DISTANCES_KM[ra_idx, pr_idx] * 1000
+    genome = Genome(ra_idx, pr_idx, distance, np.zeros(len(rows)), group_size)
+    return PossibleSolution(instance, genome, rng=np.random.default_rng(0))
+
+def test_1_aggregated_moves_only_the_overflow_to_the_cheapest_prs():
+    # all 120 people at PR0 (capacity 30)
+    solution = create_solution(True, [(0, 0, 40), (1, 0, 40), (2, 0, 40)])
+    repair_pr_overflows(solution)
+
+    usage, overflows = solution.get_pr_usage()
+    assert overflows.sum() == 0
+    assert usage.sum() == 120
+    assert usage[0] == 30 # exactly the overflow was moved
+    # cheapest moves first: RA2 to PR2 (-1km), RA0 to PR1 (+1km), the rest of RA1 to PR2 (+1km)
+    genome = solution.genome
+    assert sorted(zip(genome.ra_idx.tolist(), genome.pr_idx.tolist(), genome.group_size.tolist())) == [(0, 1, 40), (1, 0, 30), (1, 2, 10), (2, 2, 40)]
+    assert np.allclose(genome.distance, DISTANCES_KM[genome.ra_idx, genome.pr_idx] * 1000)
+
+def test_2_grouped_moves_whole_routes():
+    solution = create_solution(False, [(0, 0, 20), (0, 0, 20), (1, 0, 20), (1, 0, 20), (2, 0, 20), (2, 0, 20)])
+    repair_pr_overflows(solution)
+
+    usage, overflows = solution.get_pr_usage()
+    assert usage.sum() == 120
+    assert overflows.sum() == 0
+    assert usage[0] == 20 # stops once PR0 is not overflown anymore
+    assert solution.genome.group_size.tolist() == [20] * 6
+
+def test_3_nothing_to_repair():
+    solution = create_solution(False, [(0, 0, 30), (1, 1, 40), (2, 2, 40)])
+    before = solution.genome.copy()
+    repair_pr_overflows(solution)
+    assert solution.genome.pr_idx.tolist() == before.pr_idx.tolist()
+
+def test_4_earliest_start_time_is_the_first_start_without_overflow():
+    rng = np.random.default_rng(3)
+    for _ in range(20):
+        scheduled_enter = rng.integers(0, 30, size=8).astype(np.float64)
+        scheduled_exit = scheduled_enter + rng.integers(1, 20, size=8)
+        scheduled_sizes = rng.integers(1, 10, size=8)
+        distance, group_size = rng.integers(0, 15, size=5).astype(np.float64), rng.integers(1, 10, size=5)
+        load_times, load = get_street_load(scheduled_enter, scheduled_exit, scheduled_sizes)
+        max_street_capacity = int(max(load.max(), group_size.sum())) + 5 # only the new profile can overflow the street
+
+        start_time = earliest_start_time(load_times, load, *get_load_profile(distance, group_size), max_street_capacity)
+
+        def overflow(t):
+            enter_times = np.concatenate((scheduled_enter, np.full(5, float(t))))
+            exit_times = np.concatenate((scheduled_exit, t + distance))
+            return street_overflows(enter_times, exit_times, np.concatenate((scheduled_sizes, group_size)), max_street_capacity)[1]
+
+        assert overflow(start_time) == 0
+        assert all(overflow(t) > 0 for t in range(start_time))
+
+def test_5_scheduled_start_times_remove_the_street_overflow():
+    solution = create_solution(False, [(0, 0, 20), (0, 0, 20), (1, 1, 20), (1, 1, 20), (2, 2, 20), (2, 2, 20)], max_street_capacity=90)
+    solution.genome.cluster_idx[:] = [0, 0, 1, 1, 1, 1]
+    for cluster in solution.cluster_mapper.clusters:
+        cluster.start_time = 0
+    assert solution.get_street_overflows()[1] > 0
+
+    schedule_cluster_start_times(solution)
+    assert solution.get_street_overflows()[1] == 0
+    assert solution.cluster_mapper.clusters[0].start_time == 0
+
+def test_6_augmenting_paths_pass_the_overflow_on():
+    # RA0 can only use PR0/PR1, RA1 prefers PR1 over PR2: the cheap moves fill PR1 with RA1, RA0 has to take its place
+    ra_list = [{"id": "RA0", "population": 10}, {"id": "RA1", "population": 10}]
+    pr_list = [{"id": "PR0", "capacity": 0}, {"id": "PR1", "capacity": 10}, {"id": "PR2", "capacity": 10}]
+    edges_list = [
+        {"from": "RA0", "to": "PR0", "distance_km": 1.0}, {"from": "RA0", "to": "PR1", "distance_km": 2.0},
+        {"from": "RA1", "to": "PR0", "distance_km": 1.0}, {"from": "RA1", "to": "PR1", "distance_km": 1.5},
+        {"from": "RA1", "to": "PR2", "distance_km": 3.0}
+    ]
+    for aggregated_genome in [True, False]:
+        instance = ProblemInstance(pr_list, ra_list, edges_list, max_street_capacity=100, num_clusters=1, aggregated_genome=aggregated_genome)
+        solution = PossibleSolution(instance, Genome([0, 1], [0, 0], [1000.0, 1000.0], [0, 0], [10, 10]), rng=np.random.default_rng(0))
+        repair_pr_overflows(solution)
+
+        genome = solution.genome
+        assert solution.get_sum_pr_overflows() == 0
+        assert sorted(zip(genome.ra_idx.tolist(), genome.pr_idx.tolist(), genome.group_size.tolist())) == [(0, 1, 10), (1, 2, 10)]
+        assert genome.distance.tolist() == [instance.index.distance_m[ra, pr] for ra, pr in zip(genome.ra_idx, genome.pr_idx)]
+
+def test_7_aggregated_repair_leaves_no_overflow():
+    rng = np.random.default_rng(11)
+    for _ in range(20):
+        # tight capacities of a hidden distribution without overflow, every RA has a few edges and starts at PR0
+        populations = rng.integers(1, 30, size=25)
+        hidden_prs = rng.integers(1, 6, size=25)
+        capacities = np.bincount(hidden_prs, weights=populations, minlength=6).astype(int)
+        ra_list = [{"id": f"RA{i}", "population": int(p)} for i, p in enumerate(populations)]
+        pr_list = [{"id": f"PR{j}", "capacity": int(c)} for j, c in enumerate(capacities)]
+        edges_list = [
+            {"from": f"RA{i}", "to": f"PR{j}", "distance_km": float(rng.uniform(0.5, 5))}
+            for i in range(25) for j in set(rng.integers(1, 6, size=2).tolist()) | {0, int(hidden_prs[i])}
+        ]
+        instance = ProblemInstance(pr_list, ra_list, edges_list, max_street_capacity=1000, num_clusters=1, aggregated_genome=True)
+
+        genome = Genome(np.arange(25), np.zeros(25), instance.index.distance_m[np.arange(25), 0], np.zeros(25), populations)
+        solution = PossibleSolution(instance, genome, rng=rng)
+        repair_pr_overflows(solution)
+
+        assert solution.get_sum_pr_overflows() == 0
+        assert np.bincount(solution.genome.ra_idx, weights=solution.genome.group_size).tolist() == populations.tolist()
+
+def test_8_scheduled_start_times_have_no_overflow_in_the_bucket_mode():
+    rng = np.random.default_rng(2)
+    for load_bucket_size in [300, 700, 1300]: # not aligned with the distances
+        rows = [(ra, pr, 20) for ra in range(3) for pr in range(3)]
+        # every cluster alone fits on the street (100 and 80 people), both together do not
+        solution = create_solution(False, rows, max_street_capacity=100, load_bucket_size=load_bucket_size)
+        solution.genome.cluster_idx[:] = np.arange(len(rows)) % 2
+        for cluster in solution.cluster_mapper.clusters:
+            cluster.start_time = int(rng.integers(0, 100))
+        assert solution.get_loss_dict()[0] > 0
+
+        schedule_cluster_start_times(solution)
+        assert all(cluster.start_time % load_bucket_size == 0 for cluster in solution.cluster_mapper.clusters)
+        assert solution.get_loss_dict()[0] == 0 # approximated street overflow
+        assert solution.get_exact_loss_dict()[0] == 0
@@ -0,0 +1,30 @@
+from metaheuristiken.geneticMetaheuristic.ResultWriter import ResultWriter
+import json
+import os
+import pytest
+
+def test_1_background_writer_keeps_order(tmp_path):
+    writer = ResultWriter(str(tmp_path), background=True, flush_interval=10)
+    for i in range(100):
+        writer.append_line("losses.csv", i)
+    writer.write_json("result.json", {"flows": [1, 2]})
+    writer.flush() # does not wait for the flush interval
+
+    with open(os.path.join(tmp_path, "losses.csv")) as f:
+        assert f.read().split() == [str(i) for i in range(100)]
+    with open(os.path.join(tmp_path, "result.json")) as f:
+        assert json.load(f) == {"flows": [1, 2]}
+
+    writer.append_line("losses.csv", 100)
+    writer.close()
+    with open(os.path.join(tmp_path, "losses.csv")) as f:
+        assert f.read().split()[-1] == "100"
+
+def test_2_background_errors_are_raised(tmp_path):
+    writer = ResultWriter(str(tmp_path), background=True, flush_interval=0)
+    os.makedirs(os.path.join(tmp_path, "a_directory"))
+    writer.write_json("a_directory", {})
+
+    with pytest.raises(RuntimeError):
+        writer.flush()
+    writer.close()
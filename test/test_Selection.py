@@ -0,0 +1,31 @@
+from metaheuristiken.geneticMetaheuristic.Selection import Selection
+from types import SimpleNamespace
+import numpy as np
+import pytest
+
+def make_population(losses):
+    return [SimpleNamespace(loss=loss, name=i) for i, loss in enumerate(losses)]
+
+def test_1_best_is_like_sorted():
+    rng = np.random.default_rng(0)
+    population = make_population(rng.integers(0, 5, size=50).astype(float)) # many equal losses
+    selection = Selection(population)
+    for k in [0, 1, 7, 50, 60]:
+        assert selection.best(k) == sorted(population, key=lambda p: p.loss)[:k]
+
+def test_2_draws():
+    population = make_population([1.0, 3.0, float("inf"), 0.5])
+    rng = np.random.default_rng(1)
+
+    roulette = Selection(population).draw(rng, 1000)
+    assert len(roulette) == 1000
+    assert all(p.loss != float("inf") for p in roulette) # weight 0
+    counts = np.bincount([p.name for p in roulette], minlength=4)
+    assert counts[3] > counts[0] > counts[1]
+
+    # every tournament contains all solutions -> always the best one
+    tournament = Selection(population, "tournament", tournament_size=200).draw(rng, 10)
+    assert [p.name for p in tournament] == [3] * 10
+
+    with pytest.raises(ValueError):
+        Selection(population, "unknown")
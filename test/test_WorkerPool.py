@@ -0,0 +1,98 @@
+from metaheuristiken.geneticMetaheuristic.WorkerPool import WorkerPool
+from metaheuristiken.geneticMetaheuristic.GeneticMetaheuristik import GeneticMetaheuristik
+from metaheuristiken.geneticMetaheuristic.ProblemInstance import ProblemInstance
+from metaheuristiken.geneticMetaheuristic.Generation import Generation
+from metaheuristiken.geneticMetaheuristic.InstanceGeneratorUtils import generate_instance
+from metaheuristiken.geneticMetaheuristic.RandomUtils import make_rng, STREAM_OFFSPRING
+from metaheuristiken.geneticMetaheuristic import GeneticUtils
+import numpy as np
+import pytest
+import warnings
+
+DATA = generate_instance(20, 4, seed=0)
+
+def create_instance(**options):
+    population = sum(ra["population"] for ra in DATA["residential_areas"])
+    return ProblemInstance(DATA["places_of_refuge"], DATA["residential_areas"], DATA["edges"], population // 5, 10, route_group_size=20, **options)
+
+def test_1_pool_results_equal_the_serial_results():
+    for instance in [create_instance(), create_instance(load_bucket_size=60)]:
+        solutions = GeneticUtils.create_new_possible_solutions(instance, [np.random.default_rng(i) for i in range(6)])
+        pool = WorkerPool(instance, num_workers=2, min_population=2)
+        try:
+            pooled = Generation(ps.clone() for ps in solutions)
+            pooled.set_losses(pool)
+            serial = Generation(ps.clone() for ps in solutions)
+            serial.set_losses()
+            assert [ps.loss_dict for ps in pooled] == [ps.loss_dict for ps in serial]
+
+            tasks = [("crossover", (solutions[0], solutions[1])), ("mutation", (solutions[2],)), ("repaired", (solutions[3],))]
+            children = pool.create_offspring(tasks, seed=7, iteration=3)
+            for child_idx, ((offspring_type, parents), child) in enumerate(zip(tasks, children)):
+                expected = GeneticUtils.create_offspring(offspring_type, parents, make_rng(7, STREAM_OFFSPRING, 3, child_idx))
+                assert child.birth_type == expected.birth_type
+                assert np.array_equal(child.genome.pr_idx, expected.genome.pr_idx)
+                assert np.array_equal(child.get_cluster_start_times(), expected.get_cluster_start_times())
+
+            # the tasks of a later call continue the random streams of the earlier ones
+            children = pool.create_offspring(tasks[1:], seed=7, iteration=3, first_child_idx=1)
+            for child_idx, ((offspring_type, parents), child) in enumerate(zip(tasks[1:], children), 1):
+                expected = GeneticUtils.create_offspring(offspring_type, parents, make_rng(7, STREAM_OFFSPRING, 3, child_idx))
+                assert np.array_equal(child.genome.pr_idx, expected.genome.pr_idx)
+                assert np.array_equal(child.get_cluster_start_times(), expected.get_cluster_start_times())
+        finally:
+            pool.close()
+
+def test_2_small_populations_are_evaluated_serially(tmp_path, monkeypatch):
+    def fail(self, *args):
+        raise AssertionError("the pool must not be used below parallel_min_population")
+    monkeypatch.setattr(WorkerPool, "calculate_loss_dicts", fail)
+    monkeypatch.setattr(WorkerPool, "create_offspring", fail)
+
+    konfiguration = {
+        "max_laufzeit": 600, "max_iterationen": 1, "patience": 1, "route_group_size": 20, "population_size": 6,
+        "street_capacity": 0.2, "num_clusters": 10, "seed": 1, "legacy_loss_logs": False,
+        "num_workers": 2, "parallel_min_population": 1000
+    }
+    mh = GeneticMetaheuristik(DATA, konfiguration, str(tmp_path))
+    try:
+        mh.initialisiere()
+        mh.iteriere()
+        assert mh.worker_pool.min_population == 1000
+        assert all(np.isfinite(ps.loss) for ps in mh.generations[-1])
+    finally:
+        mh.close()
+    assert mh.worker_pool is None
+
+def test_3_close_shuts_the_executor_down():
+    pool = WorkerPool(create_instance(), num_workers=2)
+    executor = pool.executor
+    assert pool.use_for(pool.min_population)
+
+    pool.close()
+    assert pool.executor is None
+    assert not pool.use_for(pool.min_population)
+    with pytest.raises(RuntimeError):
+        executor.submit(int)
+    pool.close() # closing twice is harmless
+
+def test_4_warns_that_the_pool_does_not_evaluate_incrementally(tmp_path):
+    konfiguration = {
+        "max_laufzeit": 600, "max_iterationen": 1, "patience": 1, "route_group_size": 20, "population_size": 4,
+        "street_capacity": 0.2, "num_clusters": 10, "seed": 1, "legacy_loss_logs": False, "num_workers": 2
+    }
+    for options in [{"incremental_evaluation": True}, {"load_bucket_size": 60}]:
+        mh = GeneticMetaheuristik(DATA, {**konfiguration, **options}, str(tmp_path))
+        try:
+            with pytest.warns(RuntimeWarning, match="num_workers > 1"):
+                mh.initialisiere()
+        finally:
+            mh.close()
+
+    mh = GeneticMetaheuristik(DATA, konfiguration, str(tmp_path))
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            mh.initialisiere()
+    finally:
+        mh.close()
@@ -0,0 +1,28 @@
+from benchmark.benchmark_GeneticMetaheuristik import run_benchmark, compare_to_baseline, save_results, load_results, measure
+import os
+
+def test_1_benchmark_runs_all_cases(tmp_path):
+    results = run_benchmark([10], {"population_size": 10}, repeats=1)
+    assert {row["case"] for row in results} == {
+        "set_loss", "get_street_overflows", "get_sum_pr_overflows", "apply_mutation", "mutation_crossover",
+        "repair_possible_solution", "create_new_possible_solution", "iteriere"
+    }
+    assert all(row["seconds_per_call"] > 0 and row["peak_memory_kib"] > 0 for row in results)
+
+    path = os.path.join(tmp_path, "baseline.csv")
+    save_results(path, results)
+    assert load_results(path) == results
+
+def test_2_compare_to_baseline():
+    baseline = [{"case": "set_loss", "num_ras": 10, "seconds_per_call": 1.0}]
+    results = [
+        {"case": "set_loss", "num_ras": 10, "seconds_per_call": 1.1},
+        {"case": "set_loss", "num_ras": 100, "seconds_per_call": 5.0} # no baseline
+    ]
+    assert compare_to_baseline(results, baseline, tolerance=0.2) == []
+    assert compare_to_baseline(results, baseline, tolerance=0.05) == [(results[0], 1.0)]
+
+def test_3_setup_runs_before_every_measured_call():
+    calls = []
+    measure(lambda: calls.append("run"), repeats=2, setup=lambda: calls.append("setup"))
+    assert calls == ["setup", "run"] * 3 # two timed runs and the memory run